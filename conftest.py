@@ -0,0 +1,3 @@
+"""
+Lets pytest import the project's packages when run from the project root.
+"""
@@ -1,15 +1,105 @@
 from PyQt5.QtWidgets import (
-    QAbstractItemView, QTableView, QTableWidget, QTableWidgetItem, QComboBox, QApplication, QWidget, QVBoxLayout, QLabel, QPushButton, QLineEdit, QStackedWidget, QMessageBox
+    QAbstractItemView, QTableView, QTableWidget, QTableWidgetItem, QComboBox, QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit, QStackedWidget, QMessageBox, QStatusBar, QInputDialog, QCompleter
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt, QTimer, pyqtSlot
+from contextlib import contextmanager
+import os
 import sys
-import re
 import csv
 from datetime import datetime
-import re
 import sqlite3
-conn = sqlite3.connect('./Database/schoolsystem.sqlite')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lab3_common import config
+from lab3_common.backup import BackupJob, describe
+from lab3_common.changelog import compact
+from lab3_common.db import connect
+from lab3_common.diagnostics import diagnostics
+from lab3_common.export import delta_export, full_export
+from lab3_common.lookup import KeyListModel
+from lab3_common.metrics import metrics, timed_action
+from lab3_common.paging import DISPLAY_COLUMNS, DisplayPager
+from lab3_common.replica import ReadReplica
+from lab3_common.reports import REPORTS, read_report, rebuild
+from lab3_common.service import RemoteStore
+from lab3_common.store import (ChangeSet, ConflictError, LocalStore, add_change_listener, build_insert, fetch_display_rows,
+                               fetch_versions, publish)
+from lab3_common.validation import ValidationError, validate
+from lab3_common.writequeue import GroupCommitQueue
+
+conn = connect(config.DB_PATH)
 cursor = conn.cursor()
+# Sorted IDs per record type for the dropdowns and ID completion, kept up to date on writes
+key_lists = {record_type: KeyListModel(conn, record_type) for record_type in ("student", "instructor", "course")}
+# Optional in-memory read replica serving the listings, searches and exports
+replica = ReadReplica(conn) if config.READ_REPLICA else None
+read_conn = replica.conn if replica is not None else conn
+# Writes run on this connection, or on the shared school service if one is configured
+backend = RemoteStore(config.SERVICE_URL) if config.SERVICE_URL else LocalStore(conn)
+
+
+class KeyListQtModel(QAbstractListModel):
+    """
+    Qt view of a shared sorted ID list, used by dropdowns and ID completers.
+
+    Rows are inserted and removed one at a time as the underlying
+    :class:`KeyListModel` changes, so attached widgets keep their state
+    instead of being cleared and refilled.
+
+    :param keys: The shared ID list.
+    :param parent: The parent object (default is None).
+    """
+    def __init__(self, keys, parent=None):
+        super().__init__(parent)
+        self.keys = keys
+        keys.add_hook(self.changing)
+
+    @contextmanager
+    def changing(self, kind, row):
+        """
+        Brackets one change of the ID list with the matching Qt notifications.
+
+        :param kind: "insert", "remove" or "reset".
+        :param row: The affected row; None for "reset".
+        :returns: A context manager.
+        """
+        if kind == "insert":
+            self.beginInsertRows(QModelIndex(), row, row)
+            yield
+            self.endInsertRows()
+        elif kind == "remove":
+            self.beginRemoveRows(QModelIndex(), row, row)
+            yield
+            self.endRemoveRows()
+        else:
+            self.beginResetModel()
+            yield
+            self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        """
+        Returns the number of IDs.
+
+        :param parent: The parent index; the list has no children.
+        :returns: The row count.
+        :rtype: int
+        """
+        if parent.isValid():
+            return 0
+        return len(self.keys)
+
+    def data(self, index, role=Qt.DisplayRole):
+        """
+        Returns the ID shown in a row.
+
+        :param index: The model index.
+        :param role: The item data role.
+        :returns: The ID, or None for other roles.
+        """
+        if index.isValid() and role in (Qt.DisplayRole, Qt.EditRole):
+            return self.keys[index.row()]
+        return None
+
 
 class SchoolManagementApp(QWidget):
     """
@@ -44,6 +134,40 @@ class SchoolManagementApp(QWidget):
         # Initialize StackedWidget to hold different frames
         self.stacked_widget = QStackedWidget(self)
 
+        # Status bar showing the duration of the last user action
+        self.status_bar = QStatusBar(self)
+
+        # Currently shown record table, patched in place when records change
+        self.display_widget = None
+        self.display_category = None
+        self.display_items = {}
+        self.display_pager = None
+        add_change_listener(self.on_records_changed)
+        metrics.add_listener(self.show_action_time)
+
+        # One sorted ID list per record type backs every dropdown and ID completer
+        self.key_models = {record_type: KeyListQtModel(keys, self) for record_type, keys in key_lists.items()}
+
+        # Periodic replica sync picks up writes made outside this application
+        if replica is not None and config.REPLICA_SYNC_MS > 0:
+            QTimer.singleShot(config.REPLICA_SYNC_MS, self.sync_replica)
+
+        # Background database backup, polled from the event loop
+        self.backup_job = None
+
+        # Diagnostics mode profiles the next N actions on demand
+        metrics.add_action_hook(diagnostics.capture)
+        diagnostics.add_listener(self.show_capture)
+
+        # Optional write-behind mode: inserts share one commit per group, which
+        # is committed before any other write; the school service batches
+        # writes itself
+        self.write_queue = None
+        if config.WRITE_BEHIND and not config.SERVICE_URL:
+            self.write_queue = GroupCommitQueue(conn, config.WRITE_BEHIND_BATCH, config.WRITE_BEHIND_DELAY_MS,
+                                                schedule=QTimer.singleShot, on_error=self.report_write_error)
+            backend.write_queue = self.write_queue
+
         # Main Menu Frame
         self.main_menu_widget = QWidget()
         self.create_main_menu()
@@ -82,6 +206,10 @@ class SchoolManagementApp(QWidget):
         self.search_widget = QWidget()
         self.create_search_form()
 
+        # Reports Frame
+        self.reports_widget = QWidget()
+        self.create_reports_view()
+
         # Add widgets to the stacked layout
         self.stacked_widget.addWidget(self.main_menu_widget)
         self.stacked_widget.addWidget(self.student_widget)
@@ -95,10 +223,12 @@ class SchoolManagementApp(QWidget):
         self.stacked_widget.addWidget(self.display_instructors_widget)
         self.stacked_widget.addWidget(self.display_courses_widget)
         self.stacked_widget.addWidget(self.search_widget)
+        self.stacked_widget.addWidget(self.reports_widget)
 
         # Set the main layout
         layout = QVBoxLayout(self)
         layout.addWidget(self.stacked_widget)
+        layout.addWidget(self.status_bar)
         self.setLayout(layout)
 
         # Show main menu initially
@@ -163,15 +293,195 @@ class SchoolManagementApp(QWidget):
         self.search_button.clicked.connect(self.show_search_form)
         layout.addWidget(self.search_button)
 
+        self.reports_button = QPushButton("Reports", self)
+        self.reports_button.clicked.connect(self.show_reports)
+        layout.addWidget(self.reports_button)
+
             # Export to CSV button
         self.export_csv_button = QPushButton("Export to CSV", self)
         self.export_csv_button.clicked.connect(self.export_to_csv)
         layout.addWidget(self.export_csv_button)
 
+        self.export_changes_button = QPushButton("Export Changes", self)
+        self.export_changes_button.clicked.connect(self.export_changes)
+        layout.addWidget(self.export_changes_button)
+
+        self.save_metrics_button = QPushButton("Save Metrics", self)
+        self.save_metrics_button.clicked.connect(self.save_metrics)
+        layout.addWidget(self.save_metrics_button)
+
+        self.diagnostics_button = QPushButton("Diagnostics", self)
+        self.diagnostics_button.clicked.connect(self.configure_diagnostics)
+        layout.addWidget(self.diagnostics_button)
+
+        self.backup_button = QPushButton("Backup", self)
+        self.backup_button.clicked.connect(self.start_backup)
+        layout.addWidget(self.backup_button)
 
         # Set layout for the main menu widget
         self.main_menu_widget.setLayout(layout)
 
+    def show_action_time(self, action, elapsed_ms):
+        """
+        Shows the duration of the last user action in the status bar.
+
+        :param action: The name of the action that finished.
+        :type action: str
+        :param elapsed_ms: How long the action took, in milliseconds.
+        :type elapsed_ms: float
+        :returns: None
+        """
+        self.status_bar.showMessage(f"{action}: {elapsed_ms:.1f} ms")
+
+    def write(self, record_type, record, origin):
+        """
+        Inserts a record, committing it now or queueing the commit in write-behind mode.
+
+        :param record_type: "student", "instructor" or "course".
+        :type record_type: str
+        :param record: The validated record.
+        :type record: dict
+        :param origin: The name of the form issuing the write, used in error reports.
+        :type origin: str
+        :raises sqlite3.Error: If the statement fails.
+        :returns: True if the write was committed, False if its commit was queued.
+        :rtype: bool
+        """
+        if self.write_queue is None:
+            backend.insert_record(record_type, record)
+            return True
+        self.write_queue.submit(build_insert(record_type, tuple(record)), tuple(record.values()), origin,
+                                ChangeSet().upsert(record_type, [record[f"{record_type}_id"]]))
+        return False
+
+    def report_write_error(self, origin, error, count):
+        """
+        Reports queued writes that could not be committed back to the user.
+
+        :param origin: The form the writes came from.
+        :type origin: str
+        :param error: The exception raised by the group commit.
+        :type error: Exception
+        :param count: How many writes from that form were lost.
+        :type count: int
+        :returns: None
+        """
+        self.show_message_box("Save Error", f"{count} record(s) entered in the {origin} form could not be saved: {str(error)}", QMessageBox.Critical)
+
+    def show_capture(self, action, prof_path, report_path):
+        """
+        Reports a finished diagnostics capture in the status bar.
+
+        :param action: The name of the profiled action.
+        :type action: str
+        :param prof_path: The cProfile output file.
+        :type prof_path: str
+        :param report_path: The top-allocations report file.
+        :type report_path: str
+        :returns: None
+        """
+        self.status_bar.showMessage(f"Captured {action}: {prof_path} ({diagnostics.remaining} capture(s) left)")
+
+    @pyqtSlot()
+    def configure_diagnostics(self):
+        """
+        Asks how many of the next actions to profile with cProfile and tracemalloc.
+
+        Entering 0 turns diagnostics mode off.
+
+        :returns: None
+        """
+        count, ok = QInputDialog.getInt(self, "Diagnostics", "Profile how many of the next actions? (0 to turn off)",
+                                        diagnostics.remaining or 1, 0, 1000)
+        if not ok:
+            return
+        diagnostics.arm(count)
+        if count:
+            self.status_bar.showMessage(f"Diagnostics armed for the next {count} action(s); output in {diagnostics.directory}/")
+        else:
+            self.status_bar.showMessage("Diagnostics off")
+
+    def sync_replica(self):
+        """
+        Applies changes made outside this application to the read replica and reschedules itself.
+
+        :returns: None
+        """
+        try:
+            replica.sync()
+        except sqlite3.Error as e:
+            print(f"An error occurred while syncing the read replica: {e}")
+        QTimer.singleShot(config.REPLICA_SYNC_MS, self.sync_replica)
+
+    @pyqtSlot()
+    def start_backup(self):
+        """
+        Starts an online backup of the database in a background thread.
+
+        The application stays usable while the backup runs; its progress is shown
+        in the status bar and the result is reported when it finishes.
+
+        :returns: None
+        """
+        if self.backup_job is not None and not self.backup_job.done.is_set():
+            QMessageBox.information(self, "Backup", "A backup is already running.")
+            return
+        if self.write_queue is not None:
+            self.write_queue.flush()
+        self.backup_job = BackupJob(source_path=config.DB_PATH).start()
+        QTimer.singleShot(200, self.poll_backup)
+
+    def poll_backup(self):
+        """
+        Shows the progress of the running backup and reports its result.
+
+        :returns: None
+        """
+        job = self.backup_job
+        if not job.done.is_set():
+            self.status_bar.showMessage(f"Backup: {job.copied} of {job.total} pages copied")
+            QTimer.singleShot(200, self.poll_backup)
+        elif job.error is not None:
+            self.status_bar.showMessage("Backup failed")
+            QMessageBox.critical(self, "Backup", f"Backup failed: {job.error}")
+        else:
+            self.status_bar.showMessage(f"Backup: {job.result.pages_per_second:,.0f} pages/s")
+            QMessageBox.information(self, "Backup", describe(job.result))
+
+    @pyqtSlot()
+    def save_metrics(self):
+        """
+        Writes the action latency histograms to JSON and Prometheus text files.
+
+        :returns: None
+        """
+        try:
+            json_path = metrics.dump(os.path.join("Metrics", "action_metrics.json"))
+            prom_path = metrics.dump(os.path.join("Metrics", "action_metrics.prom"))
+            self.show_message_box("Metrics", f"Metrics written to {json_path} and {prom_path}", QMessageBox.Information)
+        except OSError as e:
+            self.show_message_box("Error", f"Failed to write metrics: {str(e)}", QMessageBox.Critical)
+
+    def closeEvent(self, event):
+        """
+        Commits any queued writes, compacts the change log and dumps the action metrics before the window closes.
+
+        :param event: The close event.
+        :type event: QCloseEvent
+        :returns: None
+        """
+        if self.write_queue is not None:
+            self.write_queue.close()
+        try:
+            compact(conn)
+        except sqlite3.Error as e:
+            print(f"An error occurred while compacting the change log: {e}")
+        try:
+            metrics.dump(os.path.join("Metrics", "action_metrics.json"))
+        except OSError as e:
+            print(f"An error occurred while saving metrics: {e}")
+        super().closeEvent(event)
+
     def create_student_form(self):
         """
         Creates the form to add a new student.
@@ -334,11 +644,11 @@ class SchoolManagementApp(QWidget):
         layout.addWidget(register_course_label)
 
         self.register_student_id_field = QLineEdit(self)
+        self.register_student_id_field.setCompleter(self.create_id_completer("student", self.register_student_id_field))
         self.register_student_id_field.setPlaceholderText("Student ID")
         layout.addWidget(self.register_student_id_field)
 
-        self.register_course_dropdown = QComboBox(self)
-        self.load_courses_into_dropdown(self.register_course_dropdown)
+        self.register_course_dropdown = self.create_course_dropdown()
         layout.addWidget(self.register_course_dropdown)
 
         register_button = QPushButton("Register", self)
@@ -369,11 +679,11 @@ class SchoolManagementApp(QWidget):
         layout.addWidget(assign_instructor_label)
 
         self.assign_instructor_id_field = QLineEdit(self)
+        self.assign_instructor_id_field.setCompleter(self.create_id_completer("instructor", self.assign_instructor_id_field))
         self.assign_instructor_id_field.setPlaceholderText("Instructor ID")
         layout.addWidget(self.assign_instructor_id_field)
 
-        self.assign_course_dropdown = QComboBox(self)
-        self.load_courses_into_dropdown(self.assign_course_dropdown)
+        self.assign_course_dropdown = self.create_course_dropdown()
         layout.addWidget(self.assign_course_dropdown)
 
         assign_button = QPushButton("Assign", self)
@@ -505,25 +815,29 @@ class SchoolManagementApp(QWidget):
         """
         self.stacked_widget.setCurrentWidget(self.course_widget)
 
+    @pyqtSlot()
+    @timed_action()
     def show_register_course_form(self):
         """
         Displays the course registration form.
 
-        This method refreshes the available courses list and switches the current 
+        This method clears the selected course and switches the current 
         widget to the course registration form, where students can register for courses.
 
         :param None: This function does not accept parameters.
         :returns: None
         :rtype: None
         """
-        self.refresh_courses()
+        self.register_course_dropdown.setCurrentIndex(-1)
         self.stacked_widget.setCurrentWidget(self.register_course_widget)
 
+    @pyqtSlot()
+    @timed_action()
     def show_assign_instructor_form(self):
         """
         Displays the instructor assignment form.
 
-        This method refreshes the list of available courses and switches the current 
+        This method clears the selected course and switches the current 
         widget to the instructor assignment form, allowing administrators to assign 
         instructors to courses.
 
@@ -531,7 +845,7 @@ class SchoolManagementApp(QWidget):
         :returns: None
         :rtype: None
         """
-        self.refresh_courses()
+        self.assign_course_dropdown.setCurrentIndex(-1)
         self.stacked_widget.setCurrentWidget(self.assign_instructor_widget)
      
     def show_display_students(self):
@@ -586,7 +900,20 @@ class SchoolManagementApp(QWidget):
         """
         self.stacked_widget.setCurrentWidget(self.search_widget)
     
+    @pyqtSlot()
+    @timed_action()
+    def show_reports(self):
+        """
+        Displays the reports view with the currently selected report.
+
+        :returns: None
+        """
+        self.load_report()
+        self.stacked_widget.setCurrentWidget(self.reports_widget)
+
     # Event handlers for adding a Student
+    @pyqtSlot()
+    @timed_action()
     def add_student(self):
         """
         Adds a student to the system.
@@ -596,38 +923,27 @@ class SchoolManagementApp(QWidget):
         database. If validation fails or an error occurs during insertion, an error 
         message is shown.
 
-        :raises AssertionError: If any field is invalid or empty.
-        :raises Exception: If there's any database or validation error.
+        :raises ValidationError: If any field is invalid or empty.
+        :raises Exception: If there's any database error.
         :param None: This function does not accept parameters.
         :returns: None
         :rtype: None
         """
-        name = self.student_name_field.text()
-        age = self.student_age_field.text()
-        email = self.student_email_field.text()
-        student_id = self.student_id_field.text()
-
-        # Simple validation
-        if name and age and email and student_id:
-            try:
-                assert(student_id.strip() != ""), "student_id cannot be empty"
-                assert re.match(r"^[a-zA-Z0-9]+$", student_id), "student_id must contain only alphanumeric characters"
-                assert (type(name) == str), "Name must be a string" 
-                assert(name.strip() != ""), "name cannot be empty"
-                assert re.match(r"^[a-zA-Z\s]+$", name), "Name must contain only alphabetic characters and spaces"
-                age = int(age)
-                assert (age >= 0), "Age cannot be negative"
-                regex = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
-                assert(re.match(regex, email) is not None), "Wrong email format"
-                cursor.execute("INSERT INTO students (student_id, name, age, email) VALUES (?, ?, ?, ?)", (student_id, name, age, email))
-                conn.commit()
-                QMessageBox.information(self, "Success", "Student added successfully")
-                self.clear_student_fields()
-                self.show_main_menu()
-            except Exception as e:
-                QMessageBox.critical(self, "Error", str(e))
-        else:
-            QMessageBox.warning(self, "Warning", "All fields must be filled")
+        try:
+            record = validate("student", {
+                "student_id": self.student_id_field.text(),
+                "name": self.student_name_field.text(),
+                "age": self.student_age_field.text(),
+                "email": self.student_email_field.text(),
+            })
+            committed = self.write("student", record, "Add Student")
+            QMessageBox.information(self, "Success", "Student added successfully" if committed else "Student queued for saving")
+            self.clear_student_fields()
+            self.show_main_menu()
+        except ValidationError as e:
+            QMessageBox.warning(self, "Validation Error", str(e))
+        except Exception as e:
+            QMessageBox.critical(self, "Error", str(e))
 
     def clear_student_fields(self):
         """
@@ -646,6 +962,8 @@ class SchoolManagementApp(QWidget):
         self.student_id_field.clear()
 
     # Event handlers for adding an Instructor
+    @pyqtSlot()
+    @timed_action()
     def add_instructor(self):
         """
         Adds an instructor to the system.
@@ -655,39 +973,27 @@ class SchoolManagementApp(QWidget):
         the database. If validation fails or an error occurs during insertion, an 
         error message is shown.
 
-        :raises AssertionError: If any field is invalid or empty.
-        :raises Exception: If there's any database or validation error.
+        :raises ValidationError: If any field is invalid or empty.
+        :raises Exception: If there's any database error.
         :param None: This function does not accept parameters.
         :returns: None
         :rtype: None
         """
-        name = self.instructor_name_field.text()
-        age = self.instructor_age_field.text()
-        email = self.instructor_email_field.text()
-        instructor_id = self.instructor_id_field.text()
-
-        # Simple validation
-        if name and age and email and instructor_id:
-            try:
-                assert(instructor_id.strip() != ""), "student_id cannot be empty"
-                assert re.match(r"^[a-zA-Z0-9]+$", instructor_id), "student_id must contain only alphanumeric characters"
-               
-                assert (type(name) == str), "Name must be a string" 
-                assert(name.strip() != ""), "name cannot be empty"
-                assert re.match(r"^[a-zA-Z\s]+$", name), "Name must contain only alphabetic characters and spaces"
-                age = int(age)
-                assert (age >= 0), "Age cannot be negative"
-                regex = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
-                assert(re.match(regex, email) is not None), "Wrong email format"
-                cursor.execute("INSERT INTO instructors (instructor_id, name, age, email) VALUES (?, ?, ?, ?)", (instructor_id, name, age, email))
-                conn.commit()
-                QMessageBox.information(self, "Success", "Instructor added successfully")
-                self.clear_instructor_fields()
-                self.show_main_menu()
-            except Exception as e:
-                QMessageBox.critical(self, "Error", str(e))
-        else:
-            QMessageBox.warning(self, "Warning", "All fields must be filled")
+        try:
+            record = validate("instructor", {
+                "instructor_id": self.instructor_id_field.text(),
+                "name": self.instructor_name_field.text(),
+                "age": self.instructor_age_field.text(),
+                "email": self.instructor_email_field.text(),
+            })
+            committed = self.write("instructor", record, "Add Instructor")
+            QMessageBox.information(self, "Success", "Instructor added successfully" if committed else "Instructor queued for saving")
+            self.clear_instructor_fields()
+            self.show_main_menu()
+        except ValidationError as e:
+            QMessageBox.warning(self, "Validation Error", str(e))
+        except Exception as e:
+            QMessageBox.critical(self, "Error", str(e))
 
     def clear_instructor_fields(self):
         """
@@ -706,6 +1012,8 @@ class SchoolManagementApp(QWidget):
         self.instructor_id_field.clear()
 
     # Event handlers for adding a Course
+    @pyqtSlot()
+    @timed_action()
     def add_course(self):
         """
         Adds a course to the system.
@@ -714,34 +1022,25 @@ class SchoolManagementApp(QWidget):
         form, validates it, and then inserts the course record into the database. 
         If validation fails or an error occurs during insertion, an error message is shown.
 
-        :raises AssertionError: If any field is invalid or empty.
-        :raises Exception: If there's any database or validation error.
+        :raises ValidationError: If any field is invalid or empty.
+        :raises Exception: If there's any database error.
         :param None: This function does not accept parameters.
         :returns: None
         :rtype: None
         """
-        course_id = self.course_id_field.text()
-        course_name = self.course_name_field.text()
-
-        # Simple validation
-        if course_id and course_name:
-            
-            try:
-                assert (type(course_name) == str), "Name must be a string" 
-                assert(course_name.strip() != ""), "name cannot be empty"
-                assert re.match(r"^[a-zA-Z\s]+$", course_name), "Name must contain only alphabetic characters and spaces"
-                assert(course_id.strip() != ""), "student_id cannot be empty"
-                assert re.match(r"^[a-zA-Z0-9]+$", course_id), "student_id must contain only alphanumeric characters"
-               
-                cursor.execute("INSERT INTO courses (course_id, course_name) VALUES (?, ?)", (course_id, course_name))
-                conn.commit()
-                QMessageBox.information(self, "Success", "Course added successfully")
-                self.clear_course_fields()
-                self.show_main_menu()
-            except Exception as e:
-                QMessageBox.critical(self, "Error", str(e))
-        else:
-            QMessageBox.warning(self, "Warning", "All fields must be filled")
+        try:
+            record = validate("course", {
+                "course_id": self.course_id_field.text(),
+                "course_name": self.course_name_field.text(),
+            })
+            committed = self.write("course", record, "Add Course")
+            QMessageBox.information(self, "Success", "Course added successfully" if committed else "Course queued for saving")
+            self.clear_course_fields()
+            self.show_main_menu()
+        except ValidationError as e:
+            QMessageBox.warning(self, "Validation Error", str(e))
+        except Exception as e:
+            QMessageBox.critical(self, "Error", str(e))
 
     def clear_course_fields(self):
         """
@@ -757,36 +1056,45 @@ class SchoolManagementApp(QWidget):
         self.course_id_field.clear()
         self.course_name_field.clear()
 
-    # Load available courses into the dropdown
-    def load_courses_into_dropdown(self, dropdown):
+    def create_id_completer(self, record_type, parent):
         """
-        Loads available courses into a dropdown menu.
+        Creates a completer suggesting the existing IDs of a record type.
 
-        Queries the database for all course IDs and populates the given dropdown menu with them.
-        If no courses are found, it adds a "No available courses" message.
+        The completer searches the shared sorted ID model by binary search on the
+        typed prefix, so suggestions do not query the database.
 
-        :param dropdown: The dropdown widget to populate with course data.
-        :type dropdown: QComboBox
-        :raises sqlite3.Error: If there's a problem querying the database.
-        :returns: None
+        :param record_type: "student", "instructor" or "course".
+        :param parent: The widget owning the completer.
+        :returns: The completer.
+        :rtype: QCompleter
         """
-        dropdown.clear()
-        try:
-            cursor.execute("SELECT course_id FROM courses")
-            courses_data = cursor.fetchall() 
-            courses = [course[0] for course in courses_data]  
-           
-        
-        except sqlite3.Error as e:
-            print(f"An error occurred while loading courses: {e}")
-            courses=[] 
-        if courses:
-            for course in courses:
-                dropdown.addItem(course)
-        else:
-            dropdown.addItem("No available courses")
+        completer = QCompleter(self.key_models[record_type], parent)
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+        completer.setModelSorting(QCompleter.CaseInsensitivelySortedModel)
+        completer.setFilterMode(Qt.MatchStartsWith)
+        return completer
+
+    def create_course_dropdown(self):
+        """
+        Creates a course dropdown backed by the shared course model.
+
+        The dropdown is editable: typing filters the course IDs in memory through
+        a completer over the same model, without querying the database.
+
+        :returns: The dropdown.
+        :rtype: QComboBox
+        """
+        dropdown = QComboBox(self)
+        dropdown.setEditable(True)
+        dropdown.setInsertPolicy(QComboBox.NoInsert)
+        dropdown.setModel(self.key_models["course"])
+        dropdown.lineEdit().setPlaceholderText("Type or select a course ID")
+        dropdown.setCompleter(self.create_id_completer("course", dropdown))
+        return dropdown
 
     # Register student for course
+    @pyqtSlot()
+    @timed_action()
     def register_student_for_course(self):
         """
         Registers a student for a selected course.
@@ -804,23 +1112,15 @@ class SchoolManagementApp(QWidget):
         # Simple validation
         else:
             try:
-                # Simple validation
-                cursor.execute("SELECT student_id from students where student_id = ?",(student_id,))
-                student_data = cursor.fetchone() 
-                cursor.execute("SELECT course_id from courses where course_id = ?",(selected_course_id,))
-                course_data = cursor.fetchone() 
-
-                if student_data is not None and course_data is not None:
-                    cursor.execute("INSERT INTO student_courses (student_id, course_id) VALUES (?, ?)",(student_id,selected_course_id,))
-                    conn.commit()
-                    QMessageBox.information(self, "Success", "Student registered for the course successfully")
-                    self.show_register_course_form()  # Refresh form
-                else:
-                    QMessageBox.critical(self, "Error", "Student or Course not found")
+                backend.enroll_student(student_id, selected_course_id)
+                QMessageBox.information(self, "Success", "Student registered for the course successfully")
+                self.show_register_course_form()  # Refresh form
             except Exception as e:
                 QMessageBox.critical(self, "Error", str(e))
       
     # Assign instructor to course
+    @pyqtSlot()
+    @timed_action()
     def assign_instructor_to_course(self):
         """
         Assigns an instructor to a selected course.
@@ -838,58 +1138,92 @@ class SchoolManagementApp(QWidget):
         # Simple validation
         else:
             try:
-                # Simple validation
-                cursor.execute("SELECT instructor_id from instructors where instructor_id = ?",(instructor_id,))
-                instructor_data = cursor.fetchone() 
-                cursor.execute("SELECT course_id from courses where course_id = ?",(selected_course_id,))
-                course_data = cursor.fetchone() 
-                cursor.execute("SELECT instructor_id from courses where course_id = ? ",(selected_course_id,))
-                current_inst = cursor.fetchone()
-                if instructor_data is not None and course_data is not None and current_inst[0] is None:
-                    cursor.execute("UPDATE courses SET instructor_id = ? WHERE course_id = ?",(instructor_id,selected_course_id,))
-                    conn.commit()
-                    QMessageBox.information(self, "Success", f"Instructor  assigned to course successfully")
-                    self.show_assign_instructor_form()  # Refresh form
-                else:
-                    QMessageBox.critical(self, "Error", "Instructor or Course not found or already there is an instructor")
+                backend.assign_instructor(instructor_id, selected_course_id)
+                QMessageBox.information(self, "Success", f"Instructor  assigned to course successfully")
+                self.show_assign_instructor_form()  # Refresh form
             except Exception as e:
                 QMessageBox.critical(self, "Error", str(e))
       
            
 
     # Create display table function for students, instructors, and courses
-    def create_display_table(self, headers, data, category):
+    @timed_action()
+    def create_display_table(self, headers, data, category, pager=None):
         """
         Creates a display table for students, instructors, or courses.
 
         This function creates a table and populates it with data. It also provides
-        Edit, Delete, and Back buttons to manage records.
+        Edit, Delete, and Back buttons to manage records. The previous display table,
+        if any, is removed from the stacked widget. Later edits and deletions patch
+        this table row by row through :meth:`on_records_changed`.
+
+        Listings show one page of a :class:`~lab3_common.paging.DisplayPager` at a
+        time: clicking a column header sorts by that column (again to reverse), the
+        filter fields above the table narrow it when Return is pressed, and the
+        Previous and Next buttons move between pages. The database does the sorting
+        and filtering.
 
         :param headers: The column headers for the table.
         :type headers: list[str]
-        :param data: The table's data to be displayed.
+        :param data: The table's data to be displayed; the first column is the record ID.
         :type data: list[tuple]
         :param category: The type of entity being displayed (student, instructor, or course).
         :type category: str
+        :param pager: The pager of a listing, whose current page is ``data``; None for search results.
+        :type pager: lab3_common.paging.DisplayPager
         :returns: None
         """
         display_widget = QWidget()  # Create a new widget for the table and controls
         layout = QVBoxLayout()
 
+        # Filter fields for the sortable columns of a listing
+        self.display_filters = {}
+        if pager is not None:
+            filter_layout = QHBoxLayout()
+            for index, header in enumerate(headers[:len(DISPLAY_COLUMNS[category])]):
+                self.display_filters[index] = QLineEdit()
+                self.display_filters[index].setPlaceholderText(header)
+                self.display_filters[index].returnPressed.connect(self.apply_display_filters)
+                filter_layout.addWidget(self.display_filters[index])
+            filter_button = QPushButton("Filter")
+            filter_button.clicked.connect(self.apply_display_filters)
+            filter_layout.addWidget(filter_button)
+            layout.addLayout(filter_layout)
+
         # Create the table and populate it with data
         self.display_table = QTableWidget()
         self.display_table.setRowCount(len(data))
         self.display_table.setColumnCount(len(headers))
         self.display_table.setHorizontalHeaderLabels(headers)
         self.display_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.display_table.setSelectionMode(QAbstractItemView.ExtendedSelection)
 
+        self.display_category = category
+        self.display_items = {}
+        self.display_pager = pager
         for row_index, row_data in enumerate(data):
-            for col_index, value in enumerate(row_data):
-                item = QTableWidgetItem(str(value))
-                item.setFlags(item.flags() & ~Qt.ItemIsEditable)  # Make item non-editable
-                self.display_table.setItem(row_index, col_index, item)
+            self.set_display_row(row_index, row_data)
 
         layout.addWidget(self.display_table)
+        if pager is not None:
+            header = self.display_table.horizontalHeader()
+            header.setSortIndicatorShown(True)
+            header.setSortIndicator(pager.sort, Qt.DescendingOrder if pager.descending else Qt.AscendingOrder)
+            header.sectionClicked.connect(self.sort_display_table)
+
+            page_layout = QHBoxLayout()
+            self.previous_page_button = QPushButton("Previous")
+            self.previous_page_button.clicked.connect(lambda: self.show_display_page(pager.previous_page))
+            page_layout.addWidget(self.previous_page_button)
+            self.page_label = QLabel()
+            self.page_label.setAlignment(Qt.AlignCenter)
+            page_layout.addWidget(self.page_label)
+            self.next_page_button = QPushButton("Next")
+            self.next_page_button.clicked.connect(lambda: self.show_display_page(pager.next_page))
+            page_layout.addWidget(self.next_page_button)
+            layout.addLayout(page_layout)
+            self.update_page_controls()
+
         # Add Edit and Delete buttons
         edit_button = QPushButton("Edit")
         edit_button.clicked.connect(lambda: self.save_edit(category))  # Handles edit logic
@@ -907,77 +1241,256 @@ class SchoolManagementApp(QWidget):
         # Set layout for the display widget
         display_widget.setLayout(layout)
 
-        # Add the new widget to the stacked widget and display it
+        # Replace the previous display widget in the stacked widget and display it
+        if self.display_widget is not None:
+            self.stacked_widget.removeWidget(self.display_widget)
+            self.display_widget.deleteLater()
+        self.display_widget = display_widget
         self.stacked_widget.addWidget(display_widget)
         self.stacked_widget.setCurrentWidget(display_widget)
 
+    def show_display_page(self, action, *args):
+        """
+        Changes the page of the listing shown and refills the display table.
+
+        :param action: The :class:`~lab3_common.paging.DisplayPager` method to call,
+            e.g. ``next_page`` or ``sort_by``.
+        :type action: callable
+        :param args: The arguments of ``action``.
+        :returns: None
+        """
+        try:
+            action(*args)
+        except Exception as e:
+            self.show_message_box("Error", str(e), QMessageBox.Critical)
+            return
+        self.display_items = {}
+        self.display_table.setRowCount(0)
+        self.display_table.setRowCount(len(self.display_pager.rows))
+        for row_index, row_data in enumerate(self.display_pager.rows):
+            self.set_display_row(row_index, row_data)
+        self.update_page_controls()
+
+    def update_page_controls(self):
+        """
+        Shows the current page, order and page buttons of the listing.
+
+        :returns: None
+        """
+        pager = self.display_pager
+        self.display_table.horizontalHeader().setSortIndicator(
+            pager.sort, Qt.DescendingOrder if pager.descending else Qt.AscendingOrder)
+        self.page_label.setText(f"Page {pager.page}")
+        self.previous_page_button.setEnabled(pager.page > 1)
+        self.next_page_button.setEnabled(pager.more)
+
+    @pyqtSlot(int)
+    def sort_display_table(self, section):
+        """
+        Sorts the listing by a clicked column, or reverses its order.
+
+        The computed last column cannot be sorted; clicking it leaves the order as is.
+
+        :param section: The clicked column.
+        :type section: int
+        :returns: None
+        """
+        if section < len(DISPLAY_COLUMNS[self.display_category]):
+            self.show_display_page(self.display_pager.sort_by, section)
+        else:
+            self.update_page_controls()
+
+    @pyqtSlot()
+    def apply_display_filters(self):
+        """
+        Filters the listing by the texts entered above its columns.
+
+        :returns: None
+        """
+        filters = {index: field.text() for index, field in self.display_filters.items()}
+        self.show_display_page(self.display_pager.set_filters, filters)
+
+    def set_display_row(self, row_index, row_data):
+        """
+        Writes one record into a row of the display table.
+
+        :param row_index: The table row to write.
+        :type row_index: int
+        :param row_data: The display row; the first column is the record ID.
+        :type row_data: tuple
+        :returns: None
+        """
+        for col_index, value in enumerate(row_data):
+            item = self.display_table.item(row_index, col_index)
+            if item is None:
+                item = QTableWidgetItem(str(value))
+                item.setFlags(item.flags() & ~Qt.ItemIsEditable)  # Make item non-editable
+                self.display_table.setItem(row_index, col_index, item)
+            else:
+                item.setText(str(value))
+        self.display_items[str(row_data[0])] = self.display_table.item(row_index, 0)
+
+    def on_records_changed(self, changes):
+        """
+        Patches the visible display table after a write.
+
+        Only the rows whose primary keys are in the change set are touched:
+        deleted records are removed and changed records are re-read and updated
+        in place, keeping scroll position and selection, so the cost is
+        proportional to the number of changed rows. New records make a listing
+        read its current page again.
+
+        :param changes: The primary keys touched by the write.
+        :type changes: lab3_common.store.ChangeSet
+        :returns: None
+        """
+        category = self.display_category
+        if category is None or self.display_widget is None:
+            return
+
+        for record_id in changes.deleted.get(category, ()):
+            item = self.display_items.pop(record_id, None)
+            if item is not None:
+                self.display_table.removeRow(item.row())
+
+        upserted = changes.upserted.get(category)
+        if upserted:
+            rows = fetch_display_rows(conn, category, upserted)
+            if self.display_pager is not None and any(str(row[0]) not in self.display_items for row in rows):
+                self.show_display_page(self.display_pager.load)
+                return
+            for row_data in rows:
+                item = self.display_items.get(str(row_data[0]))
+                if item is not None:
+                    self.set_display_row(item.row(), row_data)
+
     # Display all students, instructors, courses
+    @pyqtSlot()
+    @timed_action()
     def display_all_students(self):
         """
         Displays all students with their registered courses.
 
-        Fetches student data from the database and compiles a list of courses each student is registered for.
+        Fetches the first page of students together with the courses they are registered for in a single query;
+        the table sorts, filters and pages through the rest.
         The result is displayed in a table format.
 
         :returns: None
         """
-        cursor.execute("SELECT * FROM students;")
-        students = cursor.fetchall()
-        data=[]
-        for s in students:
-            #print(s[0])
-            cursor.execute("SELECT course_id from student_courses where student_id  = ?",(s[0],))
-            courses = cursor.fetchall()
-            # Prepare the data for display
-           
-            data.append((s[0], s[1], s[2], s[3], ', '.join([course[0] for course in courses])))
-        headers = ["Student ID", "Name", "Age", "Email", "Registered Courses"] 
-        self.create_display_table(headers, data,"student")
+        pager = DisplayPager(read_conn, "student")
+        headers = ["Student ID", "Name", "Age", "Email", "Registered Courses"]
+        self.create_display_table(headers, pager.rows, "student", pager)
 
+    @pyqtSlot()
+    @timed_action()
     def display_all_instructors(self):
         """
         Displays all instructors with the courses they teach.
 
-        Fetches instructor data from the database and compiles a list of courses each instructor teaches.
+        Fetches the first page of instructors together with the courses they teach in a single query;
+        the table sorts, filters and pages through the rest.
         The result is displayed in a table format.
 
         :returns: None
         """
-        cursor.execute("SELECT * FROM instructors;")
-        instructors = cursor.fetchall()
-        data=[]
-        for i in instructors:
-            cursor.execute("SELECT course_id from courses where instructor_id = ?",(i[0],))
-            courses = cursor.fetchall()
-        # Prepare the data for display
-            
-            data.append((i[0], i[1], i[2], i[3], ', '.join([course[0] for course in courses])))
+        pager = DisplayPager(read_conn, "instructor")
         headers = ["Instructor ID", "Name", "Age", "Email", "Courses Taught"]
-        self.create_display_table(headers, data,"instructor")
+        self.create_display_table(headers, pager.rows, "instructor", pager)
 
+    @pyqtSlot()
+    @timed_action()
     def display_all_courses(self):
         """
         Displays all courses along with their enrolled students.
 
-        Fetches course data from the database and compiles a list of students enrolled in each course.
+        Fetches the first page of courses together with their enrolled students in a single query;
+        the table sorts, filters and pages through the rest.
         The result is displayed in a table format.
 
         :returns: None
         """
-        cursor.execute("SELECT * FROM courses;")
-        courses = cursor.fetchall()
-        data=[]
-        for c in courses:
-            cursor.execute("SELECT student_id from student_courses where course_id = ?",(c[0],))
-            students = cursor.fetchall()
-        # Prepare the data for display
-            data.append((c[0], c[1], c[2], ', '.join([student[0] for student in students])))
-
+        pager = DisplayPager(read_conn, "course")
         headers = ["Course ID", "Course Name", "Instructor ID", "Enrolled Students"]
-        self.create_display_table(headers, data,"course")
+        self.create_display_table(headers, pager.rows, "course", pager)
 
      # Function to perform the search
  
+    def create_reports_view(self):
+        """
+        Creates the view showing enrollment statistics.
+
+        A dropdown selects the report; the counts are read from the summary tables
+        the database keeps up to date, so no enrollments are counted here.
+
+        :returns: None
+        """
+        layout = QVBoxLayout()
+
+        reports_label = QLabel("Reports")
+        reports_label.setStyleSheet("font-size: 16px;")
+        layout.addWidget(reports_label)
+
+        self.report_dropdown = QComboBox()
+        for report, (title, _, _) in REPORTS.items():
+            self.report_dropdown.addItem(title, report)
+        self.report_dropdown.currentIndexChanged.connect(self.load_report)
+        layout.addWidget(self.report_dropdown)
+
+        self.report_table = QTableWidget()
+        self.report_table.setColumnCount(2)
+        self.report_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.report_table)
+
+        rebuild_button = QPushButton("Check and Rebuild")
+        rebuild_button.clicked.connect(self.rebuild_reports)
+        layout.addWidget(rebuild_button)
+
+        back_button = QPushButton("Back to Main Menu")
+        back_button.clicked.connect(self.show_main_menu)
+        layout.addWidget(back_button)
+
+        self.reports_widget.setLayout(layout)
+
+    def load_report(self):
+        """
+        Fills the reports table with the selected report.
+
+        :returns: None
+        """
+        report = self.report_dropdown.currentData()
+        _, _, headers = REPORTS[report]
+        try:
+            rows = read_report(conn, report)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", str(e))
+            return
+        self.report_table.setHorizontalHeaderLabels(list(headers))
+        self.report_table.setRowCount(len(rows))
+        for row_index, row_data in enumerate(rows):
+            for column_index, value in enumerate(row_data):
+                self.report_table.setItem(row_index, column_index, QTableWidgetItem(str(value)))
+
+    @pyqtSlot()
+    @timed_action()
+    def rebuild_reports(self):
+        """
+        Recomputes the summary tables from scratch and reports any counts that were wrong.
+
+        :returns: None
+        """
+        if self.write_queue is not None:
+            self.write_queue.flush()
+        try:
+            mismatches = rebuild(conn)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to rebuild the reports: {str(e)}")
+            return
+        if mismatches:
+            QMessageBox.warning(self, "Reports", f"{len(mismatches)} count(s) were out of date and have been rebuilt.")
+        else:
+            QMessageBox.information(self, "Reports", "All counts were consistent.")
+        self.load_report()
+
     # Search functionality
     def create_search_form(self):
         """
@@ -1024,6 +1537,8 @@ class SchoolManagementApp(QWidget):
         # Set layout for the search widget
         self.search_widget.setLayout(layout)
 
+    @pyqtSlot()
+    @timed_action()
     def perform_search(self):
         """
         Performs a search for students, instructors, or courses based on user input.
@@ -1043,75 +1558,57 @@ class SchoolManagementApp(QWidget):
             return
 
         # Perform search based on category and search_by
-       
+        read_cursor = read_conn.cursor()
         if search_in == "Student": 
             if search_by == "ID":
-                cursor.execute("SELECT * FROM students where student_id = ?;",(search_value,))
-                students = cursor.fetchall()
+                read_cursor.execute("SELECT student_id FROM students where student_id = ?;",(search_value,))
             else:  # Search by Name
-                cursor.execute("SELECT * FROM students where name = ?;",(search_value,))
-                students = cursor.fetchall()
-
-            if students:
-                data=[]
-                for s in students:
-                    cursor.execute("SELECT course_id from student_courses where student_id  = ?",(s[0],))
-                    courses = cursor.fetchall()
-                    data.append((s[0], s[1], s[2], s[3], ', '.join([course[0] for course in courses])))
+                read_cursor.execute("SELECT student_id FROM students where name = ?;",(search_value,))
+            student_ids = [row[0] for row in read_cursor.fetchall()]
 
+            if student_ids:
+                data = fetch_display_rows(read_conn, "student", student_ids)
                 headers = ["Student ID", "Name", "Age", "Email", "Registered Courses"] 
-                self.create_display_table(headers, data,"student") 
+                self.create_display_table(headers, data, "student")
             else:
                 QMessageBox.information(self, "No Results", "No student found.")
 
         elif search_in == "Instructor":
             if search_by == "ID":
-                cursor.execute("SELECT * FROM instructors where instructor_id = ?;",(search_value,))
-                instructors = cursor.fetchall()
+                read_cursor.execute("SELECT instructor_id FROM instructors where instructor_id = ?;",(search_value,))
             else:  # Search by Name
-                cursor.execute("SELECT * FROM instructors where name = ?;",(search_value,))
-                instructors = cursor.fetchall()
-
-            if instructors:
-                    data=[]
-                    for i in instructors:
-                        cursor.execute("SELECT course_id from courses where instructor_id = ?",(i[0],))
-                        courses = cursor.fetchall()
-                    # Prepare the data for display
-                        
-                        data.append((i[0], i[1], i[2], i[3], ', '.join([course[0] for course in courses])))
-                    headers = ["Instructor ID", "Name", "Age", "Email", "Courses Taught"]
-                    self.create_display_table(headers, data,"instructor")
+                read_cursor.execute("SELECT instructor_id FROM instructors where name = ?;",(search_value,))
+            instructor_ids = [row[0] for row in read_cursor.fetchall()]
 
+            if instructor_ids:
+                data = fetch_display_rows(read_conn, "instructor", instructor_ids)
+                headers = ["Instructor ID", "Name", "Age", "Email", "Courses Taught"]
+                self.create_display_table(headers, data, "instructor")
             else:
                 QMessageBox.information(self, "No Results", "No instructor found.")
 
         elif search_in == "Course":
             if search_by == "ID":
-                cursor.execute("SELECT * FROM courses where course_id = ?;",(search_value,))
-                courses = cursor.fetchall()
+                read_cursor.execute("SELECT course_id FROM courses where course_id = ?;",(search_value,))
             else:  # Search by Name
-                cursor.execute("SELECT * FROM courses where course_name = ?;",(search_value,))
-                courses = cursor.fetchall()
-            data=[]
-            if courses:
-                for c in courses:
-                    cursor.execute("SELECT student_id from student_courses where course_id = ?",(c[0],))
-                    students = cursor.fetchall()
-                # Prepare the data for display
-                    data.append((c[0], c[1], c[2], ', '.join([student[0] for student in students])))
+                read_cursor.execute("SELECT course_id FROM courses where course_name = ?;",(search_value,))
+            course_ids = [row[0] for row in read_cursor.fetchall()]
 
+            if course_ids:
+                data = fetch_display_rows(read_conn, "course", course_ids)
                 headers = ["Course ID", "Course Name", "Instructor ID", "Enrolled Students"]
-                self.create_display_table(headers, data,"course")
+                self.create_display_table(headers, data, "course")
             else:
                 QMessageBox.information(self,"No Results", "No course found.")
 
+    @timed_action()
     def save_edit(self, category):
         """
         Saves edits made to a student, instructor, or course record.
 
         Opens an edit dialog for the selected record, allowing users to make changes.
-        After saving, it refreshes the relevant table display.
+        After saving, only the affected rows of the table are patched, through
+        :meth:`on_records_changed`.
 
         :param category: The type of entity being edited (student, instructor, or course).
         :type category: str
@@ -1127,77 +1624,46 @@ class SchoolManagementApp(QWidget):
             QMessageBox.warning(self, "Warning", f"No {category} selected for deletion.")
             return
 
-        selected_data = [item.text() for item in selected_items]
-        dialog = EditDialog(category, selected_data, self)
-        if dialog.exec_() == QDialog.Accepted:
-            if category == "student":
-                self.display_all_students()
-            elif category == "instructor":
-                self.display_all_instructors()
-            elif category == "course":
-                self.display_all_courses()
+        record_id = self.display_table.item(selected_row, 0).text()
+        # Versions first: a write landing before the values are read is then reported as a conflict
+        versions = fetch_versions(conn, category, [record_id])
+        rows = fetch_display_rows(conn, category, [record_id])
+        if record_id not in versions or not rows:
+            QMessageBox.warning(self, "Warning", f"{category.capitalize()} {record_id} no longer exists.")
+            return
+        selected_data = ["" if value is None else str(value) for value in rows[0]]
+        dialog = EditDialog(category, selected_data, self, versions[record_id])
+        dialog.exec_()
 
+    @timed_action()
     def delete_record(self, category):
         """
-        Deletes a student, instructor, or course record.
+        Deletes the selected student, instructor, or course records.
 
-        Prompts the user for confirmation, and if confirmed, deletes the selected record
-        from the database and refreshes the relevant table display.
+        Prompts the user for confirmation, and if confirmed, deletes every selected record
+        in a single transaction. The schema's ON DELETE rules remove their enrollments and
+        detach courses from deleted instructors. Only the deleted rows are removed from the table,
+        through :meth:`on_records_changed`.
 
         :param category: The type of entity being deleted (student, instructor, or course).
         :type category: str
         :raises sqlite3.Error: If there's an issue with database operations.
         :returns: None
         """
-        selected_items = self.display_table.selectedItems()
-        if not selected_items:
-            QMessageBox.warning(self, "Warning", f"No {category} selected for deletion.")
-            return
-        # Get the selected row
-        selected_row = self.display_table.currentRow()
-        if selected_row == -1:  # Check if a row is actually selected
+        selected_rows = sorted({index.row() for index in self.display_table.selectionModel().selectedRows()})
+        if not selected_rows:
             QMessageBox.warning(self, "Warning", f"No {category} selected for deletion.")
             return
-       
-        selected_id = selected_items[0].text()
-       
 
-
-       
-        confirm = QMessageBox.question(self, "Confirm Delete", f"Are you sure you want to delete this {category}?", QMessageBox.Yes | QMessageBox.No)
+        rows_by_id = {self.display_table.item(row, 0).text(): row for row in selected_rows}
+        prompt = f"Are you sure you want to delete this {category}?" if len(rows_by_id) == 1 else f"Are you sure you want to delete these {len(rows_by_id)} {category}s?"
+        confirm = QMessageBox.question(self, "Confirm Delete", prompt, QMessageBox.Yes | QMessageBox.No)
         if confirm == QMessageBox.Yes:
             try:
-                if category == "student":
-                    cursor.execute("DELETE FROM students where student_id = ?",(selected_id,))
-                    conn.commit()
-                elif category == "instructor":
-                    cursor.execute("DELETE FROM instructors where instructor_id = ?",(selected_id,))
-                    conn.commit()
-                elif category == "course":
-                    cursor.execute("DELETE FROM courses where course_id = ?",(selected_id,))
-                    conn.commit()
-                    
-
-                QMessageBox.information(self, "Success", f"{category.capitalize()} deleted successfully!")
-                if category == "student":
-                    self.display_all_students()
-                elif category == "instructor":
-                    self.display_all_instructors()
-                elif category == "course":
-                    self.display_all_courses()
+                changes = backend.delete_records(category, list(rows_by_id))
+                QMessageBox.information(self, "Success", f"{len(changes.deleted.get(category, ()))} {category}(s) deleted successfully!")
             except Exception as e:
                 QMessageBox.critical(self, "Error", str(e))
-       
-    def refresh_courses(self):
-        """
-        Refreshes the course dropdowns for registering students or assigning instructors.
-
-        Reloads available courses into the `assign_course_dropdown` and `register_course_dropdown` widgets.
-
-        :returns: None
-        """
-        self.load_courses_into_dropdown(self.assign_course_dropdown)
-        self.load_courses_into_dropdown(self.register_course_dropdown)
 
     def load_courses_from_db(self):
         """
@@ -1207,15 +1673,17 @@ class SchoolManagementApp(QWidget):
 
         :returns: list[tuple]: A list of course data, including course name, ID, instructor email, instructor ID, and enrolled students.
         """
-        cursor.execute("""
+        read_cursor = read_conn.cursor()
+        read_cursor.execute("""
             SELECT c.course_name, c.course_id, i.email, i.instructor_id,
-            GROUP_CONCAT(sc.student_id) as enrolled_students
+            GROUP_CONCAT(s.student_id) as enrolled_students
             FROM courses c
             LEFT JOIN instructors i ON c.instructor_id = i.instructor_id
-            LEFT JOIN student_courses sc ON sc.course_id = c.course_id
-            GROUP BY c.course_id;
+            LEFT JOIN enrollments e ON e.course_key = c.course_key
+            LEFT JOIN students s ON s.student_key = e.student_key
+            GROUP BY c.course_key;
         """)
-        return cursor.fetchall()
+        return read_cursor.fetchall()
 
     def load_instructors_from_db(self):
         """
@@ -1225,14 +1693,15 @@ class SchoolManagementApp(QWidget):
 
         :returns: list[tuple]: A list of instructor data, including name, age, email, instructor ID, and assigned courses.
         """
-        cursor.execute("""
+        read_cursor = read_conn.cursor()
+        read_cursor.execute("""
             SELECT i.name, i.age, i.email, i.instructor_id,
             GROUP_CONCAT(c.course_id) as assigned_courses
             FROM instructors i
             LEFT JOIN courses c ON c.instructor_id = i.instructor_id
             GROUP BY i.instructor_id;
         """)
-        return cursor.fetchall()
+        return read_cursor.fetchall()
 
     def load_students_from_db(self):
         """
@@ -1242,15 +1711,19 @@ class SchoolManagementApp(QWidget):
 
         :returns: list[tuple]: A list of student data, including name, age, email, student ID, and registered courses.
         """
-        cursor.execute("""
+        read_cursor = read_conn.cursor()
+        read_cursor.execute("""
             SELECT s.name, s.age, s.email, s.student_id,
-            GROUP_CONCAT(sc.course_id) as registered_courses
+            GROUP_CONCAT(c.course_id) as registered_courses
             FROM students s
-            LEFT JOIN student_courses sc ON sc.student_id = s.student_id
-            GROUP BY s.student_id;
+            LEFT JOIN enrollments e ON e.student_key = s.student_key
+            LEFT JOIN courses c ON c.course_key = e.course_key
+            GROUP BY s.student_key;
         """)
-        return cursor.fetchall()
+        return read_cursor.fetchall()
 
+    @pyqtSlot()
+    @timed_action()
     def export_to_csv(self):
         """
         Exports data for students, instructors, and courses to CSV files.
@@ -1315,6 +1788,37 @@ class SchoolManagementApp(QWidget):
             # Show error message if something goes wrong
             self.show_message_box("Error", f"Failed to export data: {str(e)}", QMessageBox.Critical)
 
+    @pyqtSlot()
+    @timed_action()
+    def export_changes(self):
+        """
+        Exports only the rows changed since the last export to CSV files.
+
+        Deleted records are written as tombstones. When there is no previous export
+        or the change log no longer reaches back to it, the user is offered a full
+        export of every table instead, which starts the next delta.
+
+        :returns: None
+        """
+        if self.write_queue is not None:
+            self.write_queue.flush()
+        try:
+            try:
+                paths, from_seq, to_seq = delta_export(conn, "CSV")
+                if paths:
+                    message = f"Exported changes {from_seq + 1} to {to_seq} into {len(paths)} file(s)."
+                else:
+                    message = "No changes since the last export."
+            except LookupError as e:
+                answer = QMessageBox.question(self, "Full Export Needed", f"{e}\n\nExport every table instead?")
+                if answer != QMessageBox.Yes:
+                    return
+                paths, to_seq = full_export(conn, "CSV")
+                message = f"Exported every table up to change {to_seq}."
+            self.show_message_box("Success", message, QMessageBox.Information)
+        except Exception as e:
+            self.show_message_box("Error", f"Failed to export changes: {str(e)}", QMessageBox.Critical)
+
     def export_data(self, filename, data, fieldnames, row_mapper):
         """
         Exports a list of data to a CSV file.
@@ -1371,19 +1875,22 @@ class EditDialog(QDialog):
     :param category: The category of the item to be edited (e.g., "student", "instructor", "course").
     :param data: The original data of the item to be edited, which is displayed in the input fields.
     :param parent: The parent widget for the dialog (default is None).
+    :param version: The row version ``data`` was read at; saving fails if the record changed since.
     """
-    def __init__(self, category, data, parent=None):
+    def __init__(self, category, data, parent=None, version=None):
         """
         Initializes the EditDialog.
 
         :param category: The category of the item to be edited.
         :param data: The original data of the item to be edited.
         :param parent: The parent widget for the dialog.
+        :param version: The row version of the original data.
         """
         super().__init__(parent)
         self.setWindowTitle(f"Edit {category.capitalize()}")
         self.category = category
         self.original_data = data
+        self.version = version
         self.initUI()
 
     def initUI(self):
@@ -1400,22 +1907,17 @@ class EditDialog(QDialog):
 
         # Create and populate fields based on category
         self.fields = {}
-        if self.category == "student":
-            labels = ["Name", "Age", "Email"]
-            indices = [1,2,3]
-        elif self.category == "instructor":
-            labels = ["Name", "Age", "Email"]
-            indices = [1,2,3]
+        if self.category in ("student", "instructor"):
+            columns = [("name", "Name", 1), ("age", "Age", 2), ("email", "Email", 3)]
         elif self.category == "course":
-            labels = ["Course Name"]
-            indices = [1]
+            columns = [("course_name", "Course Name", 1)]
         else:
             QMessageBox.critical(self, "Error", "Unknown category for editing.")
             self.reject()
             return
 
-        for label, index in zip(labels, indices):
-            layout.addRow(QLabel(label), self.create_line_edit(self.original_data[index]))
+        for column, label, index in columns:
+            layout.addRow(QLabel(label), self.create_line_edit(column, self.original_data[index]))
 
         save_button = QPushButton("Save Changes")
         save_button.clicked.connect(self.save_changes)
@@ -1427,24 +1929,28 @@ class EditDialog(QDialog):
 
         self.setLayout(layout)
 
-    def create_line_edit(self, text):
+    def create_line_edit(self, column, text):
         """
         Creates a line edit widget pre-populated with text.
 
+        :param column: The database column the field edits.
         :param text: The text to display in the line edit.
         :return: A QLineEdit widget.
         """
         line_edit = QLineEdit()
         line_edit.setText(text)
-        self.fields[text] = line_edit
+        self.fields[column] = line_edit
         return line_edit
 
+    @pyqtSlot()
+    @timed_action("EditDialog.save_changes")
     def save_changes(self):
         """
          Save the changes made in the dialog and update the database.
 
-        This method validates the input data based on the selected category
-        and updates the corresponding record in the database. Validations include:
+        This method validates the input data with the shared rules in
+        ``lab3_common.validation`` and updates the corresponding record in the
+        database with a single UPDATE. Validations include:
         
         - For students and instructors:
           - Name must be a non-empty string containing only alphabetic characters.
@@ -1452,52 +1958,29 @@ class EditDialog(QDialog):
           - Email must follow a valid format.
         
         - For courses:
-          - Course name must be a non-empty string.
+          - Course name must be a non-empty string of alphabetic characters and spaces.
 
         Displays a success message upon successful update, or an error message 
         if validation fails or an error occurs during the database operation.
 
+        :raises ValidationError: If any field is invalid.
         :raises Exception: If there is an error during the database update.
         :return: None
         """
         try:
-            updated_data = [field.text() for field in self.fields.values()]
-            id = self.original_data[0]
-            if self.category == "student":
-                    name = updated_data[0]
-                    assert (type(name) == str), "Name must be a string" 
-                    assert(name.strip() != ""), "name cannot be empty"
-                    assert re.match(r"^[a-zA-Z\s]+$", name), "Name must contain only alphabetic characters and spaces"
-                    age = int(updated_data[1])
-                    assert (age >= 0), "Age cannot be negative"
-                    email = updated_data[2]
-                    regex = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
-                    assert(re.match(regex, email) is not None), "Wrong email format"
-                    cursor.execute("UPDATE students SET name = ?, age = ?, email = ? where student_id = ?",(name,age,email,id,))
-                    conn.commit()
-            elif self.category == "instructor":
-                    name = updated_data[0]
-                    assert (type(name) == str), "Name must be a string" 
-                    assert(name.strip() != ""), "name cannot be empty"
-                    assert re.match(r"^[a-zA-Z\s]+$", name), "Name must contain only alphabetic characters and spaces"
-                    age = int(updated_data[1])
-                    assert (age >= 0), "Age cannot be negative"
-                    email = updated_data[2]
-                    regex = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
-                    assert(re.match(regex, email) is not None), "Wrong email format"
-                    cursor.execute("UPDATE instructors SET name = ?, age = ?, email = ? where instructor_id = ?",(name,age,email,id,))
-                    conn.commit()
-                   
-            elif self.category == "course":
-                    name = updated_data[0]
-                    assert (type(name) == str), "Name must be a string" 
-                    assert(name.strip() != ""), "name cannot be empty"
-                    assert re.match(r"^[a-zA-Z\s]+$", name), "Name must contain only alphabetic characters and spaces"
-                    cursor.execute("UPDATE courses SET course_name = ? where course_id = ?",(name,id,))
-                    conn.commit()
+            changes = validate(self.category, {column: field.text() for column, field in self.fields.items()},
+                               fields=self.fields.keys())
+            versions = {self.original_data[0]: self.version} if self.version is not None else None
+            backend.update_records(self.category, {self.original_data[0]: changes}, versions)
 
             QMessageBox.information(self, "Success", f"{self.category.capitalize()} updated successfully!")
             self.accept()
+        except ValidationError as e:
+            QMessageBox.warning(self, "Validation Error", str(e))
+        except ConflictError as e:
+            QMessageBox.warning(self, "Edit Conflict", str(e))
+            publish(ChangeSet().upsert(self.category, e.keys))
+            self.reject()
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
 
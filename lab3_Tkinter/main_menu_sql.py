@@ -1,10 +1,37 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
-from tkinter.simpledialog import askstring
+from tkinter.simpledialog import askinteger, askstring
+import os
 import sqlite3
-
-conn = sqlite3.connect('./Database/schoolsystem.sqlite')
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lab3_common import config
+from lab3_common.backup import BackupJob, describe
+from lab3_common.changelog import compact
+from lab3_common.db import connect
+from lab3_common.diagnostics import diagnostics
+from lab3_common.lookup import KeyListModel
+from lab3_common.metrics import metrics, timed_action
+from lab3_common.paging import DISPLAY_COLUMNS, DisplayPager
+from lab3_common.replica import ReadReplica
+from lab3_common.reports import REPORTS, read_report, rebuild
+from lab3_common.service import RemoteStore
+from lab3_common.store import (ChangeSet, ConflictError, LocalStore, add_change_listener, build_insert, fetch_display_rows,
+                               fetch_versions, publish)
+from lab3_common.validation import ValidationError, validate
+from lab3_common.writequeue import GroupCommitQueue
+
+conn = connect(config.DB_PATH)
 cursor = conn.cursor()
+# Sorted IDs per record type for the dropdowns and ID completion, kept up to date on writes
+key_lists = {record_type: KeyListModel(conn, record_type) for record_type in ("student", "instructor", "course")}
+# Optional in-memory read replica serving the listings and searches
+replica = ReadReplica(conn) if config.READ_REPLICA else None
+read_conn = replica.conn if replica is not None else conn
+# Writes run on this connection, or on the shared school service if one is configured
+backend = RemoteStore(config.SERVICE_URL) if config.SERVICE_URL else LocalStore(conn)
 print(conn)
 
 class SchoolManagementApp:
@@ -14,6 +41,13 @@ class SchoolManagementApp:
     This application allows users to add, edit, and manage records of students, instructors,
     and courses, providing an interface for interaction with a SQLite database.
     """
+    # Editable columns per record type: (column, prompt label, Treeview column index)
+    EDIT_FIELDS = {
+        "student": [("name", "name", 1), ("age", "age", 2), ("email", "email", 3)],
+        "instructor": [("name", "name", 1), ("age", "age", 2), ("email", "email", 3)],
+        "course": [("course_name", "name", 1), ("instructor_id", "instructor ID", 2)],
+    }
+
     def __init__(self, root):
         """
         Initializes the School Management Application.
@@ -26,20 +60,258 @@ class SchoolManagementApp:
         self.root = root
         self.root.title("School Management System")
         self.root.geometry("900x600")
-        self.create_menu()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Status bar showing the duration of the last user action
+        self.status_var = tk.StringVar(value="Ready")
+        self.status_bar = tk.Label(self.root, textvariable=self.status_var, anchor="w", relief=tk.SUNKEN)
+        self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        metrics.add_listener(self.show_action_time)
+
+        # Diagnostics mode profiles the next N actions on demand
+        metrics.add_action_hook(diagnostics.capture)
+        diagnostics.add_listener(self.show_capture)
+
+        # Background database backup, polled from the event loop
+        self.backup_job = None
+
+        # Periodic replica sync picks up writes made outside this application
+        if replica is not None and config.REPLICA_SYNC_MS > 0:
+            self.root.after(config.REPLICA_SYNC_MS, self.sync_replica)
+
+        # Screens are built once into this container and raised on navigation
+        self.container = tk.Frame(self.root)
+        self.container.pack(expand=True, fill="both")
+        self.container.grid_rowconfigure(0, weight=1)
+        self.container.grid_columnconfigure(0, weight=1)
+        self.screens = {}
+        self.current_screen = None
+
+        # Record Treeviews with their record type, patched in place when records change
+        self.record_trees = {}
+        add_change_listener(self.on_records_changed)
+
+        # Treeviews still being filled, in chunks between events
+        self.tree_loads = {}
+        self.load_progress = ttk.Progressbar(self.root, mode="determinate")
+
+        # Optional write-behind mode: inserts share one commit per group, which
+        # is committed before any other write; the school service batches
+        # writes itself
+        self.write_queue = None
+        if config.WRITE_BEHIND and not config.SERVICE_URL:
+            self.write_queue = GroupCommitQueue(conn, config.WRITE_BEHIND_BATCH, config.WRITE_BEHIND_DELAY_MS,
+                                                schedule=self.root.after, on_error=self.report_write_error)
+            backend.write_queue = self.write_queue
+
+        self.show_menu()
+
+    def write(self, record_type, record, origin):
+        """
+        Inserts a record, committing it now or queueing the commit in write-behind mode.
+
+        :param record_type: "student", "instructor" or "course".
+        :param record: The validated record.
+        :param origin: The name of the form issuing the write, used in error reports.
+        :return: True if the write was committed, False if its commit was queued.
+        :raises sqlite3.Error: If the statement fails.
+        """
+        if self.write_queue is None:
+            backend.insert_record(record_type, record)
+            return True
+        self.write_queue.submit(build_insert(record_type, tuple(record)), tuple(record.values()), origin,
+                                ChangeSet().upsert(record_type, [record[f"{record_type}_id"]]))
+        return False
+
+    def report_write_error(self, origin, error, count):
+        """
+        Reports queued writes that could not be committed back to the user.
+
+        :param origin: The form the writes came from.
+        :param error: The exception raised by the group commit.
+        :param count: How many writes from that form were lost.
+        :return: None
+        """
+        messagebox.showerror("Save Error", f"{count} record(s) entered in the {origin} form could not be saved: {str(error)}")
+
+    def show_action_time(self, action, elapsed_ms):
+        """
+        Shows the duration of the last user action in the status bar.
+
+        :param action: The name of the action that finished.
+        :param elapsed_ms: How long the action took, in milliseconds.
+        :return: None
+        """
+        self.status_var.set(f"{action}: {elapsed_ms:.1f} ms")
+
+    def show_capture(self, action, prof_path, report_path):
+        """
+        Reports a finished diagnostics capture in the status bar.
+
+        :param action: The name of the profiled action.
+        :param prof_path: The cProfile output file.
+        :param report_path: The top-allocations report file.
+        :return: None
+        """
+        self.status_var.set(f"Captured {action}: {prof_path} ({diagnostics.remaining} capture(s) left)")
+
+    def configure_diagnostics(self):
+        """
+        Asks how many of the next actions to profile with cProfile and tracemalloc.
+
+        Entering 0 turns diagnostics mode off.
+
+        :return: None
+        """
+        count = askinteger("Diagnostics", "Profile how many of the next actions? (0 to turn off)",
+                           initialvalue=diagnostics.remaining or 1, minvalue=0)
+        if count is None:
+            return
+        diagnostics.arm(count)
+        if count:
+            self.status_var.set(f"Diagnostics armed for the next {count} action(s); output in {diagnostics.directory}/")
+        else:
+            self.status_var.set("Diagnostics off")
+
+    def save_metrics(self):
+        """
+        Writes the action latency histograms to JSON and Prometheus text files.
+
+        :return: None
+        """
+        try:
+            json_path = metrics.dump(os.path.join("Metrics", "action_metrics.json"))
+            prom_path = metrics.dump(os.path.join("Metrics", "action_metrics.prom"))
+            messagebox.showinfo("Metrics", f"Metrics written to {json_path} and {prom_path}")
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to write metrics: {str(e)}")
+
+    def sync_replica(self):
+        """
+        Applies changes made outside this application to the read replica and reschedules itself.
+
+        :return: None
+        """
+        try:
+            replica.sync()
+        except sqlite3.Error as e:
+            print(f"An error occurred while syncing the read replica: {e}")
+        self.root.after(config.REPLICA_SYNC_MS, self.sync_replica)
+
+    def start_backup(self):
+        """
+        Starts an online backup of the database in a background thread.
+
+        The application stays usable while the backup runs; its progress is shown
+        in the status bar and the result is reported when it finishes.
+
+        :return: None
+        """
+        if self.backup_job is not None and not self.backup_job.done.is_set():
+            messagebox.showinfo("Backup", "A backup is already running.")
+            return
+        if self.write_queue is not None:
+            self.write_queue.flush()
+        self.backup_job = BackupJob(source_path=config.DB_PATH).start()
+        self.root.after(200, self.poll_backup)
+
+    def poll_backup(self):
+        """
+        Shows the progress of the running backup and reports its result.
+
+        :return: None
+        """
+        job = self.backup_job
+        if not job.done.is_set():
+            self.status_var.set(f"Backup: {job.copied} of {job.total} pages copied")
+            self.root.after(200, self.poll_backup)
+        elif job.error is not None:
+            self.status_var.set("Backup failed")
+            messagebox.showerror("Backup", f"Backup failed: {job.error}")
+        else:
+            self.status_var.set(f"Backup: {job.result.pages_per_second:,.0f} pages/s")
+            messagebox.showinfo("Backup", describe(job.result))
+
+    def on_close(self):
+        """
+        Commits any queued writes, compacts the change log, dumps the action metrics and closes the application.
+
+        :return: None
+        """
+        self.cancel_loads()
+        if self.write_queue is not None:
+            self.write_queue.close()
+        try:
+            compact(conn)
+        except sqlite3.Error as e:
+            print(f"An error occurred while compacting the change log: {e}")
+        try:
+            metrics.dump(os.path.join("Metrics", "action_metrics.json"))
+        except OSError as e:
+            print(f"An error occurred while saving metrics: {e}")
+        self.root.destroy()
+
+    def show_screen(self, name, build, refresh=None):
+        """
+        Brings a screen to the front, building it the first time it is shown.
+
+        Every screen is a frame in the same grid cell of the container. It is built once
+        by ``build`` and afterwards only raised with tkraise; ``refresh`` brings its data
+        up to date (clears the form fields, re-reads the shown records) before it is raised
+        again. Pending layout is done before returning, so timed navigation actions include it.
+        Treeviews still being filled stop loading when another screen is shown.
+
+        :param name: The screen's name.
+        :param build: Called as ``build(screen)`` to create the screen's widgets in the new frame.
+        :param refresh: Called without arguments whenever the built screen is shown again, or None.
+        :return: The screen's frame (tk.Frame).
+        """
+        if name != self.current_screen:
+            self.cancel_loads()
+        screen = self.screens.get(name)
+        if screen is None:
+            screen = self.screens[name] = tk.Frame(self.container)
+            screen.grid(row=0, column=0, sticky="nsew")
+            build(screen)
+        elif refresh is not None:
+            refresh()
+        screen.tkraise()
+        self.current_screen = name
+        self.root.update_idletasks()
+        return screen
+
+    def forget_screens(self):
+        """
+        Destroys the built screens, so each is built again the next time it is shown.
+
+        :return: None
+        """
+        self.cancel_loads()
+        for screen in self.screens.values():
+            screen.destroy()
+        self.screens = {}
+        self.current_screen = None
+        self.record_trees = {}
+
+    def clear_fields(self, *variables):
+        """
+        Empties the given form fields.
 
-    def clear_window(self):
+        :param variables: The tk.StringVar objects of the fields.
+        :return: None
         """
-        Clears the window by destroying all its child widgets.
+        for variable in variables:
+            variable.set("")
 
-        This method iterates over all child widgets of the root window and destroys them.
+    def show_menu(self):
+        """
+        Brings the main menu to the front.
 
         :return: None
         """
-        for widget in self.root.winfo_children():
-            widget.destroy()
-            
-    def create_menu(self):
+        self.show_screen("menu", self.create_menu)
+
+    def create_menu(self, screen):
         """
         Creates the main menu with buttons to add Students, Instructors, and Courses.
 
@@ -47,12 +319,13 @@ class SchoolManagementApp:
         instructors, courses, registering students for courses, assigning instructors to courses, 
         displaying all records, and searching in records.
 
+        :param screen: The frame of the menu screen.
         :return: None
         """
-        title_label = tk.Label(self.root, text="School Management System", font=("Arial", 18, "bold"))
+        title_label = tk.Label(screen, text="School Management System", font=("Arial", 18, "bold"))
         title_label.pack(pady=20)
     
-        menu_frame = tk.Frame(self.root)
+        menu_frame = tk.Frame(screen)
         menu_frame.pack(pady=10)
     
         # Add buttons for adding students, instructors, and courses
@@ -74,39 +347,61 @@ class SchoolManagementApp:
         display_button.pack(side=tk.LEFT, padx=10)
         search_button = tk.Button(menu_frame, text="Search in Records", command=self.create_search_form)
         search_button.pack(side=tk.LEFT, padx=10)
-
+        reports_button = tk.Button(menu_frame, text="Reports", command=self.show_reports)
+        reports_button.pack(side=tk.LEFT, padx=10)
+
+        tools_frame = tk.Frame(screen)
+        tools_frame.pack(pady=10)
+        metrics_button = tk.Button(tools_frame, text="Save Metrics", command=self.save_metrics)
+        metrics_button.pack(side=tk.LEFT, padx=10)
+        diagnostics_button = tk.Button(tools_frame, text="Diagnostics", command=self.configure_diagnostics)
+        diagnostics_button.pack(side=tk.LEFT, padx=10)
+        backup_button = tk.Button(tools_frame, text="Backup", command=self.start_backup)
+        backup_button.pack(side=tk.LEFT, padx=10)
+
+    @timed_action()
     def create_student_form(self):
         """
-        Creates a form to add a new student.
+        Shows the form to add a new student, with its fields cleared.
 
-        This method clears the current window, sets up the form layout, and defines the
-        input fields for student name, age, email, and student ID.
+        :return: None
+        """
+        self.show_screen("student_form", self.build_student_form, lambda: self.clear_fields(
+            self.student_name_var, self.student_age_var, self.student_email_var, self.student_id_var))
+
+    def build_student_form(self, screen):
+        """
+        Creates the form to add a new student.
 
+        This method sets up the form layout and defines the input fields for student
+        name, age, email, and student ID.
+
+        :param screen: The frame of the form's screen.
         :return: None
         """
-        self.clear_window()
-        tk.Label(self.root, text="Add Student", font=("Arial", 16)).pack(pady=10)
+        tk.Label(screen, text="Add Student", font=("Arial", 16)).pack(pady=10)
 
         self.student_name_var = tk.StringVar()
-        self.student_age_var = tk.IntVar()
+        self.student_age_var = tk.StringVar()
         self.student_email_var = tk.StringVar()
         self.student_id_var = tk.StringVar()
 
-        tk.Label(self.root, text="Name:").pack()
-        tk.Entry(self.root, textvariable=self.student_name_var).pack()
+        tk.Label(screen, text="Name:").pack()
+        tk.Entry(screen, textvariable=self.student_name_var).pack()
 
-        tk.Label(self.root, text="Age:").pack()
-        tk.Entry(self.root, textvariable=self.student_age_var).pack()
+        tk.Label(screen, text="Age:").pack()
+        tk.Entry(screen, textvariable=self.student_age_var).pack()
 
-        tk.Label(self.root, text="Email:").pack()
-        tk.Entry(self.root, textvariable=self.student_email_var).pack()
+        tk.Label(screen, text="Email:").pack()
+        tk.Entry(screen, textvariable=self.student_email_var).pack()
 
-        tk.Label(self.root, text="Student ID:").pack()
-        tk.Entry(self.root, textvariable=self.student_id_var).pack()
+        tk.Label(screen, text="Student ID:").pack()
+        tk.Entry(screen, textvariable=self.student_id_var).pack()
 
-        tk.Button(self.root, text="Add Student", command=self.add_student).pack(pady=10)
-        tk.Button(self.root, text="Back to Menu", command=self.back_to_menu).pack(pady=10)
+        tk.Button(screen, text="Add Student", command=self.add_student).pack(pady=10)
+        tk.Button(screen, text="Back to Menu", command=self.back_to_menu).pack(pady=10)
 
+    @timed_action()
     def add_student(self):
         """
         Adds a new student to the database.
@@ -120,42 +415,17 @@ class SchoolManagementApp:
         :return: None
         """
         try:
-            name = self.student_name_var.get().strip()
-            age = self.student_age_var.get().strip()
-            email = self.student_email_var.get().strip()
-            student_id = self.student_id_var.get().strip()
-
-            if not name:
-                raise ValueError("Name cannot be empty!")
-
-            if not age:
-                raise ValueError("Age cannot be empty!")
-
-            try:
-                age_int = int(age)
-                if age_int <= 0:
-                    raise ValueError("Age must be a positive integer!")
-            except ValueError:
-                raise ValueError("Age must be a valid integer!")
-
-            if not email:
-                raise ValueError("Email cannot be empty!")
-
-            if '@' not in email or '.' not in email:
-                raise ValueError("Email format is invalid!")
-
-            if not student_id:
-                raise ValueError("Student ID cannot be empty!")
+            record = validate("student", {
+                "student_id": self.student_id_var.get(),
+                "name": self.student_name_var.get(),
+                "age": self.student_age_var.get(),
+                "email": self.student_email_var.get(),
+            })
 
-            cursor.execute(
-                "INSERT INTO students (student_id, name, age, email) VALUES (?, ?, ?, ?)",
-                (student_id, name, age_int, email)
-            )
-            conn.commit()
+            committed = self.write("student", record, "Add Student")
 
-            messagebox.showinfo("Success", "Student added successfully!")
-            self.clear_window()
-            self.create_menu()
+            messagebox.showinfo("Success", "Student added successfully!" if committed else "Student queued for saving!")
+            self.show_menu()
 
         except ValueError as e:
             messagebox.showerror("Validation Error", str(e))
@@ -163,39 +433,49 @@ class SchoolManagementApp:
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
 
+    @timed_action()
     def create_instructor_form(self):
         """
-        Creates a form to add a new instructor.
+        Shows the form to add a new instructor, with its fields cleared.
 
-        This method clears the current window, sets up a form with fields for
-        instructor name, age, email, and ID, and adds buttons to add the instructor
-        and return to the menu.
+        :return: None
+        """
+        self.show_screen("instructor_form", self.build_instructor_form, lambda: self.clear_fields(
+            self.instructor_name_var, self.instructor_age_var, self.instructor_email_var, self.instructor_id_var))
+
+    def build_instructor_form(self, screen):
+        """
+        Creates the form to add a new instructor.
 
+        This method sets up a form with fields for instructor name, age, email, and ID,
+        and adds buttons to add the instructor and return to the menu.
+
+        :param screen: The frame of the form's screen.
         :return: None
         """
-        self.clear_window()
-        tk.Label(self.root, text="Add Instructor", font=("Arial", 16)).pack(pady=10)
+        tk.Label(screen, text="Add Instructor", font=("Arial", 16)).pack(pady=10)
 
         self.instructor_name_var = tk.StringVar()
-        self.instructor_age_var = tk.IntVar()
+        self.instructor_age_var = tk.StringVar()
         self.instructor_email_var = tk.StringVar()
         self.instructor_id_var = tk.StringVar()
 
-        tk.Label(self.root, text="Name:").pack()
-        tk.Entry(self.root, textvariable=self.instructor_name_var).pack()
+        tk.Label(screen, text="Name:").pack()
+        tk.Entry(screen, textvariable=self.instructor_name_var).pack()
 
-        tk.Label(self.root, text="Age:").pack()
-        tk.Entry(self.root, textvariable=self.instructor_age_var).pack()
+        tk.Label(screen, text="Age:").pack()
+        tk.Entry(screen, textvariable=self.instructor_age_var).pack()
 
-        tk.Label(self.root, text="Email:").pack()
-        tk.Entry(self.root, textvariable=self.instructor_email_var).pack()
+        tk.Label(screen, text="Email:").pack()
+        tk.Entry(screen, textvariable=self.instructor_email_var).pack()
 
-        tk.Label(self.root, text="Instructor ID:").pack()
-        tk.Entry(self.root, textvariable=self.instructor_id_var).pack()
+        tk.Label(screen, text="Instructor ID:").pack()
+        tk.Entry(screen, textvariable=self.instructor_id_var).pack()
 
-        tk.Button(self.root, text="Add Instructor", command=self.add_instructor).pack(pady=10)
-        tk.Button(self.root, text="Back to Menu", command=self.back_to_menu).pack(pady=10)
+        tk.Button(screen, text="Add Instructor", command=self.add_instructor).pack(pady=10)
+        tk.Button(screen, text="Back to Menu", command=self.back_to_menu).pack(pady=10)
 
+    @timed_action()
     def add_instructor(self):
         """
         Adds a new instructor to the database.
@@ -209,42 +489,17 @@ class SchoolManagementApp:
         :return: None
         """
         try:
-            name = self.instructor_name_var.get().strip()
-            age = self.instructor_age_var.get().strip()
-            email = self.instructor_email_var.get().strip()
-            instructor_id = self.instructor_id_var.get().strip()
-
-            if not name:
-                raise ValueError("Name cannot be empty!")
-
-            if not age:
-                raise ValueError("Age cannot be empty!")
-
-            try:
-                age_int = int(age)
-                if age_int <= 0:
-                    raise ValueError("Age must be a positive integer!")
-            except ValueError:
-                raise ValueError("Age must be a valid integer!")
-
-            if not email:
-                raise ValueError("Email cannot be empty!")
-
-            if '@' not in email or '.' not in email:
-                raise ValueError("Invalid email format!")
-
-            if not instructor_id:
-                raise ValueError("Instructor ID cannot be empty!")
+            record = validate("instructor", {
+                "instructor_id": self.instructor_id_var.get(),
+                "name": self.instructor_name_var.get(),
+                "age": self.instructor_age_var.get(),
+                "email": self.instructor_email_var.get(),
+            })
 
-            cursor.execute(
-                "INSERT INTO instructors (instructor_id, name, age, email) VALUES (?, ?, ?, ?)",
-                (instructor_id, name, age_int, email)
-            )
-            conn.commit()
+            committed = self.write("instructor", record, "Add Instructor")
 
-            messagebox.showinfo("Success", "Instructor added successfully!")
-            self.clear_window()
-            self.create_menu()
+            messagebox.showinfo("Success", "Instructor added successfully!" if committed else "Instructor queued for saving!")
+            self.show_menu()
 
         except ValueError as e:
             messagebox.showerror("Validation Error", str(e))
@@ -252,30 +507,41 @@ class SchoolManagementApp:
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
 
+    @timed_action()
     def create_course_form(self):
         """
-        Creates a form to add a new course.
+        Shows the form to add a new course, with its fields cleared.
 
-        This method clears the current window, sets up the form layout, and defines
-        the input fields for course ID and course name.
+        :return: None
+        """
+        self.show_screen("course_form", self.build_course_form,
+                         lambda: self.clear_fields(self.course_id_var, self.course_name_var))
+
+    def build_course_form(self, screen):
+        """
+        Creates the form to add a new course.
 
+        This method sets up the form layout and defines the input fields for course ID
+        and course name.
+
+        :param screen: The frame of the form's screen.
         :return: None
         """
-        self.clear_window()
-        tk.Label(self.root, text="Add Course", font=("Arial", 16)).pack(pady=10)
+        tk.Label(screen, text="Add Course", font=("Arial", 16)).pack(pady=10)
 
         self.course_id_var = tk.StringVar()
         self.course_name_var = tk.StringVar()
 
-        tk.Label(self.root, text="Course ID:").pack()
-        tk.Entry(self.root, textvariable=self.course_id_var).pack()
+        tk.Label(screen, text="Course ID:").pack()
+        tk.Entry(screen, textvariable=self.course_id_var).pack()
 
-        tk.Label(self.root, text="Course Name:").pack()
-        tk.Entry(self.root, textvariable=self.course_name_var).pack()
+        tk.Label(screen, text="Course Name:").pack()
+        tk.Entry(screen, textvariable=self.course_name_var).pack()
 
-        tk.Button(self.root, text="Add Course", command=self.add_course).pack(pady=10)
-        tk.Button(self.root, text="Back to Menu", command=self.back_to_menu).pack(pady=10)
+        tk.Button(screen, text="Add Course", command=self.add_course).pack(pady=10)
+        tk.Button(screen, text="Back to Menu", command=self.back_to_menu).pack(pady=10)
 
+    @timed_action()
     def add_course(self):
         """
         Adds a new course to the database.
@@ -289,70 +555,78 @@ class SchoolManagementApp:
         :return: None
         """
         try:
-            course_id = self.course_id_var.get()
-            course_name = self.course_name_var.get()
-
-            if not course_id or not course_name:
-                raise ValueError("Course ID and Course Name cannot be empty!")
-
-            cursor.execute("INSERT INTO courses (course_id, course_name) VALUES (?, ?)", (course_id, course_name))
-            conn.commit()
-            messagebox.showinfo("Success", "Course added successfully!")
-            self.clear_window()
-            self.create_menu()
+            record = validate("course", {
+                "course_id": self.course_id_var.get(),
+                "course_name": self.course_name_var.get(),
+            })
+
+            committed = self.write("course", record, "Add Course")
+            messagebox.showinfo("Success", "Course added successfully!" if committed else "Course queued for saving!")
+            self.show_menu()
         except ValueError as e:
             messagebox.showerror("Validation Error", str(e))
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
 
-    def load_courses(self):
+    def create_id_dropdown(self, parent, record_type, variable):
         """
-        Loads available courses from the database.
+        Creates an ID field that suggests existing IDs while typing.
 
-        This method executes a query to fetch all course IDs and returns them as a list.
+        The suggestions are the IDs starting with the typed text, looked up in the
+        shared sorted ID list on every key press and whenever the list opens,
+        without querying the database.
 
-        :return: List of course IDs.
-        :raises sqlite3.Error: If an error occurs while accessing the database.
+        :param parent: The widget the field is packed into.
+        :param record_type: The type of the IDs ("student", "instructor", or "course").
+        :param variable: The tk.StringVar holding the typed ID.
+        :return: The dropdown widget (ttk.Combobox).
         """
-        try:
-            cursor.execute("SELECT course_id FROM courses")
-            courses_data = cursor.fetchall() 
+        dropdown = ttk.Combobox(parent, textvariable=variable)
 
-            courses = [course[0] for course in courses_data]  # course[0] is the course_id from the tuple
-            return courses
-        
-        except sqlite3.Error as e:
-            print(f"An error occurred while loading courses: {e}")
-            return []
+        def suggest(event=None):
+            dropdown.configure(values=key_lists[record_type].matching(variable.get()))
 
-        
+        dropdown.configure(postcommand=suggest)
+        dropdown.bind("<KeyRelease>", suggest)
+        suggest()
+        dropdown.pack(pady=10)
+        return dropdown
+
+    @timed_action()
     def create_registration_form(self):
+        """
+        Shows the form for registering a student for a course, with its fields cleared.
+
+        :return: None
+        """
+        self.show_screen("registration_form", self.build_registration_form,
+                         lambda: self.clear_fields(self.registration_student_var, self.registration_course_var))
+
+    def build_registration_form(self, screen):
         """
         Creates a form for students to register for available courses.
 
-        This method clears the current window, sets up the registration form layout,
-        and defines input fields for Student ID and available courses.
+        This method sets up the registration form layout and defines input fields for
+        Student ID and available courses.
 
+        :param screen: The frame of the form's screen.
         :return: None
         """
-        self.clear_window()
-        tk.Label(self.root, text="Register Student for Course", font=("Arial", 16)).pack(pady=10)
-
-        self.student_id_var = tk.StringVar()
-        self.selected_course_var = tk.StringVar()
+        tk.Label(screen, text="Register Student for Course", font=("Arial", 16)).pack(pady=10)
 
-        tk.Label(self.root, text="Student ID:").pack()
-        tk.Entry(self.root, textvariable=self.student_id_var).pack()
+        self.registration_student_var = tk.StringVar()
+        self.registration_course_var = tk.StringVar()
 
-        tk.Label(self.root, text="Select Course:").pack()
-        available_courses = self.load_courses()
+        tk.Label(screen, text="Student ID:").pack()
+        self.create_id_dropdown(screen, "student", self.registration_student_var)
 
-        self.course_dropdown = ttk.Combobox(self.root, textvariable=self.selected_course_var, values=available_courses)
-        self.course_dropdown.pack(pady=10)
+        tk.Label(screen, text="Select Course:").pack()
+        self.create_id_dropdown(screen, "course", self.registration_course_var)
 
-        tk.Button(self.root, text="Register", command=self.register_student_for_course).pack(pady=10)
-        tk.Button(self.root, text="Back to Menu", command=self.back_to_menu).pack(pady=10)
+        tk.Button(screen, text="Register", command=self.register_student_for_course).pack(pady=10)
+        tk.Button(screen, text="Back to Menu", command=self.back_to_menu).pack(pady=10)
     
+    @timed_action()
     def register_student_for_course(self):
         """
         Registers the student for the selected course.
@@ -363,59 +637,56 @@ class SchoolManagementApp:
         :raises Exception: If the student ID or course is invalid or if any other error occurs.
         :return: None
         """
-        student_id = self.student_id_var.get()
-        selected_course = self.selected_course_var.get()
+        student_id = self.registration_student_var.get()
+        selected_course = self.registration_course_var.get()
 
         if not student_id or not selected_course:
             messagebox.showerror("Error", "Both Student ID and Course must be selected!")
             return
         
         try:
-            cursor.execute("SELECT student_id FROM students WHERE student_id = ?", (student_id,))
-            student_data = cursor.fetchone()
-            cursor.execute("SELECT course_id FROM courses WHERE course_id = ?", (selected_course,))
-            course_data = cursor.fetchone()
-
-            if student_data is not None and course_data is not None:
-                cursor.execute("INSERT INTO student_courses (student_id, course_id) VALUES (?, ?);", (student_id, selected_course,))
-                messagebox.showinfo("Success", f"Student {student_id} registered for {selected_course}")
-                conn.commit()
-            else:
-                messagebox.showerror("Error", "Student or course doesn't exist.")
+            backend.enroll_student(student_id, selected_course)
+            messagebox.showinfo("Success", f"Student {student_id} registered for {selected_course}")
 
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
-        self.clear_window()
-        self.create_menu()
+        self.show_menu()
 
+    @timed_action()
     def create_instructor_assignment_form(self):
         """
-        Creates a form for assigning an instructor to a course.
-
-        This method clears the current window, sets up the assignment form layout,
-        and defines input fields for Instructor ID and available courses.
+        Shows the form for assigning an instructor to a course, with its fields cleared.
 
         :return: None
         """
-        self.clear_window()
-        tk.Label(self.root, text="Assign Instructor to Course", font=("Arial", 16)).pack(pady=10)
+        self.show_screen("assignment_form", self.build_instructor_assignment_form,
+                         lambda: self.clear_fields(self.assignment_instructor_var, self.assignment_course_var))
 
-        self.instructor_id_var = tk.StringVar()
-        tk.Label(self.root, text="Enter Instructor ID:").pack()
-        tk.Entry(self.root, textvariable=self.instructor_id_var).pack(pady=10)
+    def build_instructor_assignment_form(self, screen):
+        """
+        Creates a form for assigning an instructor to a course.
 
-        self.selected_course_var = tk.StringVar()
+        This method sets up the assignment form layout and defines input fields for
+        Instructor ID and available courses.
 
-        tk.Label(self.root, text="Select Course:").pack()
-        available_courses = self.load_courses()
+        :param screen: The frame of the form's screen.
+        :return: None
+        """
+        tk.Label(screen, text="Assign Instructor to Course", font=("Arial", 16)).pack(pady=10)
 
-        self.course_dropdown = ttk.Combobox(self.root, textvariable=self.selected_course_var, values=available_courses)
-        self.course_dropdown.pack(pady=10)
+        self.assignment_instructor_var = tk.StringVar()
+        tk.Label(screen, text="Enter Instructor ID:").pack()
+        self.create_id_dropdown(screen, "instructor", self.assignment_instructor_var)
 
-        tk.Button(self.root, text="Assign", command=self.assign_instructor_to_course).pack(pady=10)
-        tk.Button(self.root, text="Back to Menu", command=self.back_to_menu).pack(pady=10)
+        self.assignment_course_var = tk.StringVar()
+        tk.Label(screen, text="Select Course:").pack()
+        self.create_id_dropdown(screen, "course", self.assignment_course_var)
 
+        tk.Button(screen, text="Assign", command=self.assign_instructor_to_course).pack(pady=10)
+        tk.Button(screen, text="Back to Menu", command=self.back_to_menu).pack(pady=10)
+
+    @timed_action()
     def assign_instructor_to_course(self):
         """
         Assigns the manually entered instructor to the selected course.
@@ -427,60 +698,64 @@ class SchoolManagementApp:
         :raises Exception: If any other error occurs during the assignment process.
         :return: None
         """
-        instructor_id = self.instructor_id_var.get()
-        course_id = self.selected_course_var.get()
+        instructor_id = self.assignment_instructor_var.get()
+        course_id = self.assignment_course_var.get()
 
         if not instructor_id or not course_id:
             messagebox.showerror("Error", "Both Instructor ID and Course must be provided!")
             return
 
         try:
-            cursor.execute("SELECT instructor_id FROM instructors WHERE instructor_id = ?", (instructor_id,))
-            instructor_data = cursor.fetchone()
-            cursor.execute("SELECT course_id FROM courses WHERE course_id = ?", (course_id,))
-            course_data = cursor.fetchone()
-
-            if course_data is None:
-                raise ValueError(f"Course with ID '{course_id}' not found.")
-            if instructor_data is None:
-                raise ValueError(f"Instructor with ID '{instructor_id}' not found.")
-
-            cursor.execute("SELECT instructor_id FROM courses WHERE course_id = ?", (course_id,))
-            inst_course = cursor.fetchone()
-
-            if inst_course and inst_course[0] is not None:
-                messagebox.showerror("Error", "Course already has an instructor.")
-            else:
-                cursor.execute("UPDATE courses SET instructor_id = ? WHERE course_id = ?", (instructor_id, course_id,))
-                messagebox.showinfo("Success", f"Instructor {instructor_id} assigned to course {course_id}")
-                conn.commit()
-        
+            backend.assign_instructor(instructor_id, course_id)
+            messagebox.showinfo("Success", f"Instructor {instructor_id} assigned to course {course_id}")
+
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
-        self.clear_window()
-        self.create_menu()
+        self.show_menu()
 
+    @timed_action()
     def display_all_records(self):
         """
         Displays all students, instructors, and courses in a tabular format using a Treeview widget.
 
         This method creates a notebook with three tabs: Students, Instructors, and Courses.
         Each tab contains a Treeview that lists records and provides buttons for editing and deleting.
+        The records are shown one page at a time; clicking a column heading sorts by that column
+        and the entries above the list filter it, both done by the database. The screen is built
+        once; showing it again re-reads the current pages.
+
+        :return: None
+        """
+        self.show_screen("all_records", self.build_all_records, self.reload_pages)
+
+    def reload_pages(self):
+        """
+        Re-reads the current page of every listing on the All Records screen.
 
         :return: None
         """
-        self.clear_window()
-        tk.Label(self.root, text="All Records", font=("Arial", 16)).pack(pady=10)
+        for reload in self.page_reloads:
+            reload()
+
+    def build_all_records(self, screen):
+        """
+        Creates the All Records screen.
 
-        notebook = ttk.Notebook(self.root)
+        :param screen: The frame of the screen.
+        :return: None
+        """
+        tk.Label(screen, text="All Records", font=("Arial", 16)).pack(pady=10)
+
+        notebook = ttk.Notebook(screen)
         notebook.pack(expand=True, fill='both')
+        self.page_reloads = []
 
         # Frame for Students
         student_frame = ttk.Frame(notebook)
         notebook.add(student_frame, text="Students")
         
-        student_tree = ttk.Treeview(student_frame, columns=("ID", "Name", "Age", "Email", "Courses"), show="headings")
+        student_tree = ttk.Treeview(student_frame, columns=("ID", "Name", "Age", "Email", "Courses"), show="headings", selectmode="extended")
         student_tree.heading("ID", text="Student ID")
         student_tree.heading("Name", text="Name")
         student_tree.heading("Age", text="Age")
@@ -488,18 +763,9 @@ class SchoolManagementApp:
         student_tree.heading("Courses", text="Courses")
         student_tree.pack(expand=True, fill="both")
 
-        # Load students data
+        # Load students page
         try:
-            cursor.execute("SELECT * FROM students;")
-            students = cursor.fetchall()
-            
-            for student in students:
-                cursor.execute("SELECT course_id FROM student_courses WHERE student_id = ?", (student[0],))
-                courses = cursor.fetchall()
-                course_ids = [course[0] for course in courses]  # Extract course IDs
-
-                student_tree.insert("", "end", values=(student[0], student[1], student[2], student[3], course_ids))
-
+            self.page_reloads.append(self.create_page_controls(student_frame, student_tree, "student"))
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -513,7 +779,7 @@ class SchoolManagementApp:
         instructor_frame = ttk.Frame(notebook)
         notebook.add(instructor_frame, text="Instructors")
 
-        instructor_tree = ttk.Treeview(instructor_frame, columns=("ID", "Name", "Age", "Email", "Courses"), show="headings")
+        instructor_tree = ttk.Treeview(instructor_frame, columns=("ID", "Name", "Age", "Email", "Courses"), show="headings", selectmode="extended")
         instructor_tree.heading("ID", text="Instructor ID")
         instructor_tree.heading("Name", text="Name")
         instructor_tree.heading("Age", text="Age")
@@ -521,18 +787,9 @@ class SchoolManagementApp:
         instructor_tree.heading("Courses", text="Courses")
         instructor_tree.pack(expand=True, fill="both")
 
-        # Load instructors data
+        # Load instructors page
         try:
-            cursor.execute("SELECT * FROM instructors;")
-            instructors = cursor.fetchall()
-            
-            for instructor in instructors:
-                cursor.execute("SELECT course_id FROM courses WHERE instructor_id = ?", (instructor[0],))
-                courses = cursor.fetchall()
-                course_ids = [course[0] for course in courses]
-
-                instructor_tree.insert("", "end", values=(instructor[0], instructor[1], instructor[2], instructor[3], course_ids))
-
+            self.page_reloads.append(self.create_page_controls(instructor_frame, instructor_tree, "instructor"))
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -546,25 +803,16 @@ class SchoolManagementApp:
         course_frame = ttk.Frame(notebook)
         notebook.add(course_frame, text="Courses")
 
-        course_tree = ttk.Treeview(course_frame, columns=("ID", "Name", "Instructor", "Enrolled Students"), show="headings")
+        course_tree = ttk.Treeview(course_frame, columns=("ID", "Name", "Instructor", "Enrolled Students"), show="headings", selectmode="extended")
         course_tree.heading("ID", text="Course ID")
         course_tree.heading("Name", text="Course Name")
         course_tree.heading("Instructor", text="Instructor ID")
         course_tree.heading("Enrolled Students", text="Enrolled Students")
         course_tree.pack(expand=True, fill="both")
 
-        # Load courses data
+        # Load courses page
         try:
-            cursor.execute("SELECT * FROM courses;")
-            courses = cursor.fetchall()
-            
-            for course in courses:
-                cursor.execute("SELECT student_id FROM student_courses WHERE course_id = ?", (course[0],))
-                students = cursor.fetchall()
-                student_ids = [student[0] for student in students]
-
-                course_tree.insert("", "end", values=(course[0], course[1], course[2], student_ids))
-
+            self.page_reloads.append(self.create_page_controls(course_frame, course_tree, "course"))
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -574,33 +822,313 @@ class SchoolManagementApp:
         tk.Button(course_buttons_frame, text="Edit Course", command=lambda: self.edit_record(course_tree, "course")).pack(side=tk.LEFT, padx=5)
         tk.Button(course_buttons_frame, text="Delete Course", command=lambda: self.delete_record(course_tree, "course")).pack(side=tk.LEFT, padx=5)
 
-        tk.Button(self.root, text="Back to Menu", command=self.back_to_menu).pack(pady=10)
+        tk.Button(screen, text="Back to Menu", command=self.back_to_menu).pack(pady=10)
+
+    def create_page_controls(self, frame, tree, record_type):
+        """
+        Adds sorting, filtering and paging to a listing Treeview and shows its first page.
+
+        Clicking a column heading orders the list by that column, clicking it again reverses
+        the order. A filter entry per column narrows the list to values starting with the
+        entered text (or equal to the entered age) when Return is pressed. The Previous and
+        Next buttons move between pages of config.PAGE_SIZE records.
+
+        :param frame: The frame holding the Treeview.
+        :param tree: The Treeview widget to fill.
+        :param record_type: The type of record shown ("student", "instructor", or "course").
+        :return: A function re-reading and showing the current page.
+        """
+        pager = DisplayPager(read_conn, record_type)
+        columns = tree["columns"][:len(DISPLAY_COLUMNS[record_type])]
+        titles = [tree.heading(column, "text") for column in columns]
+
+        filter_frame = tk.Frame(frame)
+        filter_frame.pack(fill="x", before=tree)
+        entries = {}
+        page_frame = tk.Frame(frame)
+        page_frame.pack(pady=5)
+
+        def show(action=None, *args):
+            if action is not None:
+                try:
+                    action(*args)
+                except Exception as e:
+                    messagebox.showerror("Error", str(e))
+                    return
+            for index, column in enumerate(columns):
+                arrow = (" \u25bc" if pager.descending else " \u25b2") if index == pager.sort else ""
+                tree.heading(column, text=titles[index] + arrow)
+            tree.delete(*tree.get_children())
+            self.show_rows(tree, record_type, pager.rows, reload=lambda: show(pager.load))
+            page_label.config(text=f"Page {pager.page}")
+            previous_button.config(state=tk.NORMAL if pager.page > 1 else tk.DISABLED)
+            next_button.config(state=tk.NORMAL if pager.more else tk.DISABLED)
+
+        def apply_filters(event=None):
+            show(pager.set_filters, {index: entry.get() for index, entry in entries.items()})
+
+        for index, column in enumerate(columns):
+            tree.heading(column, command=lambda index=index: show(pager.sort_by, index))
+            tk.Label(filter_frame, text=titles[index]).pack(side=tk.LEFT, padx=(5, 0))
+            entries[index] = tk.Entry(filter_frame, width=12)
+            entries[index].pack(side=tk.LEFT)
+            entries[index].bind("<Return>", apply_filters)
+        tk.Button(filter_frame, text="Filter", command=apply_filters).pack(side=tk.LEFT, padx=5)
+
+        previous_button = tk.Button(page_frame, text="Previous", command=lambda: show(pager.previous_page))
+        previous_button.pack(side=tk.LEFT, padx=5)
+        page_label = tk.Label(page_frame)
+        page_label.pack(side=tk.LEFT, padx=5)
+        next_button = tk.Button(page_frame, text="Next", command=lambda: show(pager.next_page))
+        next_button.pack(side=tk.LEFT, padx=5)
+        show()
+        return lambda: show(pager.load)
+
+    def show_rows(self, tree, record_type, rows, reload=None):
+        """
+        Inserts display rows into a Treeview and tracks it for incremental updates.
+
+        The rows are inserted in chunks of at most config.TREE_CHUNK_MS: the first chunk right
+        away, so the first rows show with the next redraw, and the others from the event loop,
+        with the progress shown below the screen. A load still running for the same Treeview
+        is cancelled.
+
+        :param tree: The Treeview widget to fill.
+        :param record_type: The type of record shown ("student", "instructor", or "course").
+        :param rows: The display rows; the first value of each row is the record ID.
+        :param reload: For paged listings, re-reads and shows the current page, so newly added
+            records appear where they belong; None for fixed result lists.
+        :return: None
+        """
+        self.cancel_load(tree)
+        pending = {str(row[0]): row for row in rows}
+        self.record_trees[tree] = (record_type, {}, pending, reload)
+        self.tree_loads[tree] = {"rows": rows, "next": 0, "total": len(pending), "job": None}
+        self.insert_chunk(tree)
+
+    def insert_chunk(self, tree):
+        """
+        Inserts pending rows into a Treeview for up to config.TREE_CHUNK_MS and schedules the rest.
+
+        :param tree: The Treeview being filled.
+        :return: None
+        """
+        _, items, pending, _ = self.record_trees[tree]
+        load = self.tree_loads[tree]
+        rows = load["rows"]
+        deadline = time.perf_counter() + config.TREE_CHUNK_MS / 1000
+        while pending and load["next"] < len(rows):
+            record_id = str(rows[load["next"]][0])
+            load["next"] += 1
+            # Rows deleted since the load started are gone from pending, edited ones are replaced there
+            row = pending.pop(record_id, None)
+            if row is not None:
+                items[record_id] = tree.insert("", "end", values=row)
+                if time.perf_counter() >= deadline:
+                    break
+
+        if pending:
+            load["job"] = self.root.after(1, self.insert_chunk, tree)
+        else:
+            del self.tree_loads[tree]
+            if load["job"] is not None:
+                self.status_var.set(f"Loaded {load['total']:,} rows")
+        self.show_load_progress()
+
+    def cancel_load(self, tree):
+        """
+        Stops filling a Treeview; the rows not inserted yet are dropped.
+
+        :param tree: The Treeview being filled.
+        :return: None
+        """
+        load = self.tree_loads.pop(tree, None)
+        if load is None:
+            return
+        if load["job"] is not None:
+            self.root.after_cancel(load["job"])
+        self.record_trees[tree][2].clear()
+        self.show_load_progress()
+
+    def cancel_loads(self):
+        """
+        Stops filling every Treeview, e.g. when the user leaves the screen.
+
+        :return: None
+        """
+        for tree in list(self.tree_loads):
+            self.cancel_load(tree)
+
+    def show_load_progress(self):
+        """
+        Shows how many rows of the running Treeview loads are inserted, or hides the progress bar.
+
+        :return: None
+        """
+        if not self.tree_loads:
+            self.load_progress.pack_forget()
+            return
+        total = sum(load["total"] for load in self.tree_loads.values())
+        loaded = total - sum(len(self.record_trees[tree][2]) for tree in self.tree_loads)
+        self.load_progress.configure(maximum=total, value=loaded)
+        if not self.load_progress.winfo_manager():
+            self.load_progress.pack(side=tk.BOTTOM, fill=tk.X, before=self.container)
+        self.status_var.set(f"Loading rows: {loaded:,} of {total:,}")
+
+    def on_records_changed(self, changes):
+        """
+        Patches the Treeviews of the current screen after a write.
+
+        Only the rows whose primary keys are in the change set are touched: deleted
+        records are removed and changed records are re-read and updated in place, keeping
+        scroll position and selection. New records make a paged listing reload its page.
+        Listings on hidden screens re-read their page when they are shown again. Rows of a
+        Treeview still being filled are patched before they are inserted.
+
+        :param changes: The primary keys touched by the write (lab3_common.store.ChangeSet).
+        :return: None
+        """
+        screen = self.screens.get(self.current_screen)
+        for tree, (record_type, items, pending, reload) in list(self.record_trees.items()):
+            if screen is None or not tree.winfo_exists() or not str(tree).startswith(f"{screen}."):
+                continue
+
+            for record_id in changes.deleted.get(record_type, ()):
+                pending.pop(record_id, None)
+            deleted = [items.pop(record_id) for record_id in changes.deleted.get(record_type, ()) if record_id in items]
+            if deleted:
+                tree.delete(*deleted)
+
+            upserted = changes.upserted.get(record_type)
+            if upserted:
+                rows = fetch_display_rows(conn, record_type, upserted)
+                if reload is not None and any(str(row[0]) not in items and str(row[0]) not in pending for row in rows):
+                    reload()
+                    continue
+                for row in rows:
+                    item = items.get(str(row[0]))
+                    if item is not None:
+                        tree.item(item, values=row)
+                    elif str(row[0]) in pending:
+                        pending[str(row[0])] = row
+
+    @timed_action()
+    def show_reports(self):
+        """
+        Displays the enrollment statistics, one tab per report.
+
+        The counts are read from the summary tables the database keeps up to date,
+        so no enrollments are counted here.
+
+        :return: None
+        """
+        self.show_screen("reports", self.build_reports, self.load_reports)
+
+    def build_reports(self, screen):
+        """
+        Creates the Reports screen with an empty table per report and fills them.
+
+        :param screen: The frame of the screen.
+        :return: None
+        """
+        tk.Label(screen, text="Reports", font=("Arial", 16)).pack(pady=10)
+
+        notebook = ttk.Notebook(screen)
+        notebook.pack(expand=True, fill='both')
+
+        self.report_trees = {}
+        for report, (title, _, headers) in REPORTS.items():
+            frame = ttk.Frame(notebook)
+            notebook.add(frame, text=title)
+            tree = ttk.Treeview(frame, columns=("ID", "Count"), show="headings")
+            tree.heading("ID", text=headers[0])
+            tree.heading("Count", text=headers[1])
+            tree.pack(expand=True, fill="both")
+            self.report_trees[report] = tree
+
+        buttons_frame = tk.Frame(screen)
+        buttons_frame.pack(pady=10)
+        tk.Button(buttons_frame, text="Check and Rebuild", command=self.rebuild_reports).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons_frame, text="Back to Menu", command=self.back_to_menu).pack(side=tk.LEFT, padx=5)
+        self.load_reports()
+
+    def load_reports(self):
+        """
+        Reads the report rows into the tables of the Reports screen.
+
+        :return: None
+        """
+        for report, tree in self.report_trees.items():
+            tree.delete(*tree.get_children())
+            try:
+                for row in read_report(conn, report):
+                    tree.insert("", "end", values=row)
+            except Exception as e:
+                messagebox.showerror("Error", str(e))
+
+    @timed_action()
+    def rebuild_reports(self):
+        """
+        Recomputes the summary tables from scratch and reports any counts that were wrong.
 
+        :return: None
+        """
+        if self.write_queue is not None:
+            self.write_queue.flush()
+        try:
+            mismatches = rebuild(conn)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to rebuild the reports: {str(e)}")
+            return
+        if mismatches:
+            messagebox.showwarning("Reports", f"{len(mismatches)} count(s) were out of date and have been rebuilt.")
+        else:
+            messagebox.showinfo("Reports", "All counts were consistent.")
+        self.load_reports()
+
+    @timed_action()
     def back_to_menu(self):
         """
-        Clears the window and brings back the main menu.
+        Brings back the main menu.
 
-        This method is used to reset the current view and display the main menu.
+        The current screen stays built for the next time it is shown.
 
         :return: None
         """
-        self.clear_window()  
-        self.create_menu() 
+        self.show_menu()
 
+    @timed_action()
     def create_search_form(self):
+        """
+        Shows the search form with its default criteria.
+
+        :return: None
+        """
+        self.show_screen("search_form", self.build_search_form, self.reset_search_form)
+
+    def reset_search_form(self):
+        """
+        Puts the search form back to its default criteria and an empty search term.
+
+        :return: None
+        """
+        self.search_by_var.set("Name")
+        self.search_term_var.set("")
+        self.search_category_var.set("Students")
+
+    def build_search_form(self, screen):
         """
         Creates a search form to filter and display records by name, ID, or course.
 
         This method sets up the search interface, allowing the user to specify search criteria
         and a search term. The user can select which category (students, instructors, courses) to search.
 
+        :param screen: The frame of the form's screen.
         :return: None
         """
-        self.clear_window()
-        
-        tk.Label(self.root, text="Search Records", font=("Arial", 16)).pack(pady=10)
+        tk.Label(screen, text="Search Records", font=("Arial", 16)).pack(pady=10)
 
-        form_frame = tk.Frame(self.root)
+        form_frame = tk.Frame(screen)
         form_frame.pack(pady=10)
 
         search_by_label = tk.Label(form_frame, text="Search by:")
@@ -624,16 +1152,31 @@ class SchoolManagementApp:
         search_category_dropdown = ttk.Combobox(form_frame, textvariable=self.search_category_var, values=["Students", "Instructors", "Courses"])
         search_category_dropdown.grid(row=2, column=1, padx=10, pady=5)
 
-        search_button = tk.Button(self.root, text="Search", command=self.search_records)
+        search_button = tk.Button(screen, text="Search", command=self.search_records)
         search_button.pack(pady=10)
-        tk.Button(self.root, text="Back to Menu", command=self.back_to_menu).pack(pady=10)
+        tk.Button(screen, text="Back to Menu", command=self.back_to_menu).pack(pady=10)
+
+    def build_search_results(self, screen):
+        """
+        Creates the screen showing search results, with an empty Treeview.
+
+        :param screen: The frame of the screen.
+        :return: None
+        """
+        self.result_tree = ttk.Treeview(screen, show="headings")
+        self.result_tree.pack(expand=True, fill="both")
 
+        tk.Button(screen, text="Back to Menu", command=self.back_to_menu).pack(pady=10)
+        tk.Button(screen, text="Search Again", command=self.create_search_form).pack(pady=10)
+
+    @timed_action()
     def search_records(self):
         """
         Filters and displays records based on the search criteria.
 
         This method executes the search based on the selected category and criteria,
-        retrieving relevant records from the database and displaying them in a Treeview.
+        retrieving relevant records from the database and displaying them in the Treeview
+        of the search results screen.
 
         :return: None
         """
@@ -645,8 +1188,10 @@ class SchoolManagementApp:
             messagebox.showerror("Error", "Search term cannot be empty!")
             return
 
-        self.clear_window()
-        result_tree = ttk.Treeview(self.root, show="headings")
+        self.show_screen("search_results", self.build_search_results)
+        result_tree = self.result_tree
+        result_tree.delete(*result_tree.get_children())
+        read_cursor = read_conn.cursor()
 
         if category == "Students":
             result_tree["columns"] = ("ID", "Name", "Age", "Email", "Courses")
@@ -657,22 +1202,11 @@ class SchoolManagementApp:
             result_tree.heading("Courses", text="Courses")
 
             if search_by == "Name":
-                cursor.execute("SELECT * FROM students WHERE name = ?", (search_term,))
-                students = cursor.fetchall()
-                for student in students:
-                    cursor.execute("SELECT course_id FROM student_courses WHERE student_id = ?", (student[0],))
-                    courses = cursor.fetchall()
-                    course_ids = [course[0] for course in courses]
-                    result_tree.insert("", "end", values=(student[0], student[1], student[2], student[3], course_ids))
-
+                read_cursor.execute("SELECT student_id FROM students WHERE name = ?", (search_term,))
             if search_by == "ID":
-                cursor.execute("SELECT * FROM students WHERE student_id = ?", (search_term,))
-                students = cursor.fetchall()
-                for student in students:
-                    cursor.execute("SELECT course_id FROM student_courses WHERE student_id = ?", (student[0],))
-                    courses = cursor.fetchall()
-                    course_ids = [course[0] for course in courses]
-                    result_tree.insert("", "end", values=(student[0], student[1], student[2], student[3], course_ids))
+                read_cursor.execute("SELECT student_id FROM students WHERE student_id = ?", (search_term,))
+            student_ids = [row[0] for row in read_cursor.fetchall()]
+            self.show_rows(result_tree, "student", fetch_display_rows(read_conn, "student", student_ids))
 
         elif category == "Instructors":
             result_tree["columns"] = ("ID", "Name", "Age", "Email", "Assigned Courses")
@@ -683,22 +1217,11 @@ class SchoolManagementApp:
             result_tree.heading("Assigned Courses", text="Assigned Courses")
 
             if search_by == "Name":
-                cursor.execute("SELECT * FROM instructors WHERE name = ?", (search_term,))
-                instructors = cursor.fetchall()
-                for instructor in instructors:
-                    cursor.execute("SELECT course_id FROM courses WHERE instructor_id = ?", (instructor[0],))
-                    courses = cursor.fetchall()
-                    course_ids = [course[0] for course in courses]
-                    result_tree.insert("", "end", values=(instructor[0], instructor[1], instructor[2], instructor[3], course_ids))
-
+                read_cursor.execute("SELECT instructor_id FROM instructors WHERE name = ?", (search_term,))
             if search_by == "ID":
-                cursor.execute("SELECT * FROM instructors WHERE instructor_id = ?", (search_term,))
-                instructors = cursor.fetchall()
-                for instructor in instructors:
-                    cursor.execute("SELECT course_id FROM courses WHERE instructor_id = ?", (instructor[0],))
-                    courses = cursor.fetchall()
-                    course_ids = [course[0] for course in courses]
-                    result_tree.insert("", "end", values=(instructor[0], instructor[1], instructor[2], instructor[3], course_ids))
+                read_cursor.execute("SELECT instructor_id FROM instructors WHERE instructor_id = ?", (search_term,))
+            instructor_ids = [row[0] for row in read_cursor.fetchall()]
+            self.show_rows(result_tree, "instructor", fetch_display_rows(read_conn, "instructor", instructor_ids))
 
         elif category == "Courses":
             result_tree["columns"] = ("ID", "Name", "Instructor", "Enrolled Students")
@@ -708,173 +1231,117 @@ class SchoolManagementApp:
             result_tree.heading("Enrolled Students", text="Enrolled Students")
 
             if search_by == "Name":
-                cursor.execute("SELECT * FROM courses WHERE course_name = ?", (search_term,))
-                courses = cursor.fetchall()
-                for course in courses:
-                    result_tree.insert("", "end", values=(course[0], course[1], course[2], []))  # No enrolled students
-
+                read_cursor.execute("SELECT course_id FROM courses WHERE course_name = ?", (search_term,))
             if search_by == "ID":
-                cursor.execute("SELECT * FROM courses WHERE course_id = ?", (search_term,))
-                courses = cursor.fetchall()
-                for course in courses:
-                    result_tree.insert("", "end", values=(course[0], course[1], course[2], []))  # No enrolled students
+                read_cursor.execute("SELECT course_id FROM courses WHERE course_id = ?", (search_term,))
+            course_ids = [row[0] for row in read_cursor.fetchall()]
+            self.show_rows(result_tree, "course", fetch_display_rows(read_conn, "course", course_ids))
 
-        result_tree.pack(expand=True, fill="both")
-
-        tk.Button(self.root, text="Back to Menu", command=self.back_to_menu).pack(pady=10)
-        tk.Button(self.root, text="Search Again", command=self.create_search_form).pack(pady=10)
 
+    @timed_action()
     def edit_record(self, tree, record_type):
         """
-        Edits a selected record in the specified category (student, instructor, or course).
+        Edits the selected records in the specified category (student, instructor, or course).
 
-        This method prompts the user to enter new details for the selected record. If the user
-        enters 'NA', the current value is retained. Updates are reflected in both the database 
-        and the Treeview.
+        This method prompts the user for new details of every selected record, showing the
+        values currently stored. If the user enters 'NA' or cancels, the current value is
+        retained. All edits are written with one UPDATE per record over only the changed
+        columns, committed in a single transaction, and the affected Treeview rows are patched
+        in place through on_records_changed. If another user changed one of the records while
+        the prompts were open, nothing is saved and the user is asked to try again.
 
         :param tree: The Treeview widget containing the records.
         :param record_type: The type of record to edit ("student", "instructor", or "course").
         :return: None
         """
-        selected_item = tree.selection()
+        selected_items = tree.selection()
 
-        if not selected_item:
+        if not selected_items:
             messagebox.showwarning("No selection", "Please select a record to edit.")
             return
 
-        record_id = tree.item(selected_item, 'values')[0]
-
-        if record_type == "student":
-            try:
-                cursor.execute("SELECT * FROM students WHERE student_id = ?", (record_id,))
-                student_data = cursor.fetchone()
-                
-                if not student_data:
-                    messagebox.showerror("Error", "Student not found.")
-                    return
-
-                current_name, current_age, current_email = student_data[1], student_data[2], student_data[3]
-                
-                new_name = askstring("Edit Student", f"Enter new name (current: {current_name}, enter 'NA' to keep current):")
-                new_age = askstring("Edit Student", f"Enter new age (current: {current_age}, enter 'NA' to keep current):")
-                new_email = askstring("Edit Student", f"Enter new email (current: {current_email}, enter 'NA' to keep current):")
-
-                if new_name and new_name != "NA":
-                    cursor.execute("UPDATE students SET name = ? WHERE student_id = ?", (new_name, record_id))
-                if new_age and new_age != "NA":
-                    try:
-                        cursor.execute("UPDATE students SET age = ? WHERE student_id = ?", (int(new_age), record_id))
-                    except ValueError:
-                        messagebox.showwarning("Invalid Input", "Age must be an integer. No changes made to age.")
-                if new_email and new_email != "NA":
-                    cursor.execute("UPDATE students SET email = ? WHERE student_id = ?", (new_email, record_id))
-
-                conn.commit()
-                tree.item(selected_item, values=(record_id, new_name if new_name != "NA" else current_name, new_age if new_age != "NA" else current_age, new_email if new_email != "NA" else current_email))
-                messagebox.showinfo("Success", "Student updated successfully!")
-
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to edit student: {str(e)}")
-
-        elif record_type == "instructor":
-            try:
-                cursor.execute("SELECT * FROM instructors WHERE instructor_id = ?", (record_id,))
-                instructor_data = cursor.fetchone()
-
-                if not instructor_data:
-                    messagebox.showerror("Error", "Instructor not found.")
-                    return
-
-                current_name, current_age, current_email = instructor_data[1], instructor_data[2], instructor_data[3]
-
-                new_name = askstring("Edit Instructor", f"Enter new name (current: {current_name}, enter 'NA' to keep current):")
-                new_age = askstring("Edit Instructor", f"Enter new age (current: {current_age}, enter 'NA' to keep current):")
-                new_email = askstring("Edit Instructor", f"Enter new email (current: {current_email}, enter 'NA' to keep current):")
-
-                if new_name and new_name != "NA":
-                    cursor.execute("UPDATE instructors SET name = ? WHERE instructor_id = ?", (new_name, record_id))
-                if new_age and new_age != "NA":
-                    try:
-                        cursor.execute("UPDATE instructors SET age = ? WHERE instructor_id = ?", (int(new_age), record_id))
-                    except ValueError:
-                        messagebox.showwarning("Invalid Input", "Age must be an integer. No changes made to age.")
-                if new_email and new_email != "NA":
-                    cursor.execute("UPDATE instructors SET email = ? WHERE instructor_id = ?", (new_email, record_id))
-
-                conn.commit()
-                tree.item(selected_item, values=(record_id, new_name if new_name != "NA" else current_name, new_age if new_age != "NA" else current_age, new_email if new_email != "NA" else current_email))
-                messagebox.showinfo("Success", "Instructor updated successfully!")
-
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to edit instructor: {str(e)}")
-
-        elif record_type == "course":
-            try:
-                cursor.execute("SELECT * FROM courses WHERE course_id = ?", (record_id,))
-                course_data = cursor.fetchone()
-
-                if not course_data:
-                    messagebox.showerror("Error", "Course not found.")
-                    return
-
-                current_name, current_instructor = course_data[1], course_data[2]
-
-                new_name = askstring("Edit Course", f"Enter new name (current: {current_name}, enter 'NA' to keep current):")
-                new_instructor = askstring("Edit Course", f"Enter new instructor ID (current: {current_instructor}, enter 'NA' to keep current):")
-
-                if new_name and new_name != "NA":
-                    cursor.execute("UPDATE courses SET course_name = ? WHERE course_id = ?", (new_name, record_id))
-                if new_instructor and new_instructor != "NA":
-                    cursor.execute("UPDATE courses SET instructor = ? WHERE course_id = ?", (new_instructor, record_id))
+        title = f"Edit {record_type.capitalize()}"
+        changes_by_id = {}
+        record_ids = [str(tree.item(item, 'values')[0]) for item in selected_items]
+        # Versions first: a write landing before the values are read is then reported as a conflict
+        versions = fetch_versions(conn, record_type, record_ids)
+        current_rows = {str(row[0]): row for row in fetch_display_rows(conn, record_type, record_ids)}
+
+        for record_id in record_ids:
+            values = current_rows.get(record_id)
+            if values is None:
+                messagebox.showwarning("Not found", f"{record_type.capitalize()} {record_id} no longer exists.")
+                continue
+            changes = {}
+
+            for column, label, index in self.EDIT_FIELDS[record_type]:
+                current_value = values[index]
+                new_value = askstring(title, f"Enter new {label} for {record_id} (current: {current_value}, enter 'NA' to keep current):")
+
+                if not new_value or new_value == "NA" or new_value == str(current_value):
+                    continue
+                try:
+                    new_value = validate(record_type, {column: new_value}, fields=(column,))[column]
+                except ValidationError as e:
+                    messagebox.showwarning("Invalid Input", f"{str(e)}. No changes made to {label}.")
+                    continue
+
+                changes[column] = new_value
+
+            if changes:
+                changes_by_id[record_id] = changes
+
+        if not changes_by_id:
+            messagebox.showinfo("No changes", f"No {record_type} was changed.")
+            return
 
-                conn.commit()
-                tree.item(selected_item, values=(record_id, new_name if new_name != "NA" else current_name, new_instructor if new_instructor != "NA" else current_instructor))
-                messagebox.showinfo("Success", "Course updated successfully!")
+        try:
+            backend.update_records(record_type, changes_by_id, versions)
+        except ConflictError as e:
+            messagebox.showwarning("Edit Conflict", str(e))
+            publish(ChangeSet().upsert(record_type, e.keys))
+            return
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to edit {record_type}: {str(e)}")
+            return
 
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to edit course: {str(e)}")
+        messagebox.showinfo("Success", f"{len(changes_by_id)} {record_type}(s) updated successfully!")
 
+    @timed_action()
     def delete_record(self, tree, record_type):
         """
-        Deletes a selected record from the specified category (student, instructor, or course).
+        Deletes the selected records from the specified category (student, instructor, or course).
 
-        This method prompts the user for confirmation before proceeding with the deletion. 
-        Upon successful deletion, the record is removed from both the database and the Treeview.
+        This method prompts the user for confirmation before proceeding with the deletion.
+        All selected records are deleted in a single transaction; the schema's ON DELETE rules
+        remove their enrollments and detach courses from deleted instructors. Only the
+        deleted rows are removed from the Treeview, through on_records_changed.
 
         :param tree: The Treeview widget containing the records.
         :param record_type: The type of record to delete ("student", "instructor", or "course").
         :return: None
         """
-        selected_item = tree.selection()
+        selected_items = tree.selection()
 
-        if not selected_item:
+        if not selected_items:
             messagebox.showwarning("No selection", "Please select a record to delete.")
             return
 
-        confirm = messagebox.askyesno("Delete", "Are you sure you want to delete this record?")
+        count = len(selected_items)
+        prompt = "Are you sure you want to delete this record?" if count == 1 else f"Are you sure you want to delete these {count} records?"
+        confirm = messagebox.askyesno("Delete", prompt)
         if not confirm:
             return
 
-        selected_id = tree.item(selected_item, 'values')[0]  
-        
-        try:
-            if record_type == "student":
-                cursor.execute("DELETE from students where student_id = ?", (selected_id,))
-                conn.commit()
+        record_ids = [str(tree.item(item, 'values')[0]) for item in selected_items]
 
-            elif record_type == "instructor":
-                cursor.execute("DELETE from instructors where instructor_id = ?", (selected_id,))
-                conn.commit()
-
-            elif record_type == "course":
-                cursor.execute("DELETE from courses where course_id = ?", (selected_id,))
-                conn.commit()
-        
-            tree.delete(selected_item)
-            messagebox.showinfo("Success", f"{record_type.capitalize()} deleted successfully!")
-        
+        try:
+            changes = backend.delete_records(record_type, record_ids)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to delete {record_type}: {str(e)}")
+            return
+
+        messagebox.showinfo("Success", f"{len(changes.deleted.get(record_type, ()))} {record_type}(s) deleted successfully!")
 
 
 
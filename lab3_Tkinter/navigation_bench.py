@@ -0,0 +1,104 @@
+"""
+Navigation benchmark for the Tkinter application.
+
+Opens the application on a generated throw-away database and walks from
+the menu to every screen and back, several times. For each navigation it
+reports the median time until the screen is laid out and how many widgets
+were created and destroyed on the way. With ``--rebuild`` the built screens
+are destroyed before every navigation, which is what each navigation cost
+when every screen was rebuilt from scratch.
+
+Run ``python -m lab3_Tkinter.navigation_bench`` from the project root; it
+needs a display.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+# Screens reached from the menu, by the method the menu button calls.
+NAVIGATIONS = ("create_student_form", "create_instructor_form", "create_course_form", "create_registration_form",
+               "create_instructor_assignment_form", "display_all_records", "show_reports", "create_search_form")
+
+
+def widget_paths(widget):
+    """
+    Returns the path names of a widget and all its descendants.
+
+    :param widget: The top widget.
+    :return: The path names (set[str]).
+    """
+    paths = {str(widget)}
+    for child in widget.winfo_children():
+        paths |= widget_paths(child)
+    return paths
+
+
+def run(app, rounds, rebuild):
+    """
+    Navigates to every screen and back to the menu, measuring each step.
+
+    :param app: The running SchoolManagementApp.
+    :param rounds: How often every screen is visited.
+    :param rebuild: Destroy the built screens before every navigation.
+    :return: Rows of (navigation, median ms, widgets created, widgets destroyed), counting widgets per visit.
+    """
+    timings, created, destroyed = {}, {}, {}
+    for _ in range(rounds):
+        for name in NAVIGATIONS:
+            for step in (name, "back_to_menu"):
+                app.root.update()
+                before = widget_paths(app.root)
+                start = time.perf_counter()
+                if rebuild:
+                    app.forget_screens()
+                getattr(app, step)()
+                app.root.update()
+                timings.setdefault(step, []).append((time.perf_counter() - start) * 1000)
+                after = widget_paths(app.root)
+                created[step] = created.get(step, 0) + len(after - before)
+                destroyed[step] = destroyed.get(step, 0) + len(before - after)
+    visits = {step: len(values) for step, values in timings.items()}
+    return [(step, f"{statistics.median(values):.2f}", f"{created[step] / visits[step]:.1f}",
+             f"{destroyed[step] / visits[step]:.1f}") for step, values in timings.items()]
+
+
+def main(argv=None):
+    """
+    Command-line entry point.
+
+    :param argv: The arguments; defaults to ``sys.argv[1:]``.
+    :return: None
+    """
+    parser = argparse.ArgumentParser(prog="python -m lab3_Tkinter.navigation_bench",
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, default=2000, help="students in the generated database (default: %(default)s)")
+    parser.add_argument("--rounds", type=int, default=20, help="visits per screen (default: %(default)s)")
+    parser.add_argument("--rebuild", action="store_true", help="build every screen again on every navigation")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The application opens config.DB_PATH when it is imported
+        os.environ["SCHOOL_DB"] = os.path.join(directory, "navigation.sqlite")
+        from lab3_common.bench import populate
+        from lab3_common.console import print_table
+        from lab3_common.db import connect
+        conn = connect()
+        populate(conn, args.students)
+        conn.close()
+
+        import tkinter as tk
+        from lab3_Tkinter import main_menu_sql
+        root = tk.Tk()
+        app = main_menu_sql.SchoolManagementApp(root)
+        try:
+            rows = run(app, args.rounds, args.rebuild)
+        finally:
+            root.destroy()
+            main_menu_sql.conn.close()
+    print_table(["navigation", "p50 ms", "widgets created", "widgets destroyed"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""
+Archiving closed terms' enrollments into per-term database files.
+
+The live database keeps only the enrollments of running terms, so its
+tables and indexes stop growing with every term taught. :func:`close_term`
+moves the enrollments of a term's courses, and optionally the students
+left without any enrollment, into a file of their own in
+:data:`config.ARCHIVE_DIR`; the courses stay live, and a copy of them is
+kept with the term. :func:`restore_term` moves a term back.
+
+Both attach the term file to the live connection with ``ATTACH`` and copy
+and delete in one transaction; in SQLite's default rollback-journal mode
+the commit is atomic across both files. The archived rows are keyed by
+student and course ID, as surrogate keys are local to each file.
+
+The live tables and the GUIs never look at the archives.
+:func:`enrollment_history` answers the historical questions, attaching one
+term file after the other and reading it next to the live enrollments.
+
+Run ``python -m lab3_common.archive close TERM COURSE_ID...`` from the
+project root to close a term, ``restore TERM`` to bring it back,
+``history --student ID`` or ``--course ID`` to list enrollments across all
+terms, and ``list`` to list the archived terms.
+"""
+import argparse
+import glob
+import os
+import re
+import sqlite3
+import time
+from collections import namedtuple
+
+from lab3_common import config
+from lab3_common.console import print_table
+from lab3_common.db import connect
+from lab3_common.schema import execute_statements
+from lab3_common.store import chunked
+
+ArchiveResult = namedtuple("ArchiveResult", ["path", "enrollments", "students", "seconds"])
+
+# Alias of the attached term file.
+ARCHIVE_SCHEMA_NAME = "archive"
+
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive.courses (
+    course_id      TEXT PRIMARY KEY,
+    course_name    TEXT NOT NULL,
+    instructor_id  TEXT
+);
+
+CREATE TABLE IF NOT EXISTS archive.students (
+    student_id  TEXT PRIMARY KEY,
+    name        TEXT NOT NULL,
+    age         INTEGER,
+    email       TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS archive.student_courses (
+    student_id  TEXT NOT NULL,
+    course_id   TEXT NOT NULL,
+    PRIMARY KEY (student_id, course_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS archive.idx_student_courses_course ON student_courses (course_id, student_id);
+"""
+
+
+def archive_path(term, source_path=None, directory=None):
+    """
+    Returns the file a term of a database is archived in.
+
+    :param term: The term's name, e.g. "2024-fall"; letters, digits, "_" and "-" only.
+    :param source_path: The live database file; defaults to :data:`config.DB_PATH`.
+    :param directory: The archive directory; defaults to :data:`config.ARCHIVE_DIR`.
+    :returns: The path.
+    :rtype: str
+    :raises ValueError: If the term name is not usable in a file name.
+    """
+    if not re.fullmatch(r"[\w-]+", term):
+        raise ValueError(f"Invalid term name '{term}': use letters, digits, '_' and '-' only")
+    name = os.path.splitext(os.path.basename(source_path or config.DB_PATH))[0]
+    return os.path.join(directory or config.ARCHIVE_DIR, f"{name}_{term}.sqlite")
+
+
+def archived_terms(source_path=None, directory=None):
+    """
+    Lists the archived terms of a database.
+
+    :param source_path: The live database file; defaults to :data:`config.DB_PATH`.
+    :param directory: The archive directory; defaults to :data:`config.ARCHIVE_DIR`.
+    :returns: Mapping of term name to file, in name order.
+    :rtype: dict
+    """
+    prefix = os.path.splitext(os.path.basename(source_path or config.DB_PATH))[0] + "_"
+    pattern = os.path.join(glob.escape(directory or config.ARCHIVE_DIR), glob.escape(prefix) + "*.sqlite")
+    return {os.path.basename(path)[len(prefix):-len(".sqlite")]: path for path in sorted(glob.glob(pattern))}
+
+
+def database_path(conn):
+    """
+    Returns the file of a connection's main database.
+
+    :param conn: The database connection.
+    :returns: The path; empty for an in-memory database.
+    :rtype: str
+    """
+    return next(row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main")
+
+
+def attach(conn, path):
+    """
+    Attaches a term file as :data:`ARCHIVE_SCHEMA_NAME`, creating its tables if missing.
+
+    :param conn: The database connection, outside a transaction.
+    :param path: The term file.
+    :returns: None
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA_NAME}", (path,))
+    with conn:
+        execute_statements(conn, ARCHIVE_SCHEMA)
+
+
+def detach(conn):
+    """
+    Detaches the term file attached by :func:`attach`.
+
+    :param conn: The database connection.
+    :returns: None
+    """
+    conn.execute(f"DETACH DATABASE {ARCHIVE_SCHEMA_NAME}")
+
+
+def close_term(conn, term, course_ids, students=False, directory=None):
+    """
+    Moves the enrollments of a term's courses into the term's file.
+
+    Running it again for the same term adds to the file, e.g. for a course
+    forgotten the first time.
+
+    :param conn: The connection to the live database, outside a transaction.
+    :param term: The term's name, see :func:`archive_path`.
+    :param course_ids: The IDs of the term's courses.
+    :param students: Also move the students enrolled in the term who are
+        left without any live enrollment.
+    :param directory: The archive directory; defaults to :data:`config.ARCHIVE_DIR`.
+    :returns: The file and the numbers of enrollments and students moved.
+    :rtype: ArchiveResult
+    :raises ValueError: If the term name is invalid or a course does not exist.
+    :raises sqlite3.Error: If the move fails; nothing is moved then.
+    """
+    path = archive_path(term, database_path(conn), directory)
+    course_ids = sorted(set(course_ids))
+    known = set()
+    for chunk in chunked(course_ids):
+        known.update(row[0] for row in conn.execute(
+            f"SELECT course_id FROM courses WHERE course_id IN ({', '.join('?' * len(chunk))})", chunk))
+    missing = [course_id for course_id in course_ids if course_id not in known]
+    if missing:
+        raise ValueError(f"Unknown course ID(s): {', '.join(missing[:10])}")
+
+    start = time.perf_counter()
+    created = not os.path.exists(path)
+    moved_all = False
+    attach(conn, path)
+    try:
+        with conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS term_courses (course_key INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM temp.term_courses")
+            for chunk in chunked(course_ids):
+                conn.execute(f"INSERT INTO temp.term_courses SELECT course_key FROM main.courses "
+                             f"WHERE course_id IN ({', '.join('?' * len(chunk))})", chunk)
+            conn.execute("""
+                INSERT OR REPLACE INTO archive.courses (course_id, course_name, instructor_id)
+                SELECT course_id, course_name, instructor_id FROM main.courses
+                WHERE course_key IN (SELECT course_key FROM temp.term_courses)
+            """)
+            conn.execute("""
+                INSERT OR IGNORE INTO archive.student_courses (student_id, course_id)
+                SELECT s.student_id, c.course_id
+                FROM temp.term_courses t
+                JOIN main.enrollments e ON e.course_key = t.course_key
+                JOIN main.courses c ON c.course_key = t.course_key
+                JOIN main.students s ON s.student_key = e.student_key
+            """)
+            enrollments = conn.execute("""
+                DELETE FROM main.enrollments WHERE course_key IN (SELECT course_key FROM temp.term_courses)
+            """).rowcount
+            moved = 0
+            if students:
+                inactive = """
+                    SELECT s.student_key FROM main.students s
+                    WHERE s.student_id IN (SELECT student_id FROM archive.student_courses)
+                      AND NOT EXISTS (SELECT 1 FROM main.enrollments e WHERE e.student_key = s.student_key)
+                """
+                conn.execute(f"""
+                    INSERT OR REPLACE INTO archive.students (student_id, name, age, email)
+                    SELECT student_id, name, age, email FROM main.students WHERE student_key IN ({inactive})
+                """)
+                moved = conn.execute(f"DELETE FROM main.students WHERE student_key IN ({inactive})").rowcount
+            conn.execute("DELETE FROM temp.term_courses")
+        moved_all = True
+    finally:
+        detach(conn)
+        # A failed first close leaves no empty term file behind
+        if created and not moved_all and os.path.exists(path):
+            os.remove(path)
+    return ArchiveResult(path, enrollments, moved, time.perf_counter() - start)
+
+
+def restore_term(conn, term, directory=None):
+    """
+    Moves a term's enrollments and students back into the live database and deletes its file.
+
+    Students whose ID was taken again in the meantime keep the live record.
+
+    :param conn: The connection to the live database, outside a transaction.
+    :param term: The term's name.
+    :param directory: The archive directory; defaults to :data:`config.ARCHIVE_DIR`.
+    :returns: The deleted file and the numbers of enrollments and students restored.
+    :rtype: ArchiveResult
+    :raises ValueError: If the term is not archived, one of its courses was
+        deleted, or one of its students is archived with a later term.
+    :raises sqlite3.IntegrityError: If a restored student's email is taken; nothing is restored then.
+    """
+    path = archive_path(term, database_path(conn), directory)
+    if not os.path.exists(path):
+        raise ValueError(f"Term '{term}' is not archived")
+
+    start = time.perf_counter()
+    attach(conn, path)
+    try:
+        missing = [row[0] for row in conn.execute("""
+            SELECT course_id FROM archive.courses a
+            WHERE NOT EXISTS (SELECT 1 FROM main.courses c WHERE c.course_id = a.course_id)
+        """)]
+        if missing:
+            raise ValueError(f"Course(s) of term '{term}' no longer exist: {', '.join(missing[:10])}")
+        # Students are moved with the last term they were enrolled in
+        missing = [row[0] for row in conn.execute("""
+            SELECT DISTINCT student_id FROM archive.student_courses a
+            WHERE NOT EXISTS (SELECT 1 FROM main.students s WHERE s.student_id = a.student_id)
+              AND NOT EXISTS (SELECT 1 FROM archive.students s WHERE s.student_id = a.student_id)
+            LIMIT 10
+        """)]
+        if missing:
+            raise ValueError(f"Student(s) of term '{term}' are archived with a later term, restore it first: "
+                             f"{', '.join(missing)}")
+        with conn:
+            students = conn.execute("""
+                INSERT INTO main.students (student_id, name, age, email)
+                SELECT student_id, name, age, email FROM archive.students a
+                WHERE NOT EXISTS (SELECT 1 FROM main.students s WHERE s.student_id = a.student_id)
+            """).rowcount
+            enrollments = conn.execute("""
+                INSERT OR IGNORE INTO main.enrollments (student_key, course_key)
+                SELECT s.student_key, c.course_key
+                FROM archive.student_courses a
+                JOIN main.students s ON s.student_id = a.student_id
+                JOIN main.courses c ON c.course_id = a.course_id
+            """).rowcount
+    finally:
+        detach(conn)
+    os.remove(path)
+    return ArchiveResult(path, enrollments, students, time.perf_counter() - start)
+
+
+def enrollment_history(conn, student_id=None, course_id=None, directory=None):
+    """
+    Lists the enrollments of a student or a course in the live database and every archived term.
+
+    :param conn: The connection to the live database, outside a transaction.
+    :param student_id: The student whose enrollments are listed...
+    :param course_id: ...or the course whose enrollments are listed.
+    :param directory: The archive directory; defaults to :data:`config.ARCHIVE_DIR`.
+    :returns: Rows of ``(term, student_id, course_id, course_name)``; the
+        term is None for live enrollments, which come first.
+    :rtype: list[tuple]
+    :raises ValueError: If neither or both IDs are given.
+    """
+    if (student_id is None) == (course_id is None):
+        raise ValueError("Give either a student ID or a course ID")
+    column, value = ("student_id", student_id) if student_id is not None else ("course_id", course_id)
+    rows = [(None, *row) for row in conn.execute(f"""
+        SELECT sc.student_id, sc.course_id, c.course_name
+        FROM student_courses sc JOIN courses c ON c.course_id = sc.course_id
+        WHERE sc.{column} = ? ORDER BY sc.student_id, sc.course_id
+    """, (value,))]
+    for term, path in archived_terms(database_path(conn), directory).items():
+        attach(conn, path)
+        try:
+            rows += [(term, *row) for row in conn.execute(f"""
+                SELECT sc.student_id, sc.course_id, c.course_name
+                FROM archive.student_courses sc JOIN archive.courses c ON c.course_id = sc.course_id
+                WHERE sc.{column} = ? ORDER BY sc.student_id, sc.course_id
+            """, (value,))]
+        finally:
+            detach(conn)
+    return rows
+
+
+def describe(result, action):
+    """
+    Formats an archive or restore result for messages.
+
+    :param result: The :class:`ArchiveResult`.
+    :param action: "Archived" or "Restored".
+    :returns: A one-line summary.
+    :rtype: str
+    """
+    rate = result.enrollments / result.seconds if result.seconds else 0
+    return (f"{action} {result.enrollments} enrollment(s) and {result.students} student(s) in "
+            f"{result.seconds:.2f} s ({rate:,.0f} enrollments/s), {result.path}")
+
+
+def main(argv=None):
+    """
+    Command-line entry point.
+
+    :param argv: The arguments; defaults to ``sys.argv[1:]``.
+    :returns: None
+    """
+    parser = argparse.ArgumentParser(prog="python -m lab3_common.archive", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=config.DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--dir", default=config.ARCHIVE_DIR, help="archive directory (default: %(default)s)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    close = subparsers.add_parser("close", help="move a term's enrollments into its archive file")
+    close.add_argument("term")
+    close.add_argument("course_ids", nargs="+", metavar="COURSE_ID")
+    close.add_argument("--students", action="store_true", help="also move students left without enrollments")
+    restore = subparsers.add_parser("restore", help="move an archived term back into the database")
+    restore.add_argument("term")
+    history = subparsers.add_parser("history", help="list enrollments across the database and all archived terms")
+    key = history.add_mutually_exclusive_group(required=True)
+    key.add_argument("--student", help="student ID")
+    key.add_argument("--course", help="course ID")
+    subparsers.add_parser("list", help="list the archived terms")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.exit(2, f"Database {args.db} does not exist\n")
+    if args.command == "list":
+        for term, path in archived_terms(args.db, args.dir).items():
+            print(f"{term}\t{path}")
+        return
+    conn = connect(args.db)
+    try:
+        if args.command == "close":
+            print(describe(close_term(conn, args.term, args.course_ids, args.students, args.dir), "Archived"))
+        elif args.command == "restore":
+            print(describe(restore_term(conn, args.term, args.dir), "Restored"))
+        else:
+            print_table(["term", "student", "course", "course name"],
+                        [(term or "current", *row) for term, *row in
+                         enrollment_history(conn, args.student, args.course, args.dir)])
+    except (ValueError, sqlite3.Error) as e:
+        parser.exit(1, f"{e}\n")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Online backups of the school database.
+
+:func:`backup_database` copies the database with SQLite's backup API a
+few pages at a time, sleeping between steps so the applications keep
+reading and writing meanwhile. The copy is written to a temporary file
+and checked with ``PRAGMA quick_check`` before it is renamed into place,
+and the oldest backups beyond the retention count are deleted.
+:class:`BackupJob` runs the same in a background thread for the GUIs.
+
+Run ``python -m lab3_common.backup`` from the project root to back up from
+the command line.
+"""
+import argparse
+import glob
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from lab3_common import config
+
+BackupResult = namedtuple("BackupResult", ["path", "pages", "seconds", "pages_per_second", "deleted"])
+
+
+class BackupError(RuntimeError):
+    """
+    Raised when a backup copy fails its integrity check.
+    """
+
+
+def backup_pattern(source_path, directory):
+    """
+    Returns the glob pattern matching the backups of a database.
+
+    :param source_path: The database file.
+    :param directory: The backup directory.
+    :returns: The pattern.
+    :rtype: str
+    """
+    name = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(directory, f"{name}_*.sqlite")
+
+
+def rotate_backups(source_path, directory, keep):
+    """
+    Deletes the oldest backups of a database beyond the retention count.
+
+    Backup names embed their timestamp, so name order is age order.
+
+    :param source_path: The database file.
+    :param directory: The backup directory.
+    :param keep: How many backups to keep; 0 keeps all.
+    :returns: The deleted files.
+    :rtype: list[str]
+    """
+    if not keep:
+        return []
+    backups = sorted(glob.glob(backup_pattern(source_path, directory)))
+    deleted = backups[:-keep]
+    for path in deleted:
+        os.remove(path)
+    return deleted
+
+
+def backup_database(source_path=None, directory=None, keep=None, pages=None, sleep_ms=None, progress=None):
+    """
+    Copies a database into a new timestamped backup file.
+
+    The copy is taken through a separate connection with
+    :meth:`sqlite3.Connection.backup`, ``pages`` pages per step with
+    ``sleep_ms`` between steps; if another connection writes meanwhile,
+    SQLite restarts the copy so the result is always consistent. It is
+    written to a temporary file, verified with ``PRAGMA quick_check`` and
+    only then renamed into place.
+
+    :param source_path: The database file; defaults to :data:`config.DB_PATH`.
+    :param directory: The backup directory; defaults to :data:`config.BACKUP_DIR`.
+    :param keep: How many backups to keep; defaults to :data:`config.BACKUP_KEEP`.
+    :param pages: Pages copied per step; defaults to :data:`config.BACKUP_PAGES`.
+    :param sleep_ms: Pause between steps; defaults to :data:`config.BACKUP_SLEEP_MS`.
+    :param progress: Optional callable ``progress(copied, total)`` called after each step.
+    :returns: The backup file, its page count, duration, pages copied per second
+        (including pages copied again after a restart) and rotated-out files.
+    :rtype: BackupResult
+    :raises BackupError: If the copy fails ``quick_check``.
+    """
+    source_path = source_path or config.DB_PATH
+    directory = directory or config.BACKUP_DIR
+    keep = config.BACKUP_KEEP if keep is None else keep
+    pages = pages or config.BACKUP_PAGES
+    sleep_ms = config.BACKUP_SLEEP_MS if sleep_ms is None else sleep_ms
+
+    os.makedirs(directory, exist_ok=True)
+    name = os.path.splitext(os.path.basename(source_path))[0]
+    path = os.path.join(directory, f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.sqlite")
+    partial_path = path + ".partial"
+
+    # Pages copied by all steps, counting those SQLite copies again when a
+    # write restarts the backup, so the rate reflects the work done.
+    copied = 0
+    last_remaining = None
+
+    def report(status, remaining, total):
+        nonlocal copied, last_remaining
+        if last_remaining is not None and remaining < last_remaining:
+            copied += last_remaining - remaining
+        else:
+            copied += total - remaining
+        last_remaining = remaining
+        if progress is not None:
+            progress(total - remaining, total)
+
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(partial_path)
+    try:
+        start = time.perf_counter()
+        source.backup(target, pages=pages, progress=report, sleep=sleep_ms / 1000)
+        seconds = time.perf_counter() - start
+        page_count = target.execute("PRAGMA page_count").fetchone()[0]
+        check = [row[0] for row in target.execute("PRAGMA quick_check")]
+    finally:
+        target.close()
+        source.close()
+
+    if check != ["ok"]:
+        os.remove(partial_path)
+        raise BackupError(f"Backup failed quick_check: {'; '.join(check[:5])}")
+    os.replace(partial_path, path)
+    deleted = rotate_backups(source_path, directory, keep)
+    return BackupResult(path, page_count, seconds, copied / seconds if seconds else float(copied), deleted)
+
+
+class BackupJob:
+    """
+    Runs :func:`backup_database` in a background thread.
+
+    The GUIs poll the job from their event loop instead of being called
+    from the worker thread: ``copied``/``total`` show the progress, and
+    once ``done`` is set either ``result`` or ``error`` is filled in.
+
+    :param kwargs: Passed to :func:`backup_database`.
+    """
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.copied = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="backup", daemon=True)
+
+    def start(self):
+        """
+        Starts the backup thread.
+
+        :returns: This job.
+        :rtype: BackupJob
+        """
+        self.thread.start()
+        return self
+
+    def run(self):
+        """
+        Thread body: runs the backup and records its outcome.
+
+        :returns: None
+        """
+        try:
+            self.result = backup_database(progress=self.on_progress, **self.kwargs)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+    def on_progress(self, copied, total):
+        """
+        Records the progress reported by the backup API.
+
+        :param copied: Pages copied so far.
+        :param total: Pages in the database.
+        :returns: None
+        """
+        self.copied = copied
+        self.total = total
+
+
+def describe(result):
+    """
+    Formats a backup result for messages.
+
+    :param result: The :class:`BackupResult`.
+    :returns: A one-line summary.
+    :rtype: str
+    """
+    return (f"Backed up {result.pages} pages in {result.seconds:.2f} s "
+            f"({result.pages_per_second:,.0f} pages/s) to {result.path}")
+
+
+def main(argv=None):
+    """
+    Command-line entry point.
+
+    :param argv: The arguments; defaults to ``sys.argv[1:]``.
+    :returns: None
+    """
+    parser = argparse.ArgumentParser(prog="python -m lab3_common.backup", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=config.DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--dir", default=config.BACKUP_DIR, help="backup directory (default: %(default)s)")
+    parser.add_argument("--keep", type=int, default=config.BACKUP_KEEP, help="backups to keep, 0 for all (default: %(default)s)")
+    parser.add_argument("--pages", type=int, default=config.BACKUP_PAGES, help="pages per step (default: %(default)s)")
+    parser.add_argument("--sleep-ms", type=int, default=config.BACKUP_SLEEP_MS, help="pause between steps (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.exit(2, f"Database {args.db} does not exist\n")
+    try:
+        result = backup_database(args.db, args.dir, args.keep, args.pages, args.sleep_ms)
+    except BackupError as e:
+        parser.exit(1, f"{e}\n")
+    print(describe(result))
+    for path in result.deleted:
+        print(f"  removed old backup {path}")
+
+
+if __name__ == "__main__":
+    main()
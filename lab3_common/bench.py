@@ -0,0 +1,733 @@
+"""
+Benchmarks for the school database.
+
+Run ``python -m lab3_common.bench <name>`` from the project root; every
+benchmark works on throw-away database files in a temporary directory.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from lab3_common import config
+from lab3_common.archive import close_term, restore_term
+from lab3_common.console import print_table
+from lab3_common.db import connect
+from lab3_common.enrollment import ALREADY_ENROLLED, ENROLLED, NOT_FOUND, EnrollmentEngine
+from lab3_common.lookup import SUGGESTION_LIMIT, SortedKeys
+from lab3_common.paging import fetch_display_page, page_cursor
+from lab3_common.replica import ReadReplica
+from lab3_common.roster import set_rosters
+from lab3_common.schema import create_schema, migrate
+from lab3_common.store import (DISPLAY_KEYS, DISPLAY_QUERIES, ConflictError, LocalStore, fetch_display_rows,
+                                fetch_versions, is_busy, retry_counts)
+from lab3_common.sync import SYNC_COLUMNS, apply, diff, update_tree
+from lab3_common.writequeue import GroupCommitQueue, set_durability
+
+
+def make_database(path, journal_mode="delete", durability="full"):
+    """
+    Creates an empty school database for a benchmark run.
+
+    :param path: The database file to create.
+    :param journal_mode: The SQLite journal mode, e.g. "delete" or "wal".
+    :param durability: "full", "normal" or "off".
+    :returns: An open connection.
+    :rtype: sqlite3.Connection
+    """
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    set_durability(conn, durability)
+    create_schema(conn)
+    conn.commit()
+    return conn
+
+
+def bench_inserts(count=1000, batch=50):
+    """
+    Measures student inserts per second under each durability setting.
+
+    Every combination of journal mode and ``PRAGMA synchronous`` level is
+    run twice: committing after each insert, as the forms do by default,
+    and through :class:`GroupCommitQueue` with groups of ``batch`` writes.
+
+    :param count: Inserts per run.
+    :param batch: Group size for the group-commit runs.
+    :returns: Rows of (journal, durability, mode, inserts per second).
+    :rtype: list[tuple]
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        run = 0
+        for journal_mode in ("delete", "wal"):
+            for durability in ("full", "normal", "off"):
+                for mode, group_size in (("commit per insert", 1), (f"group commit x{batch}", batch)):
+                    run += 1
+                    conn = make_database(os.path.join(directory, f"run{run}.sqlite"), journal_mode, durability)
+                    queue = GroupCommitQueue(conn, max_batch=group_size)
+                    start = time.perf_counter()
+                    for i in range(count):
+                        queue.submit(
+                            "INSERT INTO students (student_id, name, age, email) VALUES (?, ?, ?, ?)",
+                            (f"S{i}", "Student", 20, f"s{i}@school.edu"),
+                            origin="bench",
+                        )
+                    queue.close()
+                    elapsed = time.perf_counter() - start
+                    conn.close()
+                    results.append((journal_mode, durability, mode, f"{count / elapsed:,.0f}"))
+    return results
+
+
+def bench_lookup(count=1000000, lookups=10000):
+    """
+    Measures ID prefix completion on a :class:`SortedKeys` index.
+
+    Random prefixes of one to four characters of existing IDs are looked
+    up, returning at most :data:`SUGGESTION_LIMIT` suggestions each, and
+    new IDs are inserted to measure the cost of keeping the index current.
+
+    :param count: Number of IDs in the index.
+    :param lookups: Number of prefix lookups and inserts.
+    :returns: Rows of (operation, count, mean, worst) with times in microseconds.
+    :rtype: list[tuple]
+    """
+    rng = random.Random(42)
+    ids = [f"S{rng.randrange(10 ** 9):09d}" for _ in range(count)]
+
+    start = time.perf_counter()
+    index = SortedKeys(ids)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    results = [("build", len(index), f"{build_ms:,.0f} ms total", "")]
+    for operation in ("prefix lookup", "insert"):
+        timings = []
+        for _ in range(lookups):
+            if operation == "prefix lookup":
+                prefix = rng.choice(ids)[:rng.randint(1, 4)]
+                start = time.perf_counter()
+                index.matching(prefix, SUGGESTION_LIMIT)
+            else:
+                key = f"N{rng.randrange(10 ** 9):09d}"
+                start = time.perf_counter()
+                index.add(key)
+            timings.append((time.perf_counter() - start) * 1e6)
+        results.append((operation, lookups, f"{sum(timings) / len(timings):,.1f} us", f"{max(timings):,.1f} us"))
+    return results
+
+
+def populate(conn, students, courses=200, per_student=5):
+    """
+    Fills a school database with generated records.
+
+    :param conn: The database connection.
+    :param students: Number of students; a tenth as many instructors are created.
+    :param courses: Number of courses, assigned to instructors round-robin.
+    :param per_student: Enrollments per student.
+    :returns: None
+    """
+    rng = random.Random(42)
+    instructors = max(1, students // 10)
+    with conn:
+        conn.executemany("INSERT INTO instructors (instructor_id, name, age, email) VALUES (?, ?, ?, ?)",
+                         ((f"I{i}", f"Instructor {i}", 40, f"i{i}@school.edu") for i in range(instructors)))
+        conn.executemany("INSERT INTO courses (course_id, course_name, instructor_id) VALUES (?, ?, ?)",
+                         ((f"C{i}", f"Course {i}", f"I{i % instructors}") for i in range(courses)))
+        conn.executemany("INSERT INTO students (student_id, name, age, email) VALUES (?, ?, ?, ?)",
+                         ((f"S{i}", f"Student {i % 1000}", 20, f"s{i}@school.edu") for i in range(students)))
+        conn.executemany("INSERT INTO student_courses (student_id, course_id) VALUES (?, ?)",
+                         ((f"S{i}", f"C{c}") for i in range(students)
+                          for c in rng.sample(range(courses), min(per_student, courses))))
+
+
+def time_ms(func, repeat):
+    """
+    Times repeated calls of a function.
+
+    :param func: The function to call without arguments.
+    :param repeat: Number of calls.
+    :returns: ``(median, p95)`` in milliseconds.
+    :rtype: tuple[float, float]
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+
+
+def bench_replica(students=20000, repeat=20):
+    """
+    Compares read latency on the database file and on the in-memory replica.
+
+    The file connection runs the listing and search queries the GUIs use,
+    then the same queries run on a :class:`ReadReplica`. The cost of a
+    replica sync after a single write is measured as well.
+
+    :param students: Number of generated students.
+    :param repeat: Runs per query.
+    :returns: Rows of (query, file median, file p95, replica median, replica p95) in ms.
+    :rtype: list[tuple]
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        conn = connect(os.path.join(directory, "replica.sqlite"))
+        populate(conn, students)
+        replica = ReadReplica(conn)
+
+        queries = [(f"list {record_type}s", lambda db, record_type=record_type: fetch_display_rows(db, record_type))
+                   for record_type in ("student", "instructor", "course")]
+        queries.append(("search student by name", lambda db: fetch_display_rows(db, "student", [
+            row[0] for row in db.execute("SELECT student_id FROM students WHERE name = ?", ("Student 7",))])))
+
+        results = []
+        for name, query in queries:
+            file_median, file_p95 = time_ms(lambda: query(conn), repeat)
+            replica_median, replica_p95 = time_ms(lambda: query(replica.conn), repeat)
+            results.append((name, f"{file_median:.2f}", f"{file_p95:.2f}", f"{replica_median:.2f}", f"{replica_p95:.2f}"))
+
+        def write_and_sync():
+            with conn:
+                conn.execute("UPDATE students SET age = age + 1 WHERE student_id = 'S1'")
+            replica.sync()
+
+        sync_median, sync_p95 = time_ms(write_and_sync, repeat)
+        results.append(("write + replica sync", "", "", f"{sync_median:.2f}", f"{sync_p95:.2f}"))
+        conn.close()
+    return results
+
+
+def bench_roster(students=20000, repeat=20):
+    """
+    Compares listing reads and single writes without and with roster tables.
+
+    The same database is measured twice, first with the display rows built
+    by joins and then with the roster tables enabled, where the listings
+    scan the rosters and every write also updates the affected roster rows.
+
+    :param students: Number of generated students.
+    :param repeat: Runs per operation.
+    :returns: Rows of (operation, joins median, joins p95, roster median, roster p95) in ms.
+    :rtype: list[tuple]
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        conn = connect(os.path.join(directory, "roster.sqlite"))
+        populate(conn, students)
+        with conn:
+            conn.execute("INSERT INTO courses (course_id, course_name, instructor_id) VALUES ('CB', 'Bench', 'I0')")
+
+        counter = iter(range(students * 2 * repeat))
+        operations = [(f"list {record_type}s", lambda record_type=record_type: fetch_display_rows(conn, record_type))
+                      for record_type in ("student", "instructor", "course")]
+
+        def enroll():
+            with conn:
+                conn.execute("INSERT INTO student_courses (student_id, course_id) VALUES (?, 'CB')",
+                             (f"S{next(counter) % students}",))
+
+        def rename():
+            with conn:
+                conn.execute("UPDATE students SET name = ? WHERE student_id = 'S1'", (f"Student {next(counter)}",))
+
+        def reassign():
+            with conn:
+                conn.execute("UPDATE courses SET instructor_id = ? WHERE course_id = 'C1'", (f"I{next(counter) % 2}",))
+
+        operations += [("enroll student", enroll), ("edit student name", rename), ("reassign course", reassign)]
+
+        timings = {}
+        for enabled in (False, True):
+            set_rosters(conn, enabled)
+            with conn:
+                conn.execute("DELETE FROM student_courses WHERE course_id = 'CB'")
+            for name, operation in operations:
+                timings[name, enabled] = time_ms(operation, repeat)
+        conn.close()
+    return [(name, *(f"{value:.2f}" for enabled in (False, True) for value in timings[name, enabled]))
+            for name, _ in operations]
+
+
+# Listing queries of schema version 4, joining enrollments by their string IDs.
+STRING_KEY_QUERIES = {
+    "student": """
+        SELECT s.student_id, s.name, s.age, s.email,
+               COALESCE((SELECT GROUP_CONCAT(sc.course_id, ', ') FROM student_courses sc
+                         WHERE sc.student_id = s.student_id), '')
+        FROM students s
+    """,
+    "course": """
+        SELECT c.course_id, c.course_name, c.instructor_id,
+               COALESCE((SELECT GROUP_CONCAT(sc.student_id, ', ') FROM student_courses sc
+                         WHERE sc.course_id = c.course_id), '')
+        FROM courses c
+    """,
+}
+
+
+def bench_keys(students=20000, repeat=20):
+    """
+    Compares the join-heavy screens on string keys and on surrogate keys.
+
+    A database is filled at schema version 4, where ``student_courses``
+    holds pairs of string IDs, and measured with that version's listing
+    queries; then it is migrated in place to the integer surrogate keys of
+    migration 5 and measured with the current ones. The file size is
+    taken after a VACUUM each time.
+
+    :param students: Number of generated students.
+    :param repeat: Runs per operation.
+    :returns: Rows of (operation, strings median, strings p95, integers median, integers p95) in ms.
+    :rtype: list[tuple]
+    """
+    rng = random.Random(7)
+    picked = [f"S{i}" for i in rng.sample(range(students), 100)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "keys.sqlite")
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA foreign_keys = ON")
+        migrate(conn, 4)
+        populate(conn, students)
+
+        timings = {}
+        for surrogate, queries in ((False, STRING_KEY_QUERIES), (True, DISPLAY_QUERIES)):
+            if surrogate:
+                migrate(conn)
+            conn.execute("VACUUM")
+            placeholders = ", ".join("?" * len(picked))
+
+            def enroll_and_drop():
+                with conn:
+                    conn.execute("INSERT INTO student_courses (student_id, course_id) VALUES ('S1', 'C0')")
+                with conn:
+                    conn.execute("DELETE FROM student_courses WHERE student_id = 'S1' AND course_id = 'C0'")
+
+            operations = [
+                ("list students", lambda: conn.execute(queries["student"]).fetchall()),
+                ("list courses", lambda: conn.execute(queries["course"]).fetchall()),
+                ("open 100 students", lambda: conn.execute(
+                    f"{queries['student']} WHERE {DISPLAY_KEYS['student']} IN ({placeholders})", picked).fetchall()),
+                ("open one course", lambda: conn.execute(
+                    f"{queries['course']} WHERE {DISPLAY_KEYS['course']} = 'C7'").fetchall()),
+                ("enroll + drop", enroll_and_drop),
+            ]
+            with conn:
+                conn.execute("DELETE FROM student_courses WHERE student_id = 'S1' AND course_id = 'C0'")
+            for name, operation in operations:
+                timings[name, surrogate] = time_ms(operation, repeat)
+            pages = conn.execute("PRAGMA page_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+            timings["file size MB", surrogate] = (pages / 2 ** 20, None)
+        conn.close()
+    names = [name for name, _ in operations] + ["file size MB"]
+    return [(name, *("" if value is None else f"{value:.2f}" for surrogate in (False, True)
+                     for value in timings[name, surrogate]))
+            for name in names]
+
+
+def bench_pages(sizes=(2000, 20000, 100000), repeat=20):
+    """
+    Measures the sorted, filtered display pages as the database grows.
+
+    For each size a database is generated and the student listing is read
+    whole, as the displays did before they were paged, and then as pages:
+    the first page by name, a page from the middle of the descending order,
+    a page filtered by a name prefix and a page filtered by age but sorted
+    by email.
+
+    :param sizes: Numbers of generated students.
+    :param repeat: Runs per operation.
+    :returns: Rows of (operation, median ms per size).
+    :rtype: list[tuple]
+    """
+    timings = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for students in sizes:
+            conn = connect(os.path.join(directory, f"pages{students}.sqlite"))
+            populate(conn, students)
+            middle = conn.execute("SELECT name, student_id FROM students ORDER BY name DESC, student_id DESC "
+                                  "LIMIT 1 OFFSET ?", (students // 2,)).fetchone()
+            operations = [
+                ("full listing", lambda: fetch_display_rows(conn, "student")),
+                ("first page by name", lambda: fetch_display_page(conn, "student", 1)),
+                ("middle page by name desc", lambda: fetch_display_page(
+                    conn, "student", 1, True, after=page_cursor((middle[1], middle[0]), 1))),
+                ("name starts with 'Student 12'", lambda: fetch_display_page(conn, "student", 1, filters={1: "Student 12"})),
+                ("age 20 (all students), by email", lambda: fetch_display_page(conn, "student", 3, filters={2: "20"})),
+            ]
+            for name, operation in operations:
+                timings[name, students] = time_ms(operation, repeat)[0]
+            conn.close()
+    return [(name, *(f"{timings[name, students]:.2f}" for students in sizes)) for name, _ in operations]
+
+
+def bench_sync(students=20000, changes=(1, 100, 10000)):
+    """
+    Measures syncing two copies of a database as the differences grow.
+
+    A database is generated and copied, and the hash trees of both are
+    built. Then for each count that many students are changed in the
+    source, and the copies are compared row by row, as a sync without
+    the trees would, and with :func:`lab3_common.sync.diff`, whose
+    differences :func:`lab3_common.sync.apply` then copies over.
+
+    :param students: Number of generated students.
+    :param changes: Numbers of students changed before each sync; counts
+        above ``students`` change every student.
+    :returns: Rows of (operation, differences, ms).
+    :rtype: list[tuple]
+    """
+    def compare_rows():
+        return [set(source.execute(sql)) ^ set(target.execute(sql))
+                for sql in (f"SELECT {', '.join(columns)} FROM {table}" for table, columns in SYNC_COLUMNS.items())]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        source = connect(os.path.join(directory, "source.sqlite"))
+        target = connect(os.path.join(directory, "target.sqlite"))
+        populate(source, students)
+        source.backup(target)
+        start = time.perf_counter()
+        update_tree(source)
+        update_tree(target)
+        rows.append(("build both trees", 0, f"{(time.perf_counter() - start) * 1000:.1f}"))
+        for count in changes:
+            count = min(count, students)
+            with source:
+                source.executemany("UPDATE students SET age = age + 1 WHERE student_id = ?",
+                                   ((f"S{index}",) for index in random.sample(range(students), count)))
+            start = time.perf_counter()
+            compare_rows()
+            rows.append(("compare all rows", count, f"{(time.perf_counter() - start) * 1000:.1f}"))
+            start = time.perf_counter()
+            differences = diff(source, target)
+            rows.append(("hash tree diff", count, f"{(time.perf_counter() - start) * 1000:.1f}"))
+            start = time.perf_counter()
+            apply(source, target, differences)
+            rows.append(("apply", count, f"{(time.perf_counter() - start) * 1000:.1f}"))
+        source.close()
+        target.close()
+    return rows
+
+
+def bench_archive(students=20000, terms=4, repeat=10):
+    """
+    Measures closing terms into archive files and the live queries around it.
+
+    The generated courses are split into ``terms`` terms. The listings are
+    timed and the live enrollments counted, all terms but the last are
+    closed one after the other, moving their students left without
+    enrollments too, the queries are timed again, and the terms are
+    restored, newest first.
+
+    :param students: Number of generated students.
+    :param terms: Number of terms the courses are split into.
+    :param repeat: Runs per query.
+    :returns: ``(moves, queries)``: rows of (operation, term, enrollments,
+        students, ms, enrollments/s), and rows of (query, p50 ms with all
+        terms live, p50 ms with the closed terms archived) ending with the
+        live enrollment counts.
+    :rtype: tuple[list[tuple], list[tuple]]
+    """
+    queries = [
+        ("list students", lambda: fetch_display_rows(conn, "student")),
+        ("list courses", lambda: fetch_display_rows(conn, "course")),
+    ]
+    moves, timings = [], {}
+    with tempfile.TemporaryDirectory() as directory:
+        conn = connect(os.path.join(directory, "archive.sqlite"))
+        courses = 200
+        populate(conn, students, courses)
+        names = [f"term{term}" for term in range(terms - 1)]
+        for name, func in queries:
+            timings[name] = [time_ms(func, repeat)[0]]
+        timings["live enrollments"] = [conn.execute("SELECT COUNT(*) FROM enrollments").fetchone()[0]]
+        for term, name in enumerate(names):
+            result = close_term(conn, name, [f"C{c}" for c in range(courses) if c % terms == term], True, directory)
+            moves.append(("close", name, result.enrollments, result.students, f"{result.seconds * 1000:.0f}",
+                          f"{result.enrollments / result.seconds:,.0f}"))
+        for name, func in queries:
+            timings[name].append(time_ms(func, repeat)[0])
+        timings["live enrollments"].append(conn.execute("SELECT COUNT(*) FROM enrollments").fetchone()[0])
+        # Newest first: students are archived with the last term they were enrolled in
+        for name in reversed(names):
+            result = restore_term(conn, name, directory)
+            moves.append(("restore", name, result.enrollments, result.students, f"{result.seconds * 1000:.0f}",
+                          f"{result.enrollments / result.seconds:,.0f}"))
+        conn.close()
+    return moves, [(name, *(f"{value:.2f}" if isinstance(value, float) else value for value in values))
+                   for name, values in timings.items()]
+
+
+def contention_worker(path, worker, writes, hot, busy_timeout_ms, retries):
+    """
+    One process of :func:`bench_contention`: a desk making edits and registrations.
+
+    Half of the writes edit one of the ``hot`` most popular students with
+    the optimistic version check, pausing briefly between reading the
+    version and saving like a user would; the others add a student and
+    register them for a course.
+
+    :param path: The database file.
+    :param worker: The worker number, used for unique IDs.
+    :param writes: Number of writes.
+    :param hot: Number of students the edits pick from.
+    :param busy_timeout_ms: The busy timeout to use.
+    :param retries: The number of retries to use.
+    :returns: Counts of committed writes, conflicts, lock errors and retries, and the seconds taken.
+    :rtype: dict
+    """
+    config.WRITE_RETRIES = retries
+    rng = random.Random(worker)
+    conn = connect(path)
+    conn.execute(f"PRAGMA busy_timeout = {busy_timeout_ms}")
+    backend = LocalStore(conn)
+    counts = {"committed": 0, "conflicts": 0, "locked": 0}
+    start = time.perf_counter()
+    for i in range(writes):
+        try:
+            if i % 2:
+                student_id = f"S{rng.randrange(hot)}"
+                versions = fetch_versions(conn, "student", [student_id])
+                time.sleep(rng.uniform(0, 0.002))
+                backend.update_records("student", {student_id: {"age": rng.randint(18, 60)}}, versions)
+            else:
+                student_id = f"W{worker}_{i}"
+                backend.insert_record("student", {"student_id": student_id, "name": "Bench", "age": 20,
+                                                  "email": f"{student_id}@school.edu"})
+                backend.enroll_student(student_id, f"C{rng.randrange(200)}")
+            counts["committed"] += 1
+        except ConflictError:
+            counts["conflicts"] += 1
+        except sqlite3.OperationalError as e:
+            if not is_busy(e):
+                raise
+            counts["locked"] += 1
+    counts["seconds"] = time.perf_counter() - start
+    counts["retries"] = retry_counts["retries"]
+    conn.close()
+    return counts
+
+
+def bench_contention(processes=4, writes=200, hot=10):
+    """
+    Measures concurrent writers in separate processes on one database file.
+
+    The same workload (see :func:`contention_worker`) runs without busy
+    timeout and retries, with the busy timeout only, and with both, as
+    configured in :mod:`lab3_common.config`.
+
+    :param processes: Number of writer processes.
+    :param writes: Writes per process.
+    :param hot: Number of students the edits compete for.
+    :returns: Rows of (policy, writes/s, committed, conflicts, lock errors, retries).
+    :rtype: list[tuple]
+    """
+    policies = [
+        ("no timeout, no retries", 0, 0),
+        (f"busy timeout {config.BUSY_TIMEOUT_MS} ms", config.BUSY_TIMEOUT_MS, 0),
+        (f"busy timeout + {config.WRITE_RETRIES} retries", config.BUSY_TIMEOUT_MS, config.WRITE_RETRIES),
+    ]
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for run, (name, busy_timeout_ms, retries) in enumerate(policies):
+            path = os.path.join(directory, f"contention{run}.sqlite")
+            conn = connect(path)
+            populate(conn, 1000)
+            conn.close()
+            with multiprocessing.Pool(processes) as pool:
+                counts = pool.starmap(contention_worker, [(path, worker, writes, hot, busy_timeout_ms, retries)
+                                                          for worker in range(processes)])
+            total = {key: sum(count[key] for count in counts) for key in ("committed", "conflicts", "locked", "retries")}
+            seconds = max(count["seconds"] for count in counts)
+            results.append((name, f"{total['committed'] / seconds:,.0f}", total["committed"],
+                            f"{total['conflicts']} ({total['conflicts'] / (processes * writes):.1%})",
+                            total["locked"], total["retries"]))
+    return results
+
+
+def percentile(values, fraction):
+    """
+    Returns a percentile of sorted values.
+
+    :param values: The values, sorted ascending.
+    :param fraction: The percentile as a fraction, e.g. 0.99.
+    :returns: The value.
+    """
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def bench_registration(producers=64, requests=100, students=20000):
+    """
+    Generates a registration rush and compares two ways of handling it.
+
+    ``producers`` threads each send ``requests`` registrations for random
+    students and courses, waiting for each outcome before sending the
+    next, like clients of the service. About 1% name an unknown student.
+    They run once against the old per-request path (two lookups, an
+    INSERT and a commit on one shared connection) and once against an
+    :class:`EnrollmentEngine`.
+
+    :param producers: Number of producer threads.
+    :param requests: Requests per producer.
+    :param students: Number of generated students.
+    :returns: Rows of (path, requests/s, p50, p95, p99, max latency in ms,
+        mean batch size, outcomes).
+    :rtype: list[tuple]
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ("per request", "engine"):
+            path = os.path.join(directory, f"{mode.replace(' ', '_')}.sqlite")
+            conn = connect(path)
+            populate(conn, students, per_student=0)
+            conn.close()
+
+            if mode == "per request":
+                shared = sqlite3.connect(path, check_same_thread=False)
+                shared.execute("PRAGMA foreign_keys = ON")
+                lock = threading.Lock()
+
+                def register(student_id, course_id):
+                    with lock:
+                        cursor = shared.cursor()
+                        cursor.execute("SELECT student_id FROM students WHERE student_id = ?", (student_id,))
+                        student = cursor.fetchone()
+                        cursor.execute("SELECT course_id FROM courses WHERE course_id = ?", (course_id,))
+                        course = cursor.fetchone()
+                        if student is None or course is None:
+                            return NOT_FOUND
+                        try:
+                            cursor.execute("INSERT INTO student_courses (student_id, course_id) VALUES (?, ?)",
+                                           (student_id, course_id))
+                            shared.commit()
+                        except sqlite3.IntegrityError:
+                            return ALREADY_ENROLLED
+                        return ENROLLED
+            else:
+                engine = EnrollmentEngine(path)
+                register = engine.enroll
+
+            latencies = []
+            outcomes = {}
+
+            def produce(seed):
+                rng = random.Random(seed)
+                for _ in range(requests):
+                    student = f"S{rng.randrange(students)}" if rng.random() > 0.01 else "unknown"
+                    start = time.perf_counter()
+                    outcome = register(student, f"C{rng.randrange(200)}")
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+            threads = [threading.Thread(target=produce, args=(seed,)) for seed in range(producers)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+            if mode == "per request":
+                shared.close()
+                batch = "1"
+            else:
+                engine.close()
+                batch = f"{engine.processed / engine.batches:.1f}"
+            latencies.sort()
+            results.append((mode, f"{len(latencies) / elapsed:,.0f}",
+                            *(f"{percentile(latencies, fraction):.1f}" for fraction in (0.5, 0.95, 0.99, 1.0)),
+                            batch, ", ".join(f"{count} {outcome}" for outcome, count in sorted(outcomes.items()))))
+    return results
+
+
+def main(argv=None):
+    """
+    Command-line entry point.
+
+    :param argv: The arguments; defaults to ``sys.argv[1:]``.
+    :returns: None
+    """
+    parser = argparse.ArgumentParser(prog="python -m lab3_common.bench", description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    inserts = subparsers.add_parser("inserts", help="inserts per second under each durability setting")
+    inserts.add_argument("--count", type=int, default=1000)
+    inserts.add_argument("--batch", type=int, default=50)
+
+    lookup = subparsers.add_parser("lookup", help="ID prefix completion on a sorted in-memory index")
+    lookup.add_argument("--count", type=int, default=1000000)
+    lookup.add_argument("--lookups", type=int, default=10000)
+
+    replica = subparsers.add_parser("replica", help="read latency on the database file vs. the in-memory replica")
+    replica.add_argument("--students", type=int, default=20000)
+    replica.add_argument("--repeat", type=int, default=20)
+
+    roster = subparsers.add_parser("roster", help="listing reads and single writes without and with roster tables")
+    roster.add_argument("--students", type=int, default=20000)
+    roster.add_argument("--repeat", type=int, default=20)
+
+    keys = subparsers.add_parser("keys", help="join-heavy screens on string keys vs. integer surrogate keys")
+    keys.add_argument("--students", type=int, default=20000)
+    keys.add_argument("--repeat", type=int, default=20)
+
+    pages = subparsers.add_parser("pages", help="sorted and filtered display pages as the student count grows")
+    pages.add_argument("--sizes", type=int, nargs="+", default=[2000, 20000, 100000])
+    pages.add_argument("--repeat", type=int, default=20)
+
+    sync = subparsers.add_parser("sync", help="comparing two database copies row by row vs. with hash trees")
+    sync.add_argument("--students", type=int, default=20000)
+    sync.add_argument("--changes", type=int, nargs="+", default=[1, 100, 10000])
+
+    archive = subparsers.add_parser("archive", help="closing terms into archive files, restoring them, and the live queries")
+    archive.add_argument("--students", type=int, default=20000)
+    archive.add_argument("--terms", type=int, default=4)
+    archive.add_argument("--repeat", type=int, default=10)
+
+    contention = subparsers.add_parser("contention", help="concurrent writer processes with busy timeout and retries")
+    contention.add_argument("--processes", type=int, default=4)
+    contention.add_argument("--writes", type=int, default=200)
+    contention.add_argument("--hot", type=int, default=10)
+
+    registration = subparsers.add_parser("registration", help="registration rush: per-request commits vs. the enrollment engine")
+    registration.add_argument("--producers", type=int, default=64)
+    registration.add_argument("--requests", type=int, default=100)
+    registration.add_argument("--students", type=int, default=20000)
+
+    args = parser.parse_args(argv)
+    if args.benchmark == "inserts":
+        print_table(["journal", "synchronous", "mode", "inserts/s"], bench_inserts(args.count, args.batch))
+    elif args.benchmark == "lookup":
+        print_table(["operation", "count", "mean", "worst"], bench_lookup(args.count, args.lookups))
+    elif args.benchmark == "replica":
+        print_table(["query", "file p50 ms", "file p95 ms", "replica p50 ms", "replica p95 ms"],
+                    bench_replica(args.students, args.repeat))
+    elif args.benchmark == "contention":
+        print_table(["policy", "writes/s", "committed", "conflicts", "lock errors", "retries"],
+                    bench_contention(args.processes, args.writes, args.hot))
+    elif args.benchmark == "registration":
+        print_table(["path", "requests/s", "p50 ms", "p95 ms", "p99 ms", "max ms", "batch", "outcomes"],
+                    bench_registration(args.producers, args.requests, args.students))
+    elif args.benchmark == "keys":
+        print_table(["operation", "strings p50 ms", "strings p95 ms", "integers p50 ms", "integers p95 ms"],
+                    bench_keys(args.students, args.repeat))
+    elif args.benchmark == "pages":
+        print_table(["operation", *(f"{students} students p50 ms" for students in args.sizes)],
+                    bench_pages(args.sizes, args.repeat))
+    elif args.benchmark == "sync":
+        print_table(["operation", "students changed", "ms"], bench_sync(args.students, args.changes))
+    elif args.benchmark == "archive":
+        moves, queries = bench_archive(args.students, args.terms, args.repeat)
+        print_table(["operation", "term", "enrollments", "students", "ms", "enrollments/s"], moves)
+        print()
+        print_table(["query", "all terms live", "closed terms archived"], queries)
+    elif args.benchmark == "roster":
+        print_table(["operation", "joins p50 ms", "joins p95 ms", "roster p50 ms", "roster p95 ms"],
+                    bench_roster(args.students, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Reading and compacting the trigger-maintained change log.
+
+The ``changelog`` table (see :func:`lab3_common.schema.add_changelog`)
+records every insert, update and delete on the school tables with an
+increasing sequence number. Consumers remember the last sequence number
+they processed and read on from there with :func:`changes_since`.
+
+:func:`compact` keeps the log bounded. It first drops entries superseded by
+a later entry for the same row, which loses no information a consumer
+needs: the latest operation still tells it the row changed and whether it
+still exists. Then entries beyond the retention limits are removed and
+``truncated_seq`` is raised, so a consumer whose position is older than
+that is told to start over from a full copy.
+"""
+from collections import namedtuple
+
+from lab3_common import config
+from lab3_common.store import chunked
+
+# Number of changes returned per batch by changes_since.
+CHANGE_BATCH_SIZE = 500
+
+# Key columns of the tracked tables; enrollment keys join both columns with "/".
+KEY_COLUMNS = {
+    "students": ("student_id",),
+    "instructors": ("instructor_id",),
+    "courses": ("course_id",),
+    "student_courses": ("student_id", "course_id"),
+}
+
+Change = namedtuple("Change", ["seq", "table", "operation", "key", "changed_at"])
+
+
+class ChangelogTruncatedError(LookupError):
+    """
+    Raised when changes after a sequence number were already pruned.
+
+    :param seq: The requested sequence number.
+    :param truncated_seq: The highest sequence number pruned so far.
+    """
+    def __init__(self, seq, truncated_seq):
+        self.seq = seq
+        self.truncated_seq = truncated_seq
+        super().__init__(f"Changes after sequence {seq} were pruned up to sequence {truncated_seq}; "
+                         f"a full resynchronisation is needed")
+
+
+def latest_sequence(conn):
+    """
+    Returns the sequence number of the newest change.
+
+    :param conn: The database connection.
+    :returns: The sequence number, or 0 if nothing was logged yet.
+    :rtype: int
+    """
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changelog'").fetchone()
+    return row[0] if row else 0
+
+
+def truncated_sequence(conn):
+    """
+    Returns the highest sequence number removed by retention.
+
+    :param conn: The database connection.
+    :returns: The sequence number; changes up to it may be missing.
+    :rtype: int
+    """
+    return conn.execute("SELECT value FROM changelog_state WHERE name = 'truncated_seq'").fetchone()[0]
+
+
+def changes_since(conn, seq=0, batch_size=CHANGE_BATCH_SIZE):
+    """
+    Reads the changes after a sequence number in batches.
+
+    Each batch is one indexed range query on ``seq``, so reading stays cheap
+    however long the log is. Changes committed while iterating are
+    included in later batches.
+
+    :param conn: The database connection.
+    :param seq: The last sequence number already processed; 0 reads everything.
+    :param batch_size: The maximum number of changes per batch.
+    :returns: An iterator of lists of :class:`Change`, in sequence order.
+    :raises ChangelogTruncatedError: If changes after ``seq`` were pruned.
+    """
+    truncated_seq = truncated_sequence(conn)
+    if seq < truncated_seq:
+        raise ChangelogTruncatedError(seq, truncated_seq)
+    while True:
+        rows = conn.execute(
+            "SELECT seq, table_name, operation, row_key, changed_at FROM changelog "
+            "WHERE seq > ? ORDER BY seq LIMIT ?",
+            (seq, batch_size),
+        ).fetchall()
+        if not rows:
+            return
+        yield [Change(*row) for row in rows]
+        seq = rows[-1][0]
+
+
+def key_condition(table, keys):
+    """
+    Builds a WHERE condition matching rows by their change-log keys.
+
+    :param table: The tracked table.
+    :param keys: The keys as stored in the change log.
+    :returns: ``(condition, params)``.
+    :rtype: tuple[str, list]
+    """
+    key_columns = KEY_COLUMNS[table]
+    keys = list(keys)
+    params = [part for key in keys for part in key.split("/", len(key_columns) - 1)]
+    if len(key_columns) == 1:
+        return f"{key_columns[0]} IN ({', '.join('?' * len(keys))})", params
+    # The IN list on the first column lets SQLite search its index; the
+    # row values alone would be compared against every row
+    tuples = ", ".join(f"({', '.join('?' * len(key_columns))})" for _ in keys)
+    firsts = [key.split("/", 1)[0] for key in keys]
+    return (f"{key_columns[0]} IN ({', '.join('?' * len(keys))}) AND ({', '.join(key_columns)}) IN (VALUES {tuples})",
+            firsts + params)
+
+
+def fetch_rows(conn, table, keys, columns=None):
+    """
+    Fetches the current rows of a tracked table for change-log keys.
+
+    :param conn: The database connection.
+    :param table: The tracked table.
+    :param keys: The keys as stored in the change log.
+    :param columns: The columns to fetch, including the key columns; None
+        fetches every column of the table.
+    :returns: ``(columns, rows_by_key)``; deleted records have no entry.
+    :rtype: tuple[list[str], dict]
+    """
+    if columns is None:
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    columns = list(columns)
+    positions = [columns.index(column) for column in KEY_COLUMNS[table]]
+    rows_by_key = {}
+    for chunk in chunked(keys):
+        condition, params = key_condition(table, chunk)
+        for row in conn.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE {condition}", params):
+            rows_by_key["/".join(str(row[position]) for position in positions)] = row
+    return columns, rows_by_key
+
+
+def latest_changes(conn, seq=0):
+    """
+    Collapses the changes after a sequence number to the newest one per row.
+
+    :param conn: The database connection.
+    :param seq: The last sequence number already processed.
+    :returns: Mapping of table to ``{key: Change}``, for every tracked table.
+    :rtype: dict
+    :raises ChangelogTruncatedError: If changes after ``seq`` were pruned.
+    """
+    latest = {table: {} for table in KEY_COLUMNS}
+    for batch in changes_since(conn, seq):
+        for change in batch:
+            if change.table in latest:
+                latest[change.table][change.key] = change
+    return latest
+
+
+def compact(conn, retention_days=None, max_rows=None):
+    """
+    Shrinks the change log in one transaction.
+
+    Entries superseded by a later entry for the same row are deleted, then
+    entries older than ``retention_days`` and the oldest entries beyond
+    ``max_rows`` are pruned and ``truncated_seq`` is advanced past them.
+
+    :param conn: The database connection.
+    :param retention_days: Maximum age of an entry; defaults to
+        :data:`config.CHANGELOG_RETENTION_DAYS`, 0 keeps entries of any age.
+    :param max_rows: Maximum number of entries kept; defaults to
+        :data:`config.CHANGELOG_MAX_ROWS`, 0 keeps any number.
+    :returns: ``(superseded, pruned)``, the number of entries deleted by each step.
+    :rtype: tuple[int, int]
+    """
+    if retention_days is None:
+        retention_days = config.CHANGELOG_RETENTION_DAYS
+    if max_rows is None:
+        max_rows = config.CHANGELOG_MAX_ROWS
+
+    with conn:
+        superseded = conn.execute("""
+            DELETE FROM changelog
+            WHERE EXISTS (SELECT 1 FROM changelog later
+                          WHERE later.table_name = changelog.table_name
+                            AND later.row_key = changelog.row_key
+                            AND later.seq > changelog.seq)
+        """).rowcount
+
+        cutoff = 0
+        if retention_days:
+            row = conn.execute("SELECT MAX(seq) FROM changelog WHERE changed_at < strftime('%Y-%m-%d %H:%M:%f', 'now', ?)",
+                               (f"-{retention_days} days",)).fetchone()
+            cutoff = max(cutoff, row[0] or 0)
+        if max_rows:
+            row = conn.execute("SELECT seq FROM changelog ORDER BY seq DESC LIMIT 1 OFFSET ?", (max_rows,)).fetchone()
+            cutoff = max(cutoff, row[0] if row else 0)
+
+        pruned = 0
+        if cutoff:
+            pruned = conn.execute("DELETE FROM changelog WHERE seq <= ?", (cutoff,)).rowcount
+            conn.execute("UPDATE changelog_state SET value = MAX(value, ?) WHERE name = 'truncated_seq'", (cutoff,))
+    return superseded, pruned
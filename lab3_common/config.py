@@ -0,0 +1,101 @@
+"""
+Runtime settings shared by both applications.
+
+Every optional mode is switched on through an environment variable so the
+GUIs can still be started with a plain ``python main_*.py``.
+"""
+import os
+
+
+def env_flag(name, default=False):
+    """
+    Reads a boolean environment variable.
+
+    :param name: The variable name.
+    :param default: The value used when the variable is not set.
+    :returns: True for "1", "true", "yes" or "on" (case-insensitive).
+    :rtype: bool
+    """
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_int(name, default):
+    """
+    Reads an integer environment variable.
+
+    :param name: The variable name.
+    :param default: The value used when the variable is not set or invalid.
+    :returns: The parsed integer.
+    :rtype: int
+    """
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+# Path of the SQLite database file.
+DB_PATH = os.environ.get("SCHOOL_DB", "./Database/schoolsystem.sqlite")
+
+# PRAGMA synchronous level: "full", "normal" or "off".
+DURABILITY = os.environ.get("SCHOOL_DURABILITY", "full").lower()
+
+# Group-commit (write-behind) mode for rapid data entry.
+WRITE_BEHIND = env_flag("SCHOOL_WRITE_BEHIND")
+WRITE_BEHIND_BATCH = env_int("SCHOOL_WRITE_BEHIND_BATCH", 50)
+WRITE_BEHIND_DELAY_MS = env_int("SCHOOL_WRITE_BEHIND_DELAY_MS", 250)
+
+# Change log retention, applied when an application closes: entries older
+# than this many days or beyond this many rows are pruned (0 disables a limit).
+CHANGELOG_RETENTION_DAYS = env_int("SCHOOL_CHANGELOG_RETENTION_DAYS", 30)
+CHANGELOG_MAX_ROWS = env_int("SCHOOL_CHANGELOG_MAX_ROWS", 100000)
+
+# Concurrent writers: how long a connection waits for another one's lock,
+# and how often (with randomised, doubling pauses starting around this many
+# milliseconds) a write is retried when SQLite reports the lock at once.
+BUSY_TIMEOUT_MS = env_int("SCHOOL_BUSY_TIMEOUT_MS", 5000)
+WRITE_RETRIES = env_int("SCHOOL_WRITE_RETRIES", 5)
+RETRY_BASE_MS = env_int("SCHOOL_RETRY_BASE_MS", 20)
+
+# Online backups: target directory, number of backups kept (0 keeps all),
+# pages copied per step and the pause between steps.
+BACKUP_DIR = os.environ.get("SCHOOL_BACKUP_DIR", "./Backups")
+BACKUP_KEEP = env_int("SCHOOL_BACKUP_KEEP", 7)
+BACKUP_PAGES = env_int("SCHOOL_BACKUP_PAGES", 256)
+BACKUP_SLEEP_MS = env_int("SCHOOL_BACKUP_SLEEP_MS", 10)
+
+# Directory of the per-term files closed terms' enrollments are moved into.
+ARCHIVE_DIR = os.environ.get("SCHOOL_ARCHIVE_DIR", "./Archive")
+
+# In-memory read replica serving listings, searches and exports, synced after
+# every write through the application and every this many milliseconds.
+READ_REPLICA = env_flag("SCHOOL_READ_REPLICA")
+REPLICA_SYNC_MS = env_int("SCHOOL_REPLICA_SYNC_MS", 5000)
+
+# Roster tables holding every display row precomputed, kept current by
+# triggers; listings become a plain table scan at some cost on every write.
+# Turning this off does not drop them (python -m lab3_common.roster disable).
+ROSTER = env_flag("SCHOOL_ROSTER")
+
+# School service (python -m lab3_common.service): the GUIs send their writes
+# to it when SCHOOL_SERVICE is set, e.g. http://127.0.0.1:8765 or
+# unix:/tmp/school.sock. The service uses this many read connections and
+# commits at most this many queued writes per transaction.
+SERVICE_URL = os.environ.get("SCHOOL_SERVICE", "")
+SERVICE_READERS = env_int("SCHOOL_SERVICE_READERS", 4)
+SERVICE_BATCH = env_int("SCHOOL_SERVICE_BATCH", 64)
+
+# Enrollment engine (lab3_common.enrollment): maximum number of queued
+# registrations committed in one transaction.
+ENROLLMENT_BATCH = env_int("SCHOOL_ENROLLMENT_BATCH", 500)
+
+# Display screens show this many rows per page, read in the chosen order
+# and with the column filters applied by SQLite (lab3_common.paging).
+PAGE_SIZE = env_int("SCHOOL_PAGE_SIZE", 100)
+
+# Tkinter tables are filled in slices of at most this many milliseconds,
+# letting the window redraw and handle input between them.
+TREE_CHUNK_MS = env_int("SCHOOL_TREE_CHUNK_MS", 8)
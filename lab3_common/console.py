@@ -0,0 +1,16 @@
+"""
+Text output shared by the command-line tools.
+"""
+
+
+def print_table(headers, rows):
+    """
+    Prints rows as an aligned text table.
+
+    :param headers: The column headers.
+    :param rows: The rows.
+    :returns: None
+    """
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    for row in [headers] + [list(row) for row in rows]:
+        print("  ".join(str(value).ljust(width) for value, width in zip(row, widths)).rstrip())
@@ -0,0 +1,40 @@
+"""
+Connection setup shared by both applications and the command-line tools.
+"""
+import os
+import sqlite3
+
+from lab3_common import config
+from lab3_common.roster import enable_rosters
+from lab3_common.schema import migrate
+from lab3_common.writequeue import set_durability
+
+
+def connect(path=None, durability=None):
+    """
+    Opens the school database ready for use.
+
+    Foreign key enforcement is switched on (SQLite leaves it off per
+    connection), the connection waits up to :data:`config.BUSY_TIMEOUT_MS`
+    for other connections' locks, the durability level is applied, pending
+    schema migrations are run, and the roster tables are created if
+    :data:`config.ROSTER` is on. Rosters are never dropped here, as another
+    application may rely on them; ``python -m lab3_common.roster disable``
+    drops them.
+
+    :param path: The database file; defaults to :data:`config.DB_PATH`.
+    :param durability: "full", "normal" or "off"; defaults to :data:`config.DURABILITY`.
+    :returns: The open connection.
+    :rtype: sqlite3.Connection
+    """
+    path = path or config.DB_PATH
+    directory = os.path.dirname(path)
+    if directory and path != ":memory:":
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=config.BUSY_TIMEOUT_MS / 1000)
+    conn.execute("PRAGMA foreign_keys = ON")
+    set_durability(conn, durability or config.DURABILITY)
+    migrate(conn)
+    if config.ROSTER:
+        enable_rosters(conn)
+    return conn
@@ -0,0 +1,141 @@
+"""
+On-demand cProfile and tracemalloc capture around user actions.
+
+A :class:`DiagnosticsSession` is armed for the next N actions. While armed,
+every outermost timed action runs under cProfile and tracemalloc, and writes
+a ``.prof`` file plus a top-allocations report tagged with the action name.
+"""
+import contextlib
+import cProfile
+import os
+import re
+import time
+import tracemalloc
+
+DEFAULT_DIAGNOSTICS_DIR = "Diagnostics"
+
+
+class DiagnosticsSession:
+    """
+    Profiles the next N user actions.
+
+    Install it with ``metrics.add_action_hook(session.capture)`` so that every
+    action timed by :mod:`lab3_common.metrics` passes through :meth:`capture`.
+
+    :param directory: Where the capture files are written.
+    :param top: How many allocation sites to list in each report.
+    """
+    def __init__(self, directory=DEFAULT_DIAGNOSTICS_DIR, top=25):
+        self.directory = directory
+        self.top = top
+        self.remaining = 0
+        self.active_action = None
+        self.listeners = []
+        self.captures = []
+
+    def add_listener(self, listener):
+        """
+        Registers a callback invoked as ``listener(action, prof_path, report_path)``.
+
+        :param listener: The callable to notify after each capture.
+        :returns: None
+        """
+        self.listeners.append(listener)
+
+    def arm(self, count):
+        """
+        Captures the next ``count`` actions; ``0`` disables capturing.
+
+        :param count: The number of actions to profile.
+        :returns: None
+        """
+        self.remaining = max(0, int(count))
+
+    @property
+    def armed(self):
+        """
+        Whether the session still has actions left to capture.
+
+        :rtype: bool
+        """
+        return self.remaining > 0
+
+    @contextlib.contextmanager
+    def capture(self, action):
+        """
+        Profiles the wrapped block if the session is armed.
+
+        Nested actions are part of the outermost capture, so only the action
+        the user actually triggered produces files.
+
+        :param action: The action name used to tag the capture files.
+        :returns: A context manager.
+        """
+        if not self.armed or self.active_action is not None:
+            yield
+            return
+
+        self.active_action = action
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(10)
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            self.active_action = None
+            self.remaining -= 1
+            try:
+                self.write_capture(action, profiler, before, after, peak, elapsed_ms)
+            except OSError as e:
+                print(f"An error occurred while writing diagnostics: {e}")
+
+    def write_capture(self, action, profiler, before, after, peak, elapsed_ms):
+        """
+        Writes the profile and the allocation report for one action.
+
+        :param action: The action name.
+        :param profiler: The stopped :class:`cProfile.Profile`.
+        :param before: The tracemalloc snapshot taken before the action.
+        :param after: The tracemalloc snapshot taken after the action.
+        :param peak: Peak traced memory during the action, in bytes.
+        :param elapsed_ms: How long the action took, in milliseconds.
+        :returns: The paths of the ``.prof`` file and the report.
+        :rtype: tuple[str, str]
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        tag = re.sub(r"[^A-Za-z0-9_.-]", "_", action)
+        stem = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}_{len(self.captures):03d}_{tag}")
+        prof_path = stem + ".prof"
+        report_path = stem + "_allocations.txt"
+
+        profiler.dump_stats(prof_path)
+
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+        with open(report_path, "w") as f:
+            f.write(f"Action: {action}\n")
+            f.write(f"Duration: {elapsed_ms:.1f} ms\n")
+            f.write(f"Peak traced memory: {peak / 1024:.1f} KiB\n")
+            f.write(f"Top {self.top} allocation sites by size delta:\n\n")
+            for stat in stats[:self.top]:
+                f.write(f"{stat}\n")
+
+        self.captures.append((action, prof_path, report_path))
+        for listener in self.listeners:
+            listener(action, prof_path, report_path)
+        return prof_path, report_path
+
+
+# Process-wide session used by both applications.
+diagnostics = DiagnosticsSession()
@@ -0,0 +1,217 @@
+"""
+Batched enrollment engine for the registration-window rush.
+
+When registration opens, many desks, kiosks or service requests register
+students at once. :class:`EnrollmentEngine` takes their requests from any
+number of threads through a queue; one writer thread takes everything
+waiting (up to the batch size) and registers it in a single transaction,
+so hundreds of requests share one commit. Each request still gets its own
+result: every enrollment is one INSERT of the surrogate key pair into
+``enrollments``, where ``ON CONFLICT DO NOTHING`` on the primary key turns
+a repeated registration into an ignored row; only a request that inserted
+nothing needs a lookup to tell a repeat from an unknown student or course.
+(Unlike ``INSERT OR IGNORE``, the upsert clause does not override the
+``INSERT OR REPLACE`` of the roster triggers.)
+
+``python -m lab3_common.bench registration`` generates such a rush and
+reports throughput and tail latency.
+"""
+import queue
+import sqlite3
+import threading
+import time
+
+from lab3_common import config
+from lab3_common.db import connect
+from lab3_common.store import ChangeSet, retry_on_busy, transaction
+
+# Request outcomes.
+ENROLLED = "enrolled"
+ALREADY_ENROLLED = "already enrolled"
+NOT_FOUND = "student or course not found"
+
+ENROLL_SQL = """
+    INSERT INTO enrollments (student_key, course_key)
+    SELECT s.student_key, c.course_key FROM students s, courses c
+    WHERE s.student_id = ? AND c.course_id = ?
+    ON CONFLICT DO NOTHING
+"""
+
+ENROLLED_SQL = "SELECT 1 FROM student_courses WHERE student_id = ? AND course_id = ?"
+
+
+class EnrollmentTicket:
+    """
+    One enrollment request and, once ``done`` is set, its outcome.
+
+    :param student_id: The student's ID.
+    :param course_id: The course's ID.
+    """
+    def __init__(self, student_id, course_id):
+        self.student_id = student_id
+        self.course_id = course_id
+        self.submitted = time.perf_counter()
+        self.completed = None
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        """
+        Waits for the request's outcome.
+
+        :param timeout: Seconds to wait at most; None waits indefinitely.
+        :returns: :data:`ENROLLED`, :data:`ALREADY_ENROLLED` or :data:`NOT_FOUND`.
+        :rtype: str
+        :raises TimeoutError: If the request is still pending after ``timeout``.
+        :raises sqlite3.Error: If the batch holding the request could not be committed.
+        """
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"Enrollment of {self.student_id} in {self.course_id} is still pending")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    @property
+    def latency_ms(self):
+        """
+        Time from submission to outcome, in milliseconds, or None while pending.
+        """
+        return None if self.completed is None else (self.completed - self.submitted) * 1000
+
+
+@retry_on_busy
+def apply_enrollments(conn, tickets):
+    """
+    Registers a batch of requests in one transaction.
+
+    The IDs are resolved to surrogate keys inside the INSERT, so a request
+    for an unknown student or course inserts nothing, like a repeated one;
+    those are told apart afterwards by looking up the enrollment.
+
+    :param conn: The database connection.
+    :param tickets: The :class:`EnrollmentTicket` objects.
+    :returns: The outcome of each ticket, in order, and the records whose display rows changed.
+    :rtype: tuple[list[str], ChangeSet]
+    """
+    results = []
+    changes = ChangeSet()
+    with transaction(conn):
+        for ticket in tickets:
+            params = (ticket.student_id, ticket.course_id)
+            if conn.execute(ENROLL_SQL, params).rowcount:
+                results.append(ENROLLED)
+                changes.upsert("student", [ticket.student_id]).upsert("course", [ticket.course_id])
+            elif conn.execute(ENROLLED_SQL, params).fetchone():
+                results.append(ALREADY_ENROLLED)
+            else:
+                results.append(NOT_FOUND)
+    return results, changes
+
+
+class EnrollmentEngine:
+    """
+    Accepts enrollment requests from many threads and commits them in batches.
+
+    The writer thread uses its own connection. Committed changes are not
+    published to :mod:`lab3_common.store`'s listeners from that thread;
+    pass ``on_committed`` and hand them to the GUI thread if needed.
+
+    :param path: The database file; defaults to :data:`config.DB_PATH`.
+    :param batch_size: Maximum number of requests per transaction;
+        defaults to :data:`config.ENROLLMENT_BATCH`.
+    :param on_committed: Optional ``on_committed(changes)`` called on the
+        writer thread after each batch with the :class:`ChangeSet`.
+    """
+    def __init__(self, path=None, batch_size=None, on_committed=None):
+        self.path = path or config.DB_PATH
+        self.batch_size = batch_size or config.ENROLLMENT_BATCH
+        self.on_committed = on_committed
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.processed = 0
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="enrollment", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+
+    def submit(self, student_id, course_id):
+        """
+        Queues an enrollment request.
+
+        :param student_id: The student's ID.
+        :param course_id: The course's ID.
+        :returns: The ticket to wait on for the outcome.
+        :rtype: EnrollmentTicket
+        """
+        ticket = EnrollmentTicket(student_id, course_id)
+        self.requests.put(ticket)
+        return ticket
+
+    def enroll(self, student_id, course_id, timeout=None):
+        """
+        Queues an enrollment request and waits for its outcome.
+
+        :param student_id: The student's ID.
+        :param course_id: The course's ID.
+        :param timeout: Seconds to wait at most.
+        :returns: The outcome, see :meth:`EnrollmentTicket.wait`.
+        :rtype: str
+        """
+        return self.submit(student_id, course_id).wait(timeout)
+
+    def run(self):
+        """
+        Writer thread body: commits the queued requests in batches until closed.
+
+        :returns: None
+        """
+        conn = connect(self.path)
+        self.ready.set()
+        running = True
+        while running:
+            batch = [self.requests.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.requests.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [ticket for ticket in batch if ticket is not None]
+            if batch:
+                self.process(conn, batch)
+        conn.close()
+
+    def process(self, conn, batch):
+        """
+        Commits one batch and completes its tickets.
+
+        :param conn: The writer's connection.
+        :param batch: The :class:`EnrollmentTicket` objects.
+        :returns: None
+        """
+        try:
+            results, changes = apply_enrollments(conn, batch)
+        except sqlite3.Error as e:
+            results, changes = [None] * len(batch), None
+            for ticket in batch:
+                ticket.error = e
+        completed = time.perf_counter()
+        for ticket, result in zip(batch, results):
+            ticket.result = result
+            ticket.completed = completed
+            ticket.done.set()
+        self.batches += 1
+        self.processed += len(batch)
+        if changes and self.on_committed is not None:
+            self.on_committed(changes)
+
+    def close(self):
+        """
+        Stops the writer after the queued requests.
+
+        :returns: None
+        """
+        self.requests.put(None)
+        self.thread.join()
@@ -0,0 +1,208 @@
+"""
+Full and incremental (delta) CSV exports of the school tables.
+
+A full export writes every row of every table, with the columns listed in
+:data:`lab3_common.sync.SYNC_COLUMNS`; surrogate keys and row versions are
+internal to each database and are left out. A delta export writes only
+the rows inserted, updated or deleted since the last successful export,
+read from the change log (see :mod:`lab3_common.changelog`): one row per
+changed record with its current values, or a tombstone holding just the
+key for deleted records. Each export records the change sequence number it
+covers as the high-water mark for the next delta, after all files are
+written.
+
+Run ``python -m lab3_common.export full`` or ``... delta`` from the project
+root, e.g. from a nightly job.
+"""
+import argparse
+import csv
+import os
+from datetime import datetime
+
+from lab3_common import config
+from lab3_common.changelog import KEY_COLUMNS, fetch_rows, latest_changes, latest_sequence
+from lab3_common.db import connect
+from lab3_common.sync import SYNC_COLUMNS
+
+# Extra leading columns of delta files.
+DELTA_COLUMNS = ["_seq", "_op"]
+
+
+def exported_sequence(conn):
+    """
+    Returns the high-water mark of the last successful export.
+
+    :param conn: The database connection.
+    :returns: The change sequence number covered, or None if nothing was exported yet.
+    :rtype: int
+    """
+    row = conn.execute("SELECT value FROM changelog_state WHERE name = 'exported_seq'").fetchone()
+    return row[0] if row else None
+
+
+def set_exported_sequence(conn, seq):
+    """
+    Records the high-water mark of a successful export.
+
+    :param conn: The database connection.
+    :param seq: The change sequence number covered by the export.
+    :returns: None
+    """
+    with conn:
+        conn.execute("INSERT INTO changelog_state (name, value) VALUES ('exported_seq', ?) "
+                     "ON CONFLICT (name) DO UPDATE SET value = excluded.value", (seq,))
+
+
+def export_path(directory, table, kind, stamp):
+    """
+    Builds the file name of one exported table.
+
+    :param directory: The output directory.
+    :param table: The table name.
+    :param kind: "full" or "delta".
+    :param stamp: The export timestamp.
+    :returns: The file path.
+    :rtype: str
+    """
+    return os.path.join(directory, f"{table}_{kind}_{stamp}.csv")
+
+
+def read_snapshot(conn, func):
+    """
+    Runs a reader inside one read transaction, so it sees a single snapshot.
+
+    :param conn: The database connection.
+    :param func: Called as ``func()``; its result is returned.
+    :returns: The reader's result.
+    """
+    in_transaction = conn.in_transaction
+    if not in_transaction:
+        conn.execute("BEGIN")
+    try:
+        return func()
+    finally:
+        if not in_transaction:
+            conn.commit()
+
+
+def full_export(conn, directory="CSV"):
+    """
+    Exports every row of every table and resets the high-water mark.
+
+    :param conn: The database connection.
+    :param directory: The output directory.
+    :returns: ``(paths, seq)``: the written files and the covered sequence number.
+    :rtype: tuple[list[str], int]
+    """
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    def export():
+        seq = latest_sequence(conn)
+        paths = []
+        for table, columns in SYNC_COLUMNS.items():
+            cursor = conn.execute(f"SELECT {', '.join(columns)} FROM {table}")
+            path = export_path(directory, table, "full", stamp)
+            with open(path, "w", newline="") as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow([column[0] for column in cursor.description])
+                writer.writerows(cursor)
+            paths.append(path)
+        return paths, seq
+
+    paths, seq = read_snapshot(conn, export)
+    set_exported_sequence(conn, seq)
+    return paths, seq
+
+
+def delta_export(conn, directory="CSV"):
+    """
+    Exports the rows changed since the last successful export.
+
+    Several changes to one record collapse into one output row carrying the
+    newest sequence number: its current values with ``_op`` "I" or "U"
+    (both mean upsert, as earlier changes are folded in), or a tombstone
+    with ``_op`` "D" and only the key columns if the record no longer
+    exists. Tables without changes get no file.
+
+    :param conn: The database connection.
+    :param directory: The output directory.
+    :returns: ``(paths, from_seq, to_seq)``: the written files and the covered
+        sequence range, exclusive of ``from_seq``.
+    :rtype: tuple[list[str], int, int]
+    :raises LookupError: If no export was done yet, so there is no mark to start from.
+    :raises ChangelogTruncatedError: If changes since the mark were already
+        pruned; a full export is needed.
+    """
+    from_seq = exported_sequence(conn)
+    if from_seq is None:
+        raise LookupError("No previous export; run a full export first")
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    def export():
+        to_seq = latest_sequence(conn)
+        latest = latest_changes(conn, from_seq)
+
+        paths = []
+        for table, changes in latest.items():
+            if not changes:
+                continue
+            columns, rows_by_key = fetch_rows(conn, table, changes, SYNC_COLUMNS[table])
+            key_positions = [columns.index(column) for column in KEY_COLUMNS[table]]
+            path = export_path(directory, table, "delta", stamp)
+            with open(path, "w", newline="") as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(DELTA_COLUMNS + columns)
+                for key, change in sorted(changes.items(), key=lambda item: item[1].seq):
+                    row = rows_by_key.get(key)
+                    if row is None:
+                        tombstone = [None] * len(columns)
+                        for position, value in zip(key_positions, key.split("/", len(key_positions) - 1)):
+                            tombstone[position] = value
+                        writer.writerow([change.seq, "D"] + tombstone)
+                    else:
+                        writer.writerow([change.seq, change.operation] + list(row))
+            paths.append(path)
+        return paths, to_seq
+
+    paths, to_seq = read_snapshot(conn, export)
+    set_exported_sequence(conn, to_seq)
+    return paths, from_seq, to_seq
+
+
+def main(argv=None):
+    """
+    Command-line entry point.
+
+    :param argv: The arguments; defaults to ``sys.argv[1:]``.
+    :returns: None
+    """
+    parser = argparse.ArgumentParser(prog="python -m lab3_common.export", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("mode", choices=["full", "delta"])
+    parser.add_argument("--db", default=config.DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--dir", default="CSV", help="output directory (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    try:
+        if args.mode == "full":
+            paths, seq = full_export(conn, args.dir)
+            print(f"Full export up to change {seq}")
+        else:
+            try:
+                paths, from_seq, to_seq = delta_export(conn, args.dir)
+            except LookupError as e:
+                parser.exit(2, f"{e}\n")
+            if not paths:
+                print(f"No changes since change {from_seq}")
+            else:
+                print(f"Delta export of changes {from_seq + 1} to {to_seq}")
+        for path in paths:
+            print(f"  {path}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+In-memory lookup lists kept in step with the database.
+
+:class:`SortedKeys` is a sorted list of IDs with bisect-based insertion,
+removal and prefix search. :class:`KeyListModel` holds every ID of one
+record type in such a list, loaded once and then updated from the
+:class:`~lab3_common.store.ChangeSet` of each write, so every dropdown and
+ID field can share it and complete the typed text without querying the
+database again.
+"""
+from bisect import bisect_left, bisect_right
+from contextlib import ExitStack
+
+from lab3_common.store import add_change_listener, get_entity
+
+# Maximum number of suggestions offered for the typed text.
+SUGGESTION_LIMIT = 100
+
+
+class SortedKeys:
+    """
+    IDs kept in case-insensitive sorted order.
+
+    The IDs are stored next to a parallel list of their case-folded forms,
+    which is what the binary searches run on. IDs differing only in case
+    are ordered by the ID itself.
+
+    :param keys: The initial IDs.
+    """
+    def __init__(self, keys=()):
+        self.keys = sorted({str(key) for key in keys}, key=self.sort_key)
+        self.folded = [key.casefold() for key in self.keys]
+
+    @staticmethod
+    def sort_key(key):
+        """
+        Returns the key the IDs are ordered by.
+
+        :param key: The ID.
+        :returns: The case-folded ID, with the ID itself breaking ties.
+        :rtype: tuple
+        """
+        return key.casefold(), key
+
+    def index(self, key):
+        """
+        Returns the position of an ID.
+
+        :param key: The ID.
+        :returns: The position, or None if the ID is not in the list.
+        :rtype: int
+        """
+        key = str(key)
+        folded = key.casefold()
+        row = bisect_left(self.folded, folded)
+        while row < len(self.folded) and self.folded[row] == folded:
+            if self.keys[row] == key:
+                return row
+            row += 1
+        return None
+
+    def insertion_point(self, key):
+        """
+        Returns the position an ID would be inserted at.
+
+        :param key: The ID.
+        :returns: The position keeping the list sorted.
+        :rtype: int
+        """
+        key = str(key)
+        folded = key.casefold()
+        row = bisect_left(self.folded, folded)
+        while row < len(self.folded) and self.folded[row] == folded and self.keys[row] < key:
+            row += 1
+        return row
+
+    def add(self, key):
+        """
+        Inserts an ID unless it is already present.
+
+        :param key: The ID.
+        :returns: The position of the new ID, or None if it was present.
+        :rtype: int
+        """
+        key = str(key)
+        if self.index(key) is not None:
+            return None
+        row = self.insertion_point(key)
+        self.keys.insert(row, key)
+        self.folded.insert(row, key.casefold())
+        return row
+
+    def discard(self, key):
+        """
+        Removes an ID if it is present.
+
+        :param key: The ID.
+        :returns: The former position of the ID, or None if it was absent.
+        :rtype: int
+        """
+        row = self.index(key)
+        if row is not None:
+            del self.keys[row]
+            del self.folded[row]
+        return row
+
+    def prefix_range(self, prefix):
+        """
+        Returns the positions of the IDs starting with a prefix, ignoring case.
+
+        :param prefix: The typed text.
+        :returns: ``(start, stop)`` slice bounds.
+        :rtype: tuple[int, int]
+        """
+        prefix = prefix.casefold()
+        start = bisect_left(self.folded, prefix)
+        stop = bisect_right(self.folded, prefix + "\U0010ffff")
+        return start, stop
+
+    def matching(self, prefix, limit=None):
+        """
+        Returns the IDs starting with a prefix, ignoring case.
+
+        :param prefix: The typed text; empty returns every ID.
+        :param limit: The maximum number of IDs to return.
+        :returns: The matching IDs in sorted order.
+        :rtype: list[str]
+        """
+        start, stop = self.prefix_range(prefix)
+        if limit is not None:
+            stop = min(stop, start + limit)
+        return self.keys[start:stop]
+
+    def __contains__(self, key):
+        return self.index(key) is not None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __getitem__(self, row):
+        return self.keys[row]
+
+
+class KeyListModel:
+    """
+    Sorted list of every ID of one record type, shared by all views.
+
+    The IDs are loaded once and then maintained from the change sets
+    published by :mod:`lab3_common.store`: added records are inserted at
+    their sorted position and deleted ones removed. Views can register
+    hooks to be told about each single-row change.
+
+    :param conn: The database connection.
+    :param record_type: "student", "instructor" or "course".
+    """
+    def __init__(self, conn, record_type):
+        self.conn = conn
+        self.record_type = record_type
+        self.hooks = []
+        self.keys = SortedKeys()
+        self.reload()
+        add_change_listener(self.on_records_changed)
+
+    def add_hook(self, hook):
+        """
+        Registers a hook wrapped around every change of the list.
+
+        The hook is called as ``hook(kind, row)``, where ``kind`` is
+        "insert", "remove" or "reset", and must return a context manager
+        that is entered before the list changes and exited after it.
+
+        :param hook: The context manager factory.
+        :returns: None
+        """
+        self.hooks.append(hook)
+
+    def changing(self, kind, row=None):
+        """
+        Enters every hook for one change of the list.
+
+        :param kind: "insert", "remove" or "reset".
+        :param row: The affected position; None for "reset".
+        :returns: A context manager.
+        :rtype: contextlib.ExitStack
+        """
+        stack = ExitStack()
+        for hook in self.hooks:
+            stack.enter_context(hook(kind, row))
+        return stack
+
+    def reload(self):
+        """
+        Reads every ID from the database again.
+
+        :returns: None
+        """
+        entity = get_entity(self.record_type)
+        keys = [row[0] for row in self.conn.execute(f"SELECT {entity['key']} FROM {entity['table']}")]
+        with self.changing("reset"):
+            self.keys = SortedKeys(keys)
+
+    def on_records_changed(self, changes):
+        """
+        Applies a committed write to the list.
+
+        :param changes: The :class:`~lab3_common.store.ChangeSet` of the write.
+        :returns: None
+        """
+        for key in changes.deleted.get(self.record_type, ()):
+            row = self.keys.index(key)
+            if row is not None:
+                with self.changing("remove", row):
+                    self.keys.discard(key)
+        for key in changes.upserted.get(self.record_type, ()):
+            if key not in self.keys:
+                with self.changing("insert", self.keys.insertion_point(key)):
+                    self.keys.add(key)
+
+    def matching(self, prefix, limit=SUGGESTION_LIMIT):
+        """
+        Returns the IDs starting with the typed text, ignoring case.
+
+        :param prefix: The typed text; empty matches every ID.
+        :param limit: The maximum number of IDs to return; None returns all.
+        :returns: The matching IDs in sorted order.
+        :rtype: list[str]
+        """
+        return self.keys.matching(prefix, limit)
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __getitem__(self, row):
+        return self.keys[row]
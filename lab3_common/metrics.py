@@ -0,0 +1,266 @@
+"""
+Per-action latency metrics shared by the PyQt5 and Tkinter applications.
+
+Every user action is wrapped with :func:`timed_action`, which feeds a
+fixed-bucket histogram per action name. Snapshots can be written as JSON or
+in the Prometheus text exposition format.
+"""
+import contextlib
+import functools
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets, in milliseconds. Anything slower
+# than the last bound lands in the overflow bucket.
+BUCKET_BOUNDS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+DEFAULT_METRICS_DIR = "Metrics"
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram.
+
+    Observations are counted into the bucket whose upper bound is the first
+    one greater than or equal to the value. Percentiles are estimated by
+    linear interpolation inside the bucket that contains the requested rank.
+
+    :param bounds: Ascending bucket upper bounds in milliseconds.
+    """
+    def __init__(self, bounds=BUCKET_BOUNDS_MS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms):
+        """
+        Records one observation.
+
+        :param value_ms: The measured duration in milliseconds.
+        :returns: None
+        """
+        index = len(self.bounds)
+        for i, bound in enumerate(self.bounds):
+            if value_ms <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+
+    def percentile(self, q):
+        """
+        Estimates the given percentile from the bucket counts.
+
+        :param q: The percentile to estimate, between 0 and 100.
+        :returns: The estimated value in milliseconds, or 0.0 if empty.
+        :rtype: float
+        """
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if not bucket_count:
+                continue
+            if seen + bucket_count >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max_ms
+                upper = min(upper, self.max_ms)
+                fraction = (rank - seen) / bucket_count
+                return lower + (upper - lower) * fraction
+            seen += bucket_count
+        return self.max_ms
+
+    def snapshot(self):
+        """
+        Returns the histogram state as a JSON-serialisable dictionary.
+
+        :returns: Counts, sum, max and the p50/p95/p99 estimates.
+        :rtype: dict
+        """
+        return {
+            "count": self.count,
+            "sum_ms": round(self.total_ms, 3),
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "buckets": {
+                **{str(bound): count for bound, count in zip(self.bounds, self.counts)},
+                "+Inf": self.counts[-1],
+            },
+        }
+
+
+class ActionMetrics:
+    """
+    Registry of per-action latency histograms.
+
+    Listeners registered with :meth:`add_listener` are called after every
+    timed action, which is how the applications update their status bars.
+    """
+    def __init__(self, bounds=BUCKET_BOUNDS_MS):
+        self.bounds = tuple(bounds)
+        self.histograms = {}
+        self.errors = {}
+        self.listeners = []
+        self.action_hooks = []
+        self.last_action = None
+
+    def add_listener(self, listener):
+        """
+        Registers a callback invoked as ``listener(action, elapsed_ms)``.
+
+        :param listener: The callable to notify after each timed action.
+        :returns: None
+        """
+        self.listeners.append(listener)
+
+    def add_action_hook(self, hook):
+        """
+        Registers a hook wrapped around every timed action.
+
+        The hook is called as ``hook(action)`` and must return a context
+        manager, which is entered before the action runs and exited after it.
+
+        :param hook: The context manager factory.
+        :returns: None
+        """
+        self.action_hooks.append(hook)
+
+    def observe(self, action, elapsed_ms, failed=False):
+        """
+        Records the duration of one action and notifies the listeners.
+
+        :param action: The action name, e.g. ``"add_student"``.
+        :param elapsed_ms: The measured duration in milliseconds.
+        :param failed: Whether the action raised an exception.
+        :returns: None
+        """
+        histogram = self.histograms.get(action)
+        if histogram is None:
+            histogram = self.histograms[action] = Histogram(self.bounds)
+        histogram.observe(elapsed_ms)
+        if failed:
+            self.errors[action] = self.errors.get(action, 0) + 1
+        self.last_action = (action, elapsed_ms)
+        for listener in self.listeners:
+            try:
+                listener(action, elapsed_ms)
+            except Exception as e:
+                logger.warning("Metrics listener failed: %s", e)
+
+    def timed(self, name=None):
+        """
+        Decorator that times every call of the wrapped function.
+
+        :param name: The action name; defaults to the function name.
+        :returns: A decorator.
+        """
+        def decorator(func):
+            action = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with contextlib.ExitStack() as stack:
+                    for hook in self.action_hooks:
+                        stack.enter_context(hook(action))
+                    start = time.perf_counter()
+                    failed = False
+                    try:
+                        return func(*args, **kwargs)
+                    except BaseException:
+                        failed = True
+                        raise
+                    finally:
+                        self.observe(action, (time.perf_counter() - start) * 1000.0, failed)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        """
+        Returns all histograms and error counters as a dictionary.
+
+        :returns: A JSON-serialisable snapshot keyed by action name.
+        :rtype: dict
+        """
+        return {
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "actions": {
+                action: dict(histogram.snapshot(), errors=self.errors.get(action, 0))
+                for action, histogram in sorted(self.histograms.items())
+            },
+        }
+
+    def to_prometheus(self):
+        """
+        Renders the histograms in the Prometheus text exposition format.
+
+        :returns: The exposition text.
+        :rtype: str
+        """
+        lines = [
+            "# HELP school_action_duration_seconds Duration of user actions.",
+            "# TYPE school_action_duration_seconds histogram",
+        ]
+        for action, histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.bounds, histogram.counts):
+                cumulative += count
+                lines.append(
+                    f'school_action_duration_seconds_bucket{{action="{action}",le="{bound / 1000.0:g}"}} {cumulative}'
+                )
+            lines.append(f'school_action_duration_seconds_bucket{{action="{action}",le="+Inf"}} {histogram.count}')
+            lines.append(f'school_action_duration_seconds_sum{{action="{action}"}} {histogram.total_ms / 1000.0:.6f}')
+            lines.append(f'school_action_duration_seconds_count{{action="{action}"}} {histogram.count}')
+        lines.append("# HELP school_action_errors_total User actions that raised an exception.")
+        lines.append("# TYPE school_action_errors_total counter")
+        for action in sorted(self.histograms):
+            lines.append(f'school_action_errors_total{{action="{action}"}} {self.errors.get(action, 0)}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path=None):
+        """
+        Writes the metrics to a file.
+
+        Files ending in ``.prom`` or ``.txt`` get the Prometheus text format,
+        anything else gets JSON.
+
+        :param path: The output file; defaults to ``Metrics/action_metrics.json``.
+        :returns: The path that was written.
+        :rtype: str
+        """
+        if path is None:
+            path = os.path.join(DEFAULT_METRICS_DIR, "action_metrics.json")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            if path.endswith((".prom", ".txt")):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.snapshot(), f, indent=2)
+        return path
+
+
+# Process-wide registry used by both applications.
+metrics = ActionMetrics()
+
+
+def timed_action(name=None):
+    """
+    Times the decorated action with the process-wide :data:`metrics` registry.
+
+    :param name: The action name; defaults to the function name.
+    :returns: A decorator.
+    """
+    return metrics.timed(name)
@@ -0,0 +1,252 @@
+"""
+Sorted, filtered and paginated display rows.
+
+The display screens show one page of records at a time, ordered by any of
+their columns and narrowed by per-column filters. All of it happens in
+SQL: the order becomes ``ORDER BY column, ID``, the filters become
+``WHERE`` conditions, and the next page starts right after the last row
+of the current one (keyset pagination) instead of skipping rows with
+``OFFSET``. With the ``(column, ID)`` indexes of
+:func:`lab3_common.schema.add_sort_indexes`, a page reads about as many
+index entries as it shows, however many records there are, and the
+related IDs are only joined for the rows on the page.
+
+Text filters match values starting with the entered text (case-sensitive,
+so the index can be used); numeric columns match the entered number.
+When the filter and the order are on different columns, SQLite sorts the
+matching rows itself.
+"""
+from lab3_common import config
+from lab3_common.store import DISPLAY_QUERIES
+
+# Sortable and filterable columns of each display row, in display order, as
+# SQL expressions of the display query; the first one is the record's ID.
+# The last display column (the related IDs) is computed and can do neither.
+DISPLAY_COLUMNS = {
+    "student": ("s.student_id", "s.name", "s.age", "s.email"),
+    "instructor": ("i.instructor_id", "i.name", "i.age", "i.email"),
+    "course": ("c.course_id", "c.course_name", "c.instructor_id"),
+}
+
+# Columns filtered by exact number rather than by prefix.
+NUMERIC_COLUMNS = {"s.age", "i.age"}
+
+# Greater than any character, so "prefix" <= value < prefix + PREFIX_END
+# holds exactly for the values starting with "prefix".
+PREFIX_END = "\U0010ffff"
+
+
+def filter_conditions(record_type, filters):
+    """
+    Builds the WHERE conditions of the column filters.
+
+    :param record_type: "student", "instructor" or "course".
+    :param filters: Mapping of display column index to the entered text;
+        empty texts are ignored.
+    :returns: ``(conditions, params)``.
+    :rtype: tuple[list[str], list]
+    :raises ValueError: If a column cannot be filtered or a number is invalid.
+    """
+    columns = DISPLAY_COLUMNS[record_type]
+    conditions, params = [], []
+    for index, text in sorted((filters or {}).items()):
+        text = str(text).strip()
+        if not text:
+            continue
+        if not 0 <= index < len(columns):
+            raise ValueError(f"Column {index} of the {record_type} list cannot be filtered")
+        column = columns[index]
+        if column in NUMERIC_COLUMNS:
+            try:
+                params.append(int(text))
+            except ValueError:
+                raise ValueError(f"'{text}' is not a number")
+            conditions.append(f"{column} = ?")
+        else:
+            conditions.append(f"{column} >= ? AND {column} < ?")
+            params += [text, text + PREFIX_END]
+    return conditions, params
+
+
+def fetch_display_page(conn, record_type, sort=0, descending=False, filters=None, after=None, limit=None):
+    """
+    Fetches one page of display rows in the order of a column.
+
+    Rows are ordered by the sort column and then by ID. Records without a
+    value in the sort column (e.g. courses without an instructor) come
+    first in ascending and last in descending order, unless the column is
+    filtered; they are read by a second indexed query, so every query is a
+    range of one index.
+
+    :param conn: The database connection.
+    :param record_type: "student", "instructor" or "course".
+    :param sort: Index of the display column to order by.
+    :param descending: Order from the largest value.
+    :param filters: Mapping of display column index to filter text, see
+        :func:`filter_conditions`.
+    :param after: :func:`page_cursor` of the last row of the previous page;
+        None fetches the first page.
+    :param limit: Rows per page; defaults to :data:`config.PAGE_SIZE`.
+    :returns: ``(rows, more)``: the page's display rows and whether more rows follow.
+    :rtype: tuple[list[tuple], bool]
+    :raises ValueError: If the sort column or a filter is invalid.
+    """
+    limit = limit or config.PAGE_SIZE
+    columns = DISPLAY_COLUMNS[record_type]
+    if not 0 <= sort < len(columns):
+        raise ValueError(f"The {record_type} list cannot be sorted by column {sort}")
+    key, column = columns[0], columns[sort]
+    conditions, params = filter_conditions(record_type, filters)
+    direction = "DESC" if descending else "ASC"
+    compare = "<" if descending else ">"
+
+    # Sections of the order: records without a sort value, and the others.
+    # Paging resumes in the section holding the cursor.
+    if column == key or str((filters or {}).get(sort, "")).strip():
+        sections = [False]
+    else:
+        sections = [False, True] if descending else [True, False]
+    cursor_nulls = after is not None and column != key and after[0] is None
+    if after is not None:
+        sections = sections[sections.index(cursor_nulls):]
+
+    rows = []
+    for nulls in sections:
+        where, section_params = list(conditions), list(params)
+        if column != key:
+            where.append(f"{column} IS {'' if nulls else 'NOT '}NULL")
+        if after is not None and nulls == cursor_nulls:
+            if nulls or column == key:
+                where.append(f"{key} {compare} ?")
+                section_params.append(after[1])
+            else:
+                where.append(f"({column}, {key}) {compare} (?, ?)")
+                section_params += list(after)
+        order = f"{key} {direction}" if nulls or column == key else f"{column} {direction}, {key} {direction}"
+        sql = DISPLAY_QUERIES[record_type]
+        if where:
+            sql += f" WHERE {' AND '.join(where)}"
+        rows += conn.execute(f"{sql} ORDER BY {order} LIMIT ?", section_params + [limit + 1 - len(rows)]).fetchall()
+        if len(rows) > limit:
+            break
+    return rows[:limit], len(rows) > limit
+
+
+def page_cursor(row, sort=0):
+    """
+    Returns the position of a display row in the order of a column.
+
+    :param row: The display row.
+    :param sort: Index of the display column the page is ordered by.
+    :returns: ``(sort value, ID)``, to pass as ``after`` to :func:`fetch_display_page`.
+    :rtype: tuple
+    """
+    return row[sort], row[0]
+
+
+class DisplayPager:
+    """
+    The page shown by one display table: its order, filters and position.
+
+    The GUIs call :meth:`sort_by`, :meth:`set_filters`, :meth:`next_page`
+    and :meth:`previous_page` from their controls and then show
+    :attr:`rows`. The cursor each visited page started from is kept, so
+    paging backwards is as cheap as paging forwards.
+
+    :param conn: The database connection the pages are read from.
+    :param record_type: "student", "instructor" or "course".
+    :param page_size: Rows per page; defaults to :data:`config.PAGE_SIZE`.
+    """
+    def __init__(self, conn, record_type, page_size=None):
+        self.conn = conn
+        self.record_type = record_type
+        self.page_size = page_size or config.PAGE_SIZE
+        self.sort = 0
+        self.descending = False
+        self.filters = {}
+        self.starts = [None]
+        self.rows = []
+        self.more = False
+        self.load()
+
+    @property
+    def page(self):
+        """
+        The number of the current page, starting at 1.
+
+        :rtype: int
+        """
+        return len(self.starts)
+
+    def load(self):
+        """
+        Reads the current page again, e.g. after records were added.
+
+        :returns: The page's display rows.
+        :rtype: list[tuple]
+        """
+        self.rows, self.more = fetch_display_page(self.conn, self.record_type, self.sort, self.descending,
+                                                  self.filters, self.starts[-1], self.page_size)
+        return self.rows
+
+    def first_page(self):
+        """
+        Goes to the first page.
+
+        :returns: The page's display rows.
+        :rtype: list[tuple]
+        """
+        self.starts = [None]
+        return self.load()
+
+    def next_page(self):
+        """
+        Goes to the next page, if there is one.
+
+        :returns: The page's display rows.
+        :rtype: list[tuple]
+        """
+        if self.more and self.rows:
+            self.starts.append(page_cursor(self.rows[-1], self.sort))
+            self.load()
+        return self.rows
+
+    def previous_page(self):
+        """
+        Goes to the previous page, if there is one.
+
+        :returns: The page's display rows.
+        :rtype: list[tuple]
+        """
+        if len(self.starts) > 1:
+            self.starts.pop()
+            self.load()
+        return self.rows
+
+    def sort_by(self, column):
+        """
+        Orders by a column, or reverses the order if it already is, from the first page.
+
+        :param column: Index of the display column.
+        :returns: The page's display rows.
+        :rtype: list[tuple]
+        :raises ValueError: If the column cannot be sorted.
+        """
+        if column >= len(DISPLAY_COLUMNS[self.record_type]):
+            raise ValueError("This column cannot be sorted")
+        self.descending = not self.descending if column == self.sort else False
+        self.sort = column
+        return self.first_page()
+
+    def set_filters(self, filters):
+        """
+        Replaces the column filters and goes to the first page.
+
+        :param filters: Mapping of display column index to filter text.
+        :returns: The page's display rows.
+        :rtype: list[tuple]
+        :raises ValueError: If a filter is invalid; the previous filters stay.
+        """
+        filter_conditions(self.record_type, filters)
+        self.filters = dict(filters)
+        return self.first_page()
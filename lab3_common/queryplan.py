@@ -0,0 +1,301 @@
+"""
+Query-plan checks for the statements the applications issue.
+
+The statements are collected in two ways: the shared modules' read and
+write paths (display rows and pages, searches, edits, registrations, assignments,
+reports, change log, ID lookups, sync) are run against a populated throw-away
+database with a trace callback, and the statements written inline in the
+two GUIs (``perform_search``, ``search_records``, ``load_*_from_db``) are
+read from their source. Each statement is run through ``EXPLAIN QUERY
+PLAN`` on that database, and it fails the check if it reads a table row
+by row instead of searching an index, needs an automatic index, or sorts
+with a temporary B-tree. Whole-table listings may scan the table they
+list, as their outermost loop only; a scan anywhere else, e.g. of the
+enrollments once per listed row, still fails.
+
+Run ``python -m lab3_common.queryplan`` from the project root after adding
+or changing a query; it exits with status 1 if any statement fails.
+``tests/test_queryplan.py`` runs the same check under pytest.
+"""
+import argparse
+import ast
+import os
+import re
+import tempfile
+from collections import namedtuple
+from contextlib import contextmanager
+
+from lab3_common.bench import populate
+from lab3_common.changelog import KEY_COLUMNS, changes_since, fetch_rows
+from lab3_common.console import print_table
+from lab3_common.db import connect
+from lab3_common.enrollment import EnrollmentTicket, apply_enrollments
+from lab3_common.lookup import KeyListModel
+from lab3_common.paging import DISPLAY_COLUMNS, DisplayPager
+from lab3_common.reports import REPORTS, check_summaries, read_report
+from lab3_common.service import SEARCH_COLUMNS, SchoolService
+from lab3_common.store import (ENTITIES, ChangeSet, LocalStore, fetch_display_rows, fetch_versions,
+                               related_changes)
+from lab3_common.sync import (DEPTH, SYNC_COLUMNS, Difference, apply, bucket_hashes, diff, node_digests,
+                              rebuild_tree, update_tree)
+
+# GUI modules whose inline SQL is checked, relative to the project root.
+GUI_SOURCES = (
+    os.path.join("lab3_Tkinter", "main_menu_sql.py"),
+    os.path.join("lab3_PyQt5", "main_PyQt5_sql.py"),
+)
+
+# GUI methods whose statements list a whole table.
+GUI_LISTINGS = {"load_courses_from_db", "load_instructors_from_db", "load_students_from_db"}
+
+# Statement verbs that have a query plan worth checking.
+PLANNED_VERBS = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+Statement = namedtuple("Statement", ["source", "sql", "listing"])
+
+
+def gui_statements(path):
+    """
+    Reads the SQL literals passed to ``execute`` in a GUI module.
+
+    The module is parsed, not imported, so the GUI toolkit is not needed.
+
+    :param path: The module's file.
+    :returns: The statements, named after the file and method.
+    :rtype: list[Statement]
+    """
+    with open(path, encoding="utf-8") as source:
+        tree = ast.parse(source.read(), path)
+    statements = []
+    for function in ast.walk(tree):
+        if not isinstance(function, ast.FunctionDef):
+            continue
+        for node in ast.walk(function):
+            if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                    and node.func.attr in ("execute", "executemany") and node.args
+                    and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)):
+                statements.append(Statement(f"{os.path.basename(path)}:{function.name}", node.args[0].value,
+                                            function.name in GUI_LISTINGS))
+    return statements
+
+
+class StatementTrace:
+    """
+    Records the distinct statements a connection runs.
+
+    :param conn: The traced connection.
+    """
+    def __init__(self, conn):
+        self.conn = conn
+        self.statements = {}
+        self.source = None
+        self.listing = False
+
+    @contextmanager
+    def running(self, source, listing=False):
+        """
+        Traces the statements run inside the block.
+
+        :param source: The name the statements are reported under.
+        :param listing: Whether the block lists whole tables.
+        :returns: A context manager.
+        """
+        self.source, self.listing = source, listing
+        self.conn.set_trace_callback(self.record)
+        try:
+            yield
+        finally:
+            self.conn.set_trace_callback(None)
+
+    def record(self, sql):
+        """
+        Trace callback: keeps the first occurrence of each planned statement.
+
+        :param sql: The statement with its parameters expanded.
+        :returns: None
+        """
+        words = sql.split(None, 1)
+        if not words or words[0].upper() not in PLANNED_VERBS or "sqlite_master" in sql:
+            return
+        self.statements.setdefault(sql, Statement(self.source, sql, self.listing))
+
+
+def run_workload(conn, path):
+    """
+    Runs the shared read and write paths once under a trace.
+
+    :param conn: A connection to a populated database.
+    :param path: The database file, for the components opening their own connections.
+    :returns: The statements run.
+    :rtype: list[Statement]
+    """
+    trace = StatementTrace(conn)
+    store = LocalStore(conn)
+    rebuild_tree(conn)
+    for record_type, entity in ENTITIES.items():
+        keys = [row[0] for row in conn.execute(f"SELECT {entity['key']} FROM {entity['table']} LIMIT 3")]
+        with trace.running(f"list {record_type}s", listing=True):
+            fetch_display_rows(conn, record_type)
+            KeyListModel(conn, record_type)
+        with trace.running(f"page {record_type}s", listing=True):
+            for sort in range(len(DISPLAY_COLUMNS[record_type])):
+                for descending in (False, True):
+                    pager = DisplayPager(conn, record_type, page_size=10)
+                    pager.sort, pager.descending = sort, descending
+                    pager.next_page()
+                    pager.set_filters({sort: pager.rows[-1][sort] or ""})
+                    pager.next_page()
+        with trace.running(f"show {record_type}s"):
+            fetch_display_rows(conn, record_type, keys)
+            related_changes(conn, record_type, keys, ChangeSet())
+            fetch_versions(conn, record_type, keys)
+
+    service = SchoolService(path, readers=1)
+    try:
+        with trace.running("search"):
+            for record_type, fields in SEARCH_COLUMNS.items():
+                for field in fields:
+                    service.search(conn, record_type, field, "x")
+    finally:
+        service.close()
+
+    with trace.running("add records"):
+        store.insert_record("instructor", {"instructor_id": "QI", "name": "Plan", "age": 40, "email": "qi@school.edu"})
+        store.insert_record("course", {"course_id": "QC", "course_name": "Plan", "instructor_id": None})
+        store.insert_record("student", {"student_id": "QS", "name": "Plan", "age": 20, "email": "qs@school.edu"})
+    with trace.running("register and assign"):
+        store.enroll_student("QS", "QC")
+        store.assign_instructor("QI", "QC")
+        apply_enrollments(conn, [EnrollmentTicket("QS", "C0"), EnrollmentTicket("QS", "C0"),
+                                 EnrollmentTicket("QS", "none")])
+    with trace.running("edit records"):
+        store.update_records("student", {"QS": {"age": 21}})
+        store.update_records("student", {"QS": {"age": 22}}, fetch_versions(conn, "student", ["QS"]))
+        store.update_records("course", {"QC": {"course_name": "Plans"}})
+    with trace.running("delete records"):
+        store.delete_records("student", ["QS"])
+        store.delete_records("course", ["QC"])
+        store.delete_records("instructor", ["QI"])
+
+    with trace.running("reports", listing=True):
+        for report in REPORTS:
+            read_report(conn, report)
+            read_report(conn, report, limit=10)
+        check_summaries(conn)
+    with trace.running("report for one record"):
+        for report in REPORTS:
+            read_report(conn, report, "x")
+    with trace.running("change log"):
+        changes = next(changes_since(conn, 0))
+        for table in KEY_COLUMNS:
+            fetch_rows(conn, table, [change.key for change in changes if change.table == table][:3])
+    with trace.running("sync"):
+        update_tree(conn)
+        diff(conn, conn)
+        for table in SYNC_COLUMNS:
+            node_digests(conn, table, DEPTH, [0, 1])
+            bucket_hashes(conn, table, [0, 1])
+        # Rewrites two rows of each table with their own values and deletes a missing one
+        apply(conn, conn, {table: Difference([row[0] for row in conn.execute(
+                               "SELECT row_key FROM sync_rows WHERE table_name = ? LIMIT 2", (table,))],
+                                             ["/".join(["none"] * len(KEY_COLUMNS[table]))])
+                           for table in SYNC_COLUMNS})
+    return list(trace.statements.values())
+
+
+def plan(conn, sql):
+    """
+    Returns the query plan of a statement.
+
+    :param conn: The database connection.
+    :param sql: The statement; ``?`` parameters are bound to NULL.
+    :returns: The plan rows as ``(id, parent, detail)``.
+    :rtype: list[tuple]
+    """
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", [None] * sql.count("?")).fetchall()
+    return [(row[0], row[1], row[-1]) for row in rows]
+
+
+def plan_problems(rows, listing=False, views=()):
+    """
+    Lists what is wrong with a query plan.
+
+    Scans of a ``VALUES`` list, and of the rows a statement on a view
+    collected for the view's ``INSTEAD OF`` trigger, read no table and
+    are not problems.
+
+    :param rows: The plan rows from :func:`plan`.
+    :param listing: Whether the statement lists a whole table, so its
+        outermost loop may scan it.
+    :param views: Names of the database's views.
+    :returns: One description per problem; empty if the plan is fine.
+    :rtype: list[str]
+    """
+    outer = next((row_id for row_id, parent, detail in rows
+                  if parent == 0 and detail.startswith(("SCAN", "SEARCH"))), None)
+    problems = []
+    for row_id, parent, detail in rows:
+        if detail.startswith("USE TEMP B-TREE"):
+            problems.append(detail.lower().replace("use temp b-tree", "temporary B-tree"))
+        elif "AUTOMATIC" in detail:
+            problems.append(f"automatic index: {detail}")
+        elif detail.startswith("SCAN") and not re.match(r"SCAN (\d+ )?CONSTANT ROW", detail):
+            if not (listing and row_id == outer) and detail.split()[1] not in views:
+                problems.append(f"full scan: {detail}")
+    return problems
+
+
+def check(conn, statements):
+    """
+    Checks the plan of every statement.
+
+    :param conn: A connection to the database the plans are made on.
+    :param statements: The :class:`Statement` objects.
+    :returns: ``(statement, plan rows, problems)`` for each statement.
+    :rtype: list[tuple]
+    """
+    views = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'view'")}
+    return [(statement, rows, plan_problems(rows, statement.listing, views))
+            for statement in statements
+            for rows in [plan(conn, statement.sql)]]
+
+
+def main(argv=None):
+    """
+    Command-line entry point.
+
+    :param argv: The arguments; defaults to ``sys.argv[1:]``.
+    :returns: None
+    """
+    parser = argparse.ArgumentParser(prog="python -m lab3_common.queryplan", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, default=5000, help="students in the generated database (default: %(default)s)")
+    parser.add_argument("--verbose", action="store_true", help="print the plan of every statement")
+    args = parser.parse_args(argv)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "queryplan.sqlite")
+        conn = connect(path)
+        populate(conn, args.students)
+        statements = run_workload(conn, path)
+        for source in GUI_SOURCES:
+            statements += gui_statements(os.path.join(root, source))
+        results = check(conn, statements)
+        conn.close()
+
+    failures = []
+    for statement, rows, problems in results:
+        sql = " ".join(statement.sql.split())
+        if args.verbose:
+            print(f"{statement.source}: {sql}")
+            for _, _, detail in rows:
+                print(f"    {detail}")
+        failures += [(statement.source, problem, sql[:80]) for problem in problems]
+    if failures:
+        print_table(["source", "problem", "statement"], failures)
+        parser.exit(1, f"{len(failures)} problem(s) in {len(results)} statements\n")
+    print(f"{len(results)} statements use indexes")
+
+
+if __name__ == "__main__":
+    main()
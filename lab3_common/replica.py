@@ -0,0 +1,108 @@
+"""
+In-memory read replica of the school database.
+
+:class:`ReadReplica` copies the database into a ``:memory:`` connection
+with the backup API and keeps it current from the change log: each sync
+reads the rows changed since the last one from the file database and
+replaces them in the replica. Listings, searches and exports can then run
+on the replica without touching the file that interactive writes use.
+"""
+import sqlite3
+
+from lab3_common.changelog import ChangelogTruncatedError, fetch_rows, key_condition, latest_changes, latest_sequence
+from lab3_common.roster import disable_rosters
+from lab3_common.store import add_change_listener, chunked
+
+
+class ReadReplica:
+    """
+    ``:memory:`` copy of a database, synced from its change log.
+
+    The replica syncs after every write published through
+    :mod:`lab3_common.store` and whenever :meth:`sync` is called, e.g. from
+    a timer to pick up writes made by other processes.
+
+    :param source: The connection to the file database.
+    """
+    def __init__(self, source):
+        self.source = source
+        self.conn = sqlite3.connect(":memory:")
+        self.seq = 0
+        self.refresh()
+        add_change_listener(self.on_records_changed)
+
+    def refresh(self):
+        """
+        Replaces the replica with a full copy of the source database.
+
+        The copied table triggers are dropped: the replica is only written
+        by :meth:`sync`, which copies rows as they are in the source, and
+        the tables the triggers maintain are read from the source. The
+        triggers of the ``student_courses`` view stay, as sync writes
+        enrollments through it. Roster tables are dropped too, so listings
+        on the replica use the joins over the synced base tables.
+
+        :returns: None
+        """
+        self.seq = latest_sequence(self.source)
+        self.source.backup(self.conn)
+        triggers = self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                                     "AND tbl_name NOT IN (SELECT name FROM sqlite_master WHERE type = 'view')")
+        for (name,) in triggers.fetchall():
+            self.conn.execute(f"DROP TRIGGER {name}")
+        self.conn.commit()
+        disable_rosters(self.conn)
+
+    def sync(self):
+        """
+        Applies the changes made since the last sync.
+
+        Every changed row is deleted from the replica and, unless it was
+        deleted in the source, copied over again. Enrollments are deleted
+        before and copied after the students and courses, as the
+        ``student_courses`` view resolves their IDs through them. If the
+        change log was pruned past the replica's position, the replica is
+        copied anew.
+
+        Nothing is synced while the source connection has a transaction
+        open, e.g. a write-behind group: its rows may still be rolled back,
+        and their change-log sequence numbers reused by later writes. The
+        group publishes its changes once it commits, which syncs then.
+
+        :returns: The number of rows synced.
+        :rtype: int
+        """
+        if self.source.in_transaction:
+            return 0
+        to_seq = latest_sequence(self.source)
+        if to_seq == self.seq:
+            return 0
+        try:
+            latest = latest_changes(self.source, self.seq)
+        except ChangelogTruncatedError:
+            self.refresh()
+            return 0
+
+        tables = [table for table, changes in latest.items() if changes]
+        with self.conn:
+            for table in reversed(tables):
+                for chunk in chunked(latest[table]):
+                    condition, params = key_condition(table, chunk)
+                    self.conn.execute(f"DELETE FROM {table} WHERE {condition}", params)
+            for table in tables:
+                columns, rows_by_key = fetch_rows(self.source, table, latest[table])
+                placeholders = ", ".join("?" * len(columns))
+                self.conn.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                                      rows_by_key.values())
+        synced = sum(len(latest[table]) for table in tables)
+        self.seq = max([to_seq] + [change.seq for changes in latest.values() for change in changes.values()])
+        return synced
+
+    def on_records_changed(self, changes):
+        """
+        Syncs the replica after a write through the application.
+
+        :param changes: The :class:`~lab3_common.store.ChangeSet` of the write.
+        :returns: None
+        """
+        self.sync()
@@ -0,0 +1,124 @@
+"""
+Enrollment statistics read from the trigger-maintained summary tables.
+
+The summary tables (see :func:`lab3_common.schema.add_summary_tables`)
+hold one precomputed count per course, instructor and student, so a report
+reads stored rows instead of counting enrollments. :func:`check_summaries`
+recomputes the counts from the base tables to verify them, and
+:func:`rebuild` replaces them with the recomputed values.
+
+Run ``python -m lab3_common.reports <report>`` from the project root, where
+``<report>`` is one of the names in :data:`REPORTS`, ``check`` or
+``rebuild``.
+"""
+import argparse
+
+from lab3_common import config
+from lab3_common.console import print_table
+from lab3_common.db import connect
+from lab3_common.schema import SUMMARY_TABLES, rebuild_summaries
+
+# Available reports: name -> (title, summary table, column headers).
+REPORTS = {
+    "courses": ("Students per course", "course_enrollment_counts", ("Course ID", "Enrolled Students")),
+    "instructors": ("Teaching load per instructor", "instructor_course_counts", ("Instructor ID", "Courses")),
+    "students": ("Courses per student", "student_course_counts", ("Student ID", "Courses")),
+}
+
+
+def read_report(conn, report, key=None, limit=None):
+    """
+    Reads a report from its summary table, largest counts first.
+
+    :param conn: The database connection.
+    :param report: A name from :data:`REPORTS`.
+    :param key: Only return the row of this course, instructor or student ID.
+    :param limit: The maximum number of rows.
+    :returns: Rows of ``(id, count)``.
+    :rtype: list[tuple]
+    :raises ValueError: If the report is unknown.
+    """
+    try:
+        table = REPORTS[report][1]
+    except KeyError:
+        raise ValueError(f"Unknown report: {report}")
+    key_column, count_column, _ = SUMMARY_TABLES[table]
+    sql = f"SELECT {key_column}, {count_column} FROM {table}"
+    params = []
+    if key is not None:
+        sql += f" WHERE {key_column} = ?"
+        params.append(key)
+    sql += f" ORDER BY {count_column} DESC, {key_column}"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return conn.execute(sql, params).fetchall()
+
+
+def check_summaries(conn):
+    """
+    Compares every summary table with counts recomputed from the base tables.
+
+    :param conn: The database connection.
+    :returns: Mismatches as ``(table, id, stored, actual)``; a missing row has None.
+    :rtype: list[tuple]
+    """
+    mismatches = []
+    for table, (key_column, count_column, query) in SUMMARY_TABLES.items():
+        actual = dict(conn.execute(query).fetchall())
+        stored = dict(conn.execute(f"SELECT {key_column}, {count_column} FROM {table}").fetchall())
+        for key in sorted(actual.keys() | stored.keys()):
+            if actual.get(key) != stored.get(key):
+                mismatches.append((table, key, stored.get(key), actual.get(key)))
+    return mismatches
+
+
+def rebuild(conn):
+    """
+    Rebuilds every summary table from scratch in one transaction.
+
+    :param conn: The database connection.
+    :returns: The mismatches that were repaired, as returned by :func:`check_summaries`.
+    :rtype: list[tuple]
+    """
+    with conn:
+        mismatches = check_summaries(conn)
+        rebuild_summaries(conn)
+    return mismatches
+
+
+def main(argv=None):
+    """
+    Command-line entry point.
+
+    :param argv: The arguments; defaults to ``sys.argv[1:]``.
+    :returns: None
+    """
+    parser = argparse.ArgumentParser(prog="python -m lab3_common.reports", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("report", choices=list(REPORTS) + ["check", "rebuild"])
+    parser.add_argument("--id", help="only show this course, instructor or student")
+    parser.add_argument("--top", type=int, help="only show the N largest counts")
+    parser.add_argument("--db", default=config.DB_PATH, help="database file (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    try:
+        if args.report in REPORTS:
+            title, _, headers = REPORTS[args.report]
+            print(title)
+            print_table(list(headers), read_report(conn, args.report, args.id, args.top))
+        elif args.report == "check":
+            mismatches = check_summaries(conn)
+            if mismatches:
+                print_table(["table", "id", "stored", "actual"], mismatches)
+                parser.exit(1, f"{len(mismatches)} summary row(s) out of date; run 'rebuild'\n")
+            print("Summary tables are consistent")
+        else:
+            mismatches = rebuild(conn)
+            print(f"Summary tables rebuilt; {len(mismatches)} row(s) were out of date")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Optional roster tables holding the pre-joined display rows.
+
+With rosters enabled, every student, instructor and course has one row in
+its roster table with exactly the values the listing screens show,
+including the comma-separated related IDs. Triggers recompute only the
+affected rows on every enrollment, assignment, edit and delete, so
+:func:`lab3_common.store.fetch_display_rows` reads a listing with a plain
+scan of the roster table instead of joining and concatenating.
+
+The trade-off is extra work on every write; ``python -m lab3_common.bench
+roster`` measures both sides.
+
+Rosters are created by :func:`lab3_common.db.connect` when
+``SCHOOL_ROSTER`` is on, and stay until they are dropped with ``python -m
+lab3_common.roster disable`` from the project root.
+"""
+import argparse
+import sqlite3
+
+from lab3_common import config
+from lab3_common.schema import execute_statements, migrate
+from lab3_common.store import DISPLAY_KEYS, DISPLAY_QUERIES, ENTITIES, ROSTER_TABLES
+
+ROSTER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS student_roster (
+    student_id     VARCHAR(50) PRIMARY KEY,
+    name           VARCHAR(100),
+    age            INT,
+    email          VARCHAR(100),
+    courses        TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS instructor_roster (
+    instructor_id  VARCHAR(50) PRIMARY KEY,
+    name           VARCHAR(100),
+    age            INT,
+    email          VARCHAR(100),
+    courses        TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS course_roster (
+    course_id      VARCHAR(50) PRIMARY KEY,
+    course_name    VARCHAR(100),
+    instructor_id  VARCHAR(50),
+    students       TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def refresh_row(record_type, key):
+    """
+    Builds the statement recomputing one roster row.
+
+    :param record_type: "student", "instructor" or "course".
+    :param key: The SQL expression of the record's key, e.g. ``NEW.student_id``.
+    :returns: The INSERT OR REPLACE statement; it inserts nothing if the record does not exist.
+    :rtype: str
+    """
+    return (f"INSERT OR REPLACE INTO {ROSTER_TABLES[record_type]} "
+            f"{DISPLAY_QUERIES[record_type].strip()} WHERE {DISPLAY_KEYS[record_type]} = {key};")
+
+
+def delete_row(record_type, key):
+    """
+    Builds the statement removing one roster row.
+
+    :param record_type: "student", "instructor" or "course".
+    :param key: The SQL expression of the record's key, e.g. ``OLD.student_id``.
+    :returns: The DELETE statement.
+    :rtype: str
+    """
+    return f"DELETE FROM {ROSTER_TABLES[record_type]} WHERE {ENTITIES[record_type]['key']} = {key};"
+
+
+def enrolled_id(record_type, row):
+    """
+    Builds the expression looking up the external ID of an enrollment's student or course.
+
+    :param record_type: "student" or "course".
+    :param row: "NEW" or "OLD".
+    :returns: The scalar subquery on the surrogate key stored in ``enrollments``.
+    :rtype: str
+    """
+    entity = ENTITIES[record_type]
+    return f"(SELECT {entity['key']} FROM {entity['table']} WHERE {record_type}_key = {row}.{record_type}_key)"
+
+
+def trigger(name, event, table, *statements):
+    """
+    Builds one roster trigger.
+
+    :param name: The trigger name, without the ``roster_`` prefix.
+    :param event: The event, e.g. "AFTER INSERT".
+    :param table: The table the trigger is on.
+    :param statements: The statements of the trigger body.
+    :returns: The CREATE TRIGGER statement.
+    :rtype: str
+    """
+    body = "\n    ".join(statements)
+    return f"CREATE TRIGGER IF NOT EXISTS roster_{name} {event} ON {table}\nBEGIN\n    {body}\nEND;\n"
+
+
+def roster_triggers():
+    """
+    Builds every trigger keeping the roster tables current.
+
+    :returns: The CREATE TRIGGER statements.
+    :rtype: str
+    """
+    triggers = []
+    for record_type in ("student", "instructor"):
+        table = ENTITIES[record_type]["table"]
+        key = ENTITIES[record_type]["key"]
+        triggers += [
+            trigger(f"{table}_insert", "AFTER INSERT", table, refresh_row(record_type, f"NEW.{key}")),
+            trigger(f"{table}_update", "AFTER UPDATE", table,
+                    delete_row(record_type, f"OLD.{key}"), refresh_row(record_type, f"NEW.{key}")),
+            trigger(f"{table}_delete", "AFTER DELETE", table, delete_row(record_type, f"OLD.{key}")),
+        ]
+    triggers += [
+        trigger("courses_insert", "AFTER INSERT", "courses",
+                refresh_row("course", "NEW.course_id"), refresh_row("instructor", "NEW.instructor_id")),
+        trigger("courses_update", "AFTER UPDATE", "courses",
+                delete_row("course", "OLD.course_id"), refresh_row("course", "NEW.course_id"),
+                refresh_row("instructor", "OLD.instructor_id"), refresh_row("instructor", "NEW.instructor_id")),
+        trigger("courses_delete", "AFTER DELETE", "courses",
+                delete_row("course", "OLD.course_id"), refresh_row("instructor", "OLD.instructor_id")),
+        trigger("enrollments_insert", "AFTER INSERT", "enrollments",
+                refresh_row("student", enrolled_id("student", "NEW")), refresh_row("course", enrolled_id("course", "NEW"))),
+        trigger("enrollments_delete", "AFTER DELETE", "enrollments",
+                refresh_row("student", enrolled_id("student", "OLD")), refresh_row("course", enrolled_id("course", "OLD"))),
+    ]
+    return "\n".join(triggers)
+
+
+def rosters_enabled(conn):
+    """
+    Tells whether the roster tables exist in a database.
+
+    :param conn: The database connection.
+    :returns: True if rosters are enabled.
+    :rtype: bool
+    """
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'student_roster'").fetchone() is not None
+
+
+def rebuild_rosters(conn):
+    """
+    Recomputes every roster row from the base tables.
+
+    Runs inside the caller's transaction.
+
+    :param conn: The database connection.
+    :returns: None
+    """
+    for record_type, table in ROSTER_TABLES.items():
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(f"INSERT INTO {table} {DISPLAY_QUERIES[record_type]}")
+
+
+def enable_rosters(conn):
+    """
+    Creates and fills the roster tables and their triggers, if missing.
+
+    :param conn: The database connection.
+    :returns: True if the rosters were created now.
+    :rtype: bool
+    """
+    if rosters_enabled(conn):
+        return False
+    with conn:
+        execute_statements(conn, ROSTER_SCHEMA)
+        execute_statements(conn, roster_triggers())
+        rebuild_rosters(conn)
+    return True
+
+
+def disable_rosters(conn):
+    """
+    Drops the roster tables and their triggers, if present.
+
+    :param conn: The database connection.
+    :returns: True if the rosters were dropped now.
+    :rtype: bool
+    """
+    if not rosters_enabled(conn):
+        return False
+    with conn:
+        triggers = conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'roster\\_%' ESCAPE '\\'")
+        for (name,) in triggers.fetchall():
+            conn.execute(f"DROP TRIGGER {name}")
+        for table in ROSTER_TABLES.values():
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+    return True
+
+
+def set_rosters(conn, enabled):
+    """
+    Enables or disables the roster tables to match the configuration.
+
+    :param conn: The database connection.
+    :param enabled: Whether rosters should be enabled.
+    :returns: None
+    """
+    if enabled:
+        enable_rosters(conn)
+    else:
+        disable_rosters(conn)
+
+
+def main(argv=None):
+    """
+    Command-line entry point.
+
+    The database is opened without :func:`lab3_common.db.connect`, which
+    imports this module.
+
+    :param argv: The arguments; defaults to ``sys.argv[1:]``.
+    :returns: None
+    """
+    parser = argparse.ArgumentParser(prog="python -m lab3_common.roster", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["enable", "disable"])
+    parser.add_argument("--db", default=config.DB_PATH, help="database file (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db, timeout=config.BUSY_TIMEOUT_MS / 1000)
+    try:
+        conn.execute("PRAGMA foreign_keys = ON")
+        migrate(conn)
+        if args.command == "enable":
+            print("Roster tables created" if enable_rosters(conn) else "Roster tables already enabled")
+        else:
+            print("Roster tables dropped" if disable_rosters(conn) else "Roster tables not enabled")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,675 @@
+"""
+Database schema for the school system.
+
+:data:`BASE_SCHEMA` is the original schema documented in the README; the
+migrations registered below upgrade it in place, tracked by
+``PRAGMA user_version``.
+"""
+import sqlite3
+
+BASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    student_id     VARCHAR(50) PRIMARY KEY,
+    name           VARCHAR(100) NOT NULL,
+    age            INT,
+    email          VARCHAR(100) UNIQUE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS instructors (
+    instructor_id  VARCHAR(50) PRIMARY KEY,
+    name           VARCHAR(100) NOT NULL,
+    age            INT,
+    email          VARCHAR(100) UNIQUE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS courses (
+    course_id      VARCHAR(50) PRIMARY KEY,
+    course_name    VARCHAR(100) NOT NULL,
+    instructor_id  VARCHAR(50),
+    FOREIGN KEY (instructor_id) REFERENCES instructors(instructor_id)
+);
+
+CREATE TABLE IF NOT EXISTS student_courses (
+    student_id   VARCHAR(50),
+    course_id    VARCHAR(50),
+    PRIMARY KEY (student_id, course_id),
+    FOREIGN KEY (student_id) REFERENCES students(student_id),
+    FOREIGN KEY (course_id) REFERENCES courses(course_id)
+);
+"""
+
+
+def create_schema(conn):
+    """
+    Creates any missing tables of the base schema.
+
+    :param conn: The database connection.
+    :returns: None
+    """
+    conn.executescript(BASE_SCHEMA)
+
+
+# Ordered schema migrations, applied by :func:`migrate` according to
+# ``PRAGMA user_version``. Each entry is ``(version, function)``.
+MIGRATIONS = []
+
+
+def migration(version):
+    """
+    Registers a function as the migration to the given schema version.
+
+    :param version: The ``user_version`` the database has after the migration.
+    :returns: A decorator.
+    """
+    def decorator(func):
+        MIGRATIONS.append((version, func))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return func
+    return decorator
+
+
+def execute_statements(conn, script):
+    """
+    Executes a multi-statement script inside the current transaction.
+
+    Unlike ``Connection.executescript`` this does not commit first, so a
+    migration stays atomic. Trigger bodies with inner semicolons are kept
+    together using :func:`sqlite3.complete_statement`.
+
+    :param conn: The database connection.
+    :param script: The SQL statements.
+    :returns: None
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            if statement.strip():
+                conn.execute(statement)
+            statement = ""
+    if statement.strip():
+        conn.execute(statement)
+
+
+def schema_version(conn):
+    """
+    Returns the schema version stored in the database header.
+
+    :param conn: The database connection.
+    :returns: The ``PRAGMA user_version`` value.
+    :rtype: int
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, target=None):
+    """
+    Creates the base schema and applies every pending migration.
+
+    Each migration runs in its own transaction with foreign key enforcement
+    switched off, following SQLite's table-rebuild procedure, and the
+    foreign keys are checked before it commits.
+
+    :param conn: The database connection.
+    :param target: Stop at this schema version; None applies every migration.
+    :returns: The schema version after migrating.
+    :rtype: int
+    :raises sqlite3.IntegrityError: If a migration leaves foreign key violations.
+    """
+    create_schema(conn)
+    current = schema_version(conn)
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    for version, func in MIGRATIONS:
+        if version <= current:
+            continue
+        if target is not None and version > target:
+            break
+        conn.execute("PRAGMA foreign_keys = OFF")
+        try:
+            conn.execute("BEGIN")
+            func(conn)
+            violations = conn.execute("PRAGMA foreign_key_check").fetchall()
+            if violations:
+                raise sqlite3.IntegrityError(f"Migration {version} left foreign key violations: {violations[:5]}")
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+        current = version
+    return current
+
+
+@migration(1)
+def add_delete_rules(conn):
+    """
+    Rebuilds the linking tables with ON DELETE rules.
+
+    Enrollments are removed together with their student or course, and a
+    course whose instructor is deleted keeps existing without an instructor.
+    Rows already orphaned by earlier deletes are cleaned up.
+
+    :param conn: The database connection.
+    :returns: None
+    """
+    execute_statements(conn, """
+        UPDATE courses SET instructor_id = NULL
+        WHERE instructor_id IS NOT NULL
+          AND instructor_id NOT IN (SELECT instructor_id FROM instructors);
+
+        DELETE FROM student_courses
+        WHERE student_id NOT IN (SELECT student_id FROM students)
+           OR course_id NOT IN (SELECT course_id FROM courses);
+
+        CREATE TABLE courses_new (
+            course_id      VARCHAR(50) PRIMARY KEY,
+            course_name    VARCHAR(100) NOT NULL,
+            instructor_id  VARCHAR(50),
+            FOREIGN KEY (instructor_id) REFERENCES instructors(instructor_id) ON DELETE SET NULL
+        );
+        INSERT INTO courses_new (course_id, course_name, instructor_id)
+            SELECT course_id, course_name, instructor_id FROM courses;
+        DROP TABLE courses;
+        ALTER TABLE courses_new RENAME TO courses;
+
+        CREATE TABLE student_courses_new (
+            student_id   VARCHAR(50),
+            course_id    VARCHAR(50),
+            PRIMARY KEY (student_id, course_id),
+            FOREIGN KEY (student_id) REFERENCES students(student_id) ON DELETE CASCADE,
+            FOREIGN KEY (course_id) REFERENCES courses(course_id) ON DELETE CASCADE
+        );
+        INSERT INTO student_courses_new (student_id, course_id)
+            SELECT student_id, course_id FROM student_courses;
+        DROP TABLE student_courses;
+        ALTER TABLE student_courses_new RENAME TO student_courses;
+
+        CREATE INDEX IF NOT EXISTS idx_student_courses_course ON student_courses (course_id);
+        CREATE INDEX IF NOT EXISTS idx_courses_instructor ON courses (instructor_id);
+    """)
+
+
+# Tables tracked by the change log, with the SQL expression of each row's key.
+# Enrollment keys join both IDs with "/", which IDs cannot contain.
+CHANGELOG_KEYS = {
+    "students": "{row}.student_id",
+    "instructors": "{row}.instructor_id",
+    "courses": "{row}.course_id",
+    "student_courses": "{row}.student_id || '/' || {row}.course_id",
+}
+
+
+def changelog_triggers(table, key, source=None):
+    """
+    Builds the triggers appending a table's changes to the change log.
+
+    An UPDATE that changes the primary key is logged as a delete of the old
+    key followed by an insert of the new one.
+
+    :param table: The tracked table, as named in the change log.
+    :param key: The key expression from :data:`CHANGELOG_KEYS`.
+    :param source: The table holding the rows, if it is not ``table`` itself.
+    :returns: The CREATE TRIGGER statements.
+    :rtype: str
+    """
+    old_key = key.format(row="OLD")
+    new_key = key.format(row="NEW")
+    source = source or table
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS changelog_{table}_insert AFTER INSERT ON {source}
+        BEGIN
+            INSERT INTO changelog (table_name, operation, row_key) VALUES ('{table}', 'I', {new_key});
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS changelog_{table}_update AFTER UPDATE ON {source}
+        WHEN {old_key} = {new_key}
+        BEGIN
+            INSERT INTO changelog (table_name, operation, row_key) VALUES ('{table}', 'U', {new_key});
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS changelog_{table}_rekey AFTER UPDATE ON {source}
+        WHEN {old_key} <> {new_key}
+        BEGIN
+            INSERT INTO changelog (table_name, operation, row_key) VALUES ('{table}', 'D', {old_key});
+            INSERT INTO changelog (table_name, operation, row_key) VALUES ('{table}', 'I', {new_key});
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS changelog_{table}_delete AFTER DELETE ON {source}
+        BEGIN
+            INSERT INTO changelog (table_name, operation, row_key) VALUES ('{table}', 'D', {old_key});
+        END;
+    """
+
+
+@migration(2)
+def add_changelog(conn):
+    """
+    Adds the change log and the triggers maintaining it.
+
+    Every insert, update and delete on the tracked tables, including those
+    made by ON DELETE rules, appends one row with the operation ("I", "U"
+    or "D"), the table, the row's key and the time. ``seq`` is an
+    AUTOINCREMENT key, so sequence numbers keep increasing even after old
+    entries are compacted away.
+
+    :param conn: The database connection.
+    :returns: None
+    """
+    execute_statements(conn, """
+        CREATE TABLE changelog (
+            seq         INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name  TEXT NOT NULL,
+            operation   CHAR(1) NOT NULL,
+            row_key     TEXT NOT NULL,
+            changed_at  TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+        );
+        CREATE INDEX idx_changelog_row ON changelog (table_name, row_key, seq);
+
+        CREATE TABLE changelog_state (
+            name   TEXT PRIMARY KEY,
+            value  INTEGER NOT NULL
+        );
+        INSERT INTO changelog_state (name, value) VALUES ('truncated_seq', 0);
+    """)
+    for table, key in CHANGELOG_KEYS.items():
+        execute_statements(conn, changelog_triggers(table, key))
+
+
+# Summary tables kept exact by the triggers of migration 3. Each entry is
+# (table, key column, count column, query computing the rows from scratch).
+SUMMARY_TABLES = {
+    "course_enrollment_counts": ("course_id", "enrolled", """
+        SELECT c.course_id, (SELECT COUNT(*) FROM student_courses sc WHERE sc.course_id = c.course_id)
+        FROM courses c
+    """),
+    "instructor_course_counts": ("instructor_id", "courses", """
+        SELECT i.instructor_id, (SELECT COUNT(*) FROM courses c WHERE c.instructor_id = i.instructor_id)
+        FROM instructors i
+    """),
+    "student_course_counts": ("student_id", "courses", """
+        SELECT s.student_id, (SELECT COUNT(*) FROM student_courses sc WHERE sc.student_id = s.student_id)
+        FROM students s
+    """),
+}
+
+
+def rebuild_summaries(conn):
+    """
+    Recomputes every summary table from the base tables.
+
+    Runs inside the caller's transaction.
+
+    :param conn: The database connection.
+    :returns: None
+    """
+    for table, (key, count, query) in SUMMARY_TABLES.items():
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(f"INSERT INTO {table} ({key}, {count}) {query}")
+
+
+# Triggers creating, rekeying and removing the summary rows of students,
+# instructors and courses and counting instructor assignments; the
+# enrollment counts are maintained by triggers on the enrollment table.
+SUMMARY_RECORD_TRIGGERS = """
+    CREATE TRIGGER summary_students_insert AFTER INSERT ON students
+    BEGIN
+        INSERT INTO student_course_counts (student_id) VALUES (NEW.student_id);
+    END;
+    CREATE TRIGGER summary_students_rekey AFTER UPDATE OF student_id ON students
+    BEGIN
+        UPDATE student_course_counts SET student_id = NEW.student_id WHERE student_id = OLD.student_id;
+    END;
+    CREATE TRIGGER summary_students_delete AFTER DELETE ON students
+    BEGIN
+        DELETE FROM student_course_counts WHERE student_id = OLD.student_id;
+    END;
+
+    CREATE TRIGGER summary_instructors_insert AFTER INSERT ON instructors
+    BEGIN
+        INSERT INTO instructor_course_counts (instructor_id) VALUES (NEW.instructor_id);
+    END;
+    CREATE TRIGGER summary_instructors_rekey AFTER UPDATE OF instructor_id ON instructors
+    BEGIN
+        UPDATE instructor_course_counts SET instructor_id = NEW.instructor_id WHERE instructor_id = OLD.instructor_id;
+    END;
+    CREATE TRIGGER summary_instructors_delete AFTER DELETE ON instructors
+    BEGIN
+        DELETE FROM instructor_course_counts WHERE instructor_id = OLD.instructor_id;
+    END;
+
+    CREATE TRIGGER summary_courses_insert AFTER INSERT ON courses
+    BEGIN
+        INSERT INTO course_enrollment_counts (course_id) VALUES (NEW.course_id);
+        UPDATE instructor_course_counts SET courses = courses + 1 WHERE instructor_id = NEW.instructor_id;
+    END;
+    CREATE TRIGGER summary_courses_update AFTER UPDATE OF course_id, instructor_id ON courses
+    BEGIN
+        UPDATE course_enrollment_counts SET course_id = NEW.course_id WHERE course_id = OLD.course_id;
+        UPDATE instructor_course_counts SET courses = courses - 1 WHERE instructor_id = OLD.instructor_id;
+        UPDATE instructor_course_counts SET courses = courses + 1 WHERE instructor_id = NEW.instructor_id;
+    END;
+    CREATE TRIGGER summary_courses_delete AFTER DELETE ON courses
+    BEGIN
+        DELETE FROM course_enrollment_counts WHERE course_id = OLD.course_id;
+        UPDATE instructor_course_counts SET courses = courses - 1 WHERE instructor_id = OLD.instructor_id;
+    END;
+"""
+
+
+@migration(3)
+def add_summary_tables(conn):
+    """
+    Adds enrollment statistics kept up to date by triggers.
+
+    Every course, instructor and student has one row holding its number of
+    enrolled students, assigned courses or registered courses. The rows
+    are created and removed with their records, and the counts are adjusted
+    on every enrollment and instructor assignment, so reports read them
+    directly instead of counting.
+
+    :param conn: The database connection.
+    :returns: None
+    """
+    execute_statements(conn, """
+        CREATE TABLE course_enrollment_counts (
+            course_id      VARCHAR(50) PRIMARY KEY,
+            enrolled       INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE instructor_course_counts (
+            instructor_id  VARCHAR(50) PRIMARY KEY,
+            courses        INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE student_course_counts (
+            student_id     VARCHAR(50) PRIMARY KEY,
+            courses        INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE TRIGGER summary_enrollments_insert AFTER INSERT ON student_courses
+        BEGIN
+            UPDATE course_enrollment_counts SET enrolled = enrolled + 1 WHERE course_id = NEW.course_id;
+            UPDATE student_course_counts SET courses = courses + 1 WHERE student_id = NEW.student_id;
+        END;
+        CREATE TRIGGER summary_enrollments_update AFTER UPDATE ON student_courses
+        BEGIN
+            UPDATE course_enrollment_counts SET enrolled = enrolled - 1 WHERE course_id = OLD.course_id;
+            UPDATE student_course_counts SET courses = courses - 1 WHERE student_id = OLD.student_id;
+            UPDATE course_enrollment_counts SET enrolled = enrolled + 1 WHERE course_id = NEW.course_id;
+            UPDATE student_course_counts SET courses = courses + 1 WHERE student_id = NEW.student_id;
+        END;
+        CREATE TRIGGER summary_enrollments_delete AFTER DELETE ON student_courses
+        BEGIN
+            UPDATE course_enrollment_counts SET enrolled = enrolled - 1 WHERE course_id = OLD.course_id;
+            UPDATE student_course_counts SET courses = courses - 1 WHERE student_id = OLD.student_id;
+        END;
+    """)
+    execute_statements(conn, SUMMARY_RECORD_TRIGGERS)
+    rebuild_summaries(conn)
+
+
+# Tables carrying a row version for optimistic concurrency, with their keys.
+VERSIONED_TABLES = {
+    "students": "student_id",
+    "instructors": "instructor_id",
+    "courses": "course_id",
+}
+
+
+def row_version_trigger(table, key):
+    """
+    Builds the trigger incrementing the version of rows updated without doing so.
+
+    :param table: The versioned table.
+    :param key: Its key column.
+    :returns: The CREATE TRIGGER statement.
+    :rtype: str
+    """
+    return f"""
+        CREATE TRIGGER row_version_{table} AFTER UPDATE ON {table}
+        WHEN NEW.row_version = OLD.row_version
+        BEGIN
+            UPDATE {table} SET row_version = OLD.row_version + 1 WHERE {key} = NEW.{key};
+        END;
+    """
+
+
+@migration(4)
+def add_row_versions(conn):
+    """
+    Adds a row version to students, instructors and courses.
+
+    :func:`lab3_common.store.update_records` increments ``row_version`` with
+    every edit and can require the version the user started from, so an
+    edit based on a stale copy is rejected instead of silently overwriting
+    a concurrent one. A trigger increments the version of rows updated
+    without doing so themselves, e.g. courses detached by an instructor's
+    deletion or updates made with other tools.
+
+    :param conn: The database connection.
+    :returns: None
+    """
+    for table, key in VERSIONED_TABLES.items():
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0")
+        execute_statements(conn, row_version_trigger(table, key))
+
+
+# Change-log key of an enrollment stored by surrogate keys; it is logged
+# under "student_courses" with the external IDs, as before migration 5.
+ENROLLMENT_CHANGELOG_KEY = ("(SELECT student_id FROM students WHERE student_key = {row}.student_key) || '/' || "
+                            "(SELECT course_id FROM courses WHERE course_key = {row}.course_key)")
+
+
+@migration(5)
+def add_surrogate_keys(conn):
+    """
+    Gives students, instructors and courses integer surrogate keys.
+
+    Each of the three tables is rebuilt with an ``INTEGER PRIMARY KEY``
+    (``student_key``, ``instructor_key``, ``course_key``), which is the
+    rowid itself, and keeps its external ID as a ``UNIQUE`` column; that
+    unique index is the interning map from external ID to key. Enrollments
+    move to ``enrollments``, a ``WITHOUT ROWID`` table of integer key pairs
+    with a covering reverse index, so both "courses of a student" and
+    "students of a course" are range scans over small integer entries.
+
+    ``student_courses`` remains as a view with the external IDs; its
+    INSTEAD OF triggers translate inserts and deletes, rejecting unknown IDs
+    with the usual foreign key error. Deleting a student or course removes
+    its enrollments in a BEFORE trigger, while the external IDs can still
+    be looked up for the change log, and changing the ID of a student or
+    course with enrollments is rejected as before. The change log keeps
+    logging enrollments under ``student_courses`` with the external IDs.
+
+    The roster tables are dropped with the rebuilt tables' triggers;
+    :func:`lab3_common.db.connect` creates them again if enabled.
+
+    :param conn: The database connection.
+    :returns: None
+    """
+    triggers = conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                            "AND tbl_name IN ('students', 'instructors', 'courses', 'student_courses')")
+    for (name,) in triggers.fetchall():
+        conn.execute(f"DROP TRIGGER {name}")
+
+    execute_statements(conn, """
+        DROP TABLE IF EXISTS student_roster;
+        DROP TABLE IF EXISTS instructor_roster;
+        DROP TABLE IF EXISTS course_roster;
+
+        CREATE TABLE students_new (
+            student_id     VARCHAR(50) NOT NULL UNIQUE,
+            name           VARCHAR(100) NOT NULL,
+            age            INT,
+            email          VARCHAR(100) UNIQUE NOT NULL,
+            row_version    INTEGER NOT NULL DEFAULT 0,
+            student_key    INTEGER PRIMARY KEY
+        );
+        INSERT INTO students_new (student_id, name, age, email, row_version)
+            SELECT student_id, name, age, email, row_version FROM students ORDER BY student_id;
+
+        CREATE TABLE instructors_new (
+            instructor_id  VARCHAR(50) NOT NULL UNIQUE,
+            name           VARCHAR(100) NOT NULL,
+            age            INT,
+            email          VARCHAR(100) UNIQUE NOT NULL,
+            row_version    INTEGER NOT NULL DEFAULT 0,
+            instructor_key INTEGER PRIMARY KEY
+        );
+        INSERT INTO instructors_new (instructor_id, name, age, email, row_version)
+            SELECT instructor_id, name, age, email, row_version FROM instructors ORDER BY instructor_id;
+
+        CREATE TABLE courses_new (
+            course_id      VARCHAR(50) NOT NULL UNIQUE,
+            course_name    VARCHAR(100) NOT NULL,
+            instructor_id  VARCHAR(50),
+            row_version    INTEGER NOT NULL DEFAULT 0,
+            course_key     INTEGER PRIMARY KEY,
+            FOREIGN KEY (instructor_id) REFERENCES instructors(instructor_id) ON DELETE SET NULL
+        );
+        INSERT INTO courses_new (course_id, course_name, instructor_id, row_version)
+            SELECT course_id, course_name, instructor_id, row_version FROM courses ORDER BY course_id;
+
+        CREATE TABLE enrollments (
+            student_key  INTEGER NOT NULL,
+            course_key   INTEGER NOT NULL,
+            PRIMARY KEY (student_key, course_key),
+            FOREIGN KEY (student_key) REFERENCES students(student_key),
+            FOREIGN KEY (course_key) REFERENCES courses(course_key)
+        ) WITHOUT ROWID;
+        INSERT INTO enrollments (student_key, course_key)
+            SELECT s.student_key, c.course_key
+            FROM student_courses sc
+            JOIN students_new s ON s.student_id = sc.student_id
+            JOIN courses_new c ON c.course_id = sc.course_id
+            ORDER BY 1, 2;
+
+        DROP TABLE student_courses;
+        DROP TABLE students;
+        DROP TABLE instructors;
+        DROP TABLE courses;
+        ALTER TABLE students_new RENAME TO students;
+        ALTER TABLE instructors_new RENAME TO instructors;
+        ALTER TABLE courses_new RENAME TO courses;
+
+        CREATE INDEX idx_enrollments_course ON enrollments (course_key, student_key);
+        CREATE INDEX idx_courses_instructor ON courses (instructor_id);
+
+        CREATE VIEW student_courses (student_id, course_id) AS
+            SELECT s.student_id, c.course_id
+            FROM enrollments e
+            JOIN students s ON s.student_key = e.student_key
+            JOIN courses c ON c.course_key = e.course_key;
+
+        CREATE TRIGGER student_courses_insert INSTEAD OF INSERT ON student_courses
+        BEGIN
+            SELECT RAISE(ABORT, 'FOREIGN KEY constraint failed')
+            WHERE NOT EXISTS (SELECT 1 FROM students WHERE student_id = NEW.student_id)
+               OR NOT EXISTS (SELECT 1 FROM courses WHERE course_id = NEW.course_id);
+            INSERT INTO enrollments (student_key, course_key)
+                SELECT s.student_key, c.course_key FROM students s, courses c
+                WHERE s.student_id = NEW.student_id AND c.course_id = NEW.course_id;
+        END;
+        CREATE TRIGGER student_courses_delete INSTEAD OF DELETE ON student_courses
+        BEGIN
+            DELETE FROM enrollments
+            WHERE student_key = (SELECT student_key FROM students WHERE student_id = OLD.student_id)
+              AND course_key = (SELECT course_key FROM courses WHERE course_id = OLD.course_id);
+        END;
+
+        CREATE TRIGGER enrollments_students_delete BEFORE DELETE ON students
+        BEGIN
+            DELETE FROM enrollments WHERE student_key = OLD.student_key;
+        END;
+        CREATE TRIGGER enrollments_courses_delete BEFORE DELETE ON courses
+        BEGIN
+            DELETE FROM enrollments WHERE course_key = OLD.course_key;
+        END;
+        CREATE TRIGGER enrollments_students_rekey BEFORE UPDATE OF student_id ON students
+        WHEN NEW.student_id IS NOT OLD.student_id
+         AND EXISTS (SELECT 1 FROM enrollments WHERE student_key = OLD.student_key)
+        BEGIN
+            SELECT RAISE(ABORT, 'FOREIGN KEY constraint failed');
+        END;
+        CREATE TRIGGER enrollments_courses_rekey BEFORE UPDATE OF course_id ON courses
+        WHEN NEW.course_id IS NOT OLD.course_id
+         AND EXISTS (SELECT 1 FROM enrollments WHERE course_key = OLD.course_key)
+        BEGIN
+            SELECT RAISE(ABORT, 'FOREIGN KEY constraint failed');
+        END;
+
+        CREATE TRIGGER summary_enrollments_insert AFTER INSERT ON enrollments
+        BEGIN
+            UPDATE course_enrollment_counts SET enrolled = enrolled + 1
+            WHERE course_id = (SELECT course_id FROM courses WHERE course_key = NEW.course_key);
+            UPDATE student_course_counts SET courses = courses + 1
+            WHERE student_id = (SELECT student_id FROM students WHERE student_key = NEW.student_key);
+        END;
+        CREATE TRIGGER summary_enrollments_delete AFTER DELETE ON enrollments
+        BEGIN
+            UPDATE course_enrollment_counts SET enrolled = enrolled - 1
+            WHERE course_id = (SELECT course_id FROM courses WHERE course_key = OLD.course_key);
+            UPDATE student_course_counts SET courses = courses - 1
+            WHERE student_id = (SELECT student_id FROM students WHERE student_key = OLD.student_key);
+        END;
+    """)
+    execute_statements(conn, SUMMARY_RECORD_TRIGGERS)
+    for table, key in VERSIONED_TABLES.items():
+        execute_statements(conn, row_version_trigger(table, key))
+    for table in ("students", "instructors", "courses"):
+        execute_statements(conn, changelog_triggers(table, CHANGELOG_KEYS[table]))
+    execute_statements(conn, changelog_triggers("student_courses", ENROLLMENT_CHANGELOG_KEY, "enrollments"))
+
+
+@migration(6)
+def add_search_indexes(conn):
+    """
+    Indexes the name searches and the report ordering.
+
+    Searching students and instructors by name and courses by course name
+    looked at every row; the summary tables are read largest count first,
+    which needed a sort of the whole table. ``python -m
+    lab3_common.queryplan`` checks that both stay indexed.
+
+    :param conn: The database connection.
+    :returns: None
+    """
+    execute_statements(conn, """
+        CREATE INDEX idx_students_name ON students (name);
+        CREATE INDEX idx_instructors_name ON instructors (name);
+        CREATE INDEX idx_courses_name ON courses (course_name);
+
+        CREATE INDEX idx_course_enrollment_counts_rank ON course_enrollment_counts (enrolled DESC, course_id);
+        CREATE INDEX idx_instructor_course_counts_rank ON instructor_course_counts (courses DESC, instructor_id);
+        CREATE INDEX idx_student_course_counts_rank ON student_course_counts (courses DESC, student_id);
+    """)
+
+
+@migration(7)
+def add_sort_indexes(conn):
+    """
+    Indexes every sortable display column together with the record's ID.
+
+    The display screens page through records in the order of one column,
+    with the ID breaking ties (see :mod:`lab3_common.paging`). An index on
+    ``(column, ID)`` returns rows in exactly that order and lets each page
+    start right after the last row of the previous one, so no page is
+    sorted and none reads the rows before it. Emails are unique and use
+    their own index.
+
+    :param conn: The database connection.
+    :returns: None
+    """
+    execute_statements(conn, """
+        DROP INDEX idx_students_name;
+        DROP INDEX idx_instructors_name;
+        DROP INDEX idx_courses_name;
+        DROP INDEX idx_courses_instructor;
+
+        CREATE INDEX idx_students_name ON students (name, student_id);
+        CREATE INDEX idx_students_age ON students (age, student_id);
+        CREATE INDEX idx_instructors_name ON instructors (name, instructor_id);
+        CREATE INDEX idx_instructors_age ON instructors (age, instructor_id);
+        CREATE INDEX idx_courses_name ON courses (course_name, course_id);
+        CREATE INDEX idx_courses_instructor ON courses (instructor_id, course_id);
+    """)
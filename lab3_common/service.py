@@ -0,0 +1,642 @@
+"""
+Local JSON/HTTP service sharing one database writer between clients.
+
+Several GUI processes writing the same SQLite file contend for its lock and
+fail with "database is locked". Run the service once per database instead
+and point the GUIs at it with ``SCHOOL_SERVICE``: every write then goes
+through :class:`SchoolService`, whose single writer thread takes the
+queued requests and runs as many as are waiting (up to the batch size) in
+one transaction, each inside its own savepoint so one failing request does
+not affect the others. Reads are served from a pool of read-only
+connections.
+
+Run ``python -m lab3_common.service`` from the project root; it listens on
+``127.0.0.1:8765`` by default, or on a Unix socket with ``--socket``.
+
+Endpoints, all exchanging JSON:
+
+* ``POST /insert_record``, ``/enroll_student``, ``/assign_instructor``,
+  ``/update_records``, ``/delete_records`` take the keyword arguments of
+  the functions of the same name in :mod:`lab3_common.store` and return
+  the resulting change set. Records and edits are checked with the forms'
+  rules from :mod:`lab3_common.validation` first; invalid ones are
+  rejected with status 400 and the problem of every field.
+* ``GET /records/<record_type>`` returns the display rows, optionally only
+  for the ``id`` query parameters given.
+* ``GET /search/<record_type>?field=id|name&term=...`` returns the display
+  rows of the matching records.
+* ``GET /status`` returns the writer's counters.
+"""
+import argparse
+import http.client
+import http.server
+import json
+import os
+import queue
+import socket
+import socketserver
+import sqlite3
+import threading
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from lab3_common import config
+from lab3_common.db import connect
+from lab3_common.store import (ChangeSet, ConflictError, assign_instructor, delete_records, enroll_student,
+                               fetch_display_rows, get_entity, insert_record, publish, update_records)
+from lab3_common.validation import ValidationError, validate
+
+# Write operations exposed by the service, by name.
+OPERATIONS = {
+    "insert_record": insert_record,
+    "enroll_student": enroll_student,
+    "assign_instructor": assign_instructor,
+    "update_records": update_records,
+    "delete_records": delete_records,
+}
+
+# Searchable columns per record type, as offered by the search screens.
+SEARCH_COLUMNS = {
+    "student": {"id": "student_id", "name": "name"},
+    "instructor": {"id": "instructor_id", "name": "name"},
+    "course": {"id": "course_id", "name": "course_name"},
+}
+
+# Exception types reported to clients, with their HTTP status; anything
+# else is reported as a ServiceError with status 500.
+ERROR_STATUS = {
+    "ValueError": 400,
+    "ValidationError": 400,
+    "IntegrityError": 409,
+    "ConflictError": 409,
+    "OperationalError": 503,
+}
+
+
+class ServiceError(RuntimeError):
+    """
+    Raised by :class:`RemoteStore` when the service fails a request or cannot be reached.
+    """
+
+
+def changes_to_json(changes):
+    """
+    Converts a change set to plain JSON data.
+
+    :param changes: The :class:`~lab3_common.store.ChangeSet`.
+    :returns: ``{"upserted": {type: [keys]}, "deleted": {type: [keys]}}``.
+    :rtype: dict
+    """
+    return {
+        "upserted": {record_type: sorted(keys) for record_type, keys in changes.upserted.items()},
+        "deleted": {record_type: sorted(keys) for record_type, keys in changes.deleted.items()},
+    }
+
+
+def changes_from_json(data):
+    """
+    Rebuilds a change set from :func:`changes_to_json` data.
+
+    :param data: The JSON data.
+    :returns: The change set.
+    :rtype: ChangeSet
+    """
+    changes = ChangeSet()
+    for record_type, keys in data.get("upserted", {}).items():
+        changes.upsert(record_type, keys)
+    for record_type, keys in data.get("deleted", {}).items():
+        changes.delete(record_type, keys)
+    return changes
+
+
+def validate_args(operation, args):
+    """
+    Validates the records and edits of a write request.
+
+    Clients other than the GUIs send their records unchecked, so the
+    service applies the same rules as the forms before queuing a write.
+
+    :param operation: A name from :data:`OPERATIONS`.
+    :param args: The keyword arguments of the operation.
+    :returns: The arguments with the records' values cleaned, e.g. ages as integers.
+    :rtype: dict
+    :raises ValidationError: If a record or an edit fails validation.
+    :raises ValueError: If a record or the edits are not JSON objects.
+    """
+    if operation == "insert_record":
+        if not isinstance(args.get("record"), dict):
+            raise ValueError("Invalid arguments: record must be an object")
+        return dict(args, record=dict(args["record"], **validate(args.get("record_type"), args["record"])))
+    if operation == "update_records":
+        changes_by_id = args.get("changes_by_id")
+        if not isinstance(changes_by_id, dict) or not all(isinstance(changes, dict) for changes in changes_by_id.values()):
+            raise ValueError("Invalid arguments: changes_by_id must map IDs to objects")
+        return dict(args, changes_by_id={key: dict(changes, **validate(args.get("record_type"), changes, fields=changes))
+                                         for key, changes in changes_by_id.items()})
+    return args
+
+
+class WriteJob:
+    """
+    One write request waiting for the writer thread.
+
+    :param operation: A name from :data:`OPERATIONS`.
+    :param args: The keyword arguments of the operation.
+    """
+    def __init__(self, operation, args):
+        self.operation = operation
+        self.args = args
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class SchoolService:
+    """
+    The single writer and the reader pool behind the HTTP endpoints.
+
+    :param path: The database file.
+    :param readers: Number of read-only connections.
+    :param batch_size: Maximum number of writes committed together.
+    """
+    def __init__(self, path, readers=4, batch_size=64):
+        self.path = path
+        self.batch_size = batch_size
+        self.jobs = queue.Queue()
+        self.batches = 0
+        self.writes = 0
+        self.failed = 0
+
+        # Opened here so migrations run before any reader connects
+        connect(path).close()
+        self.readers = queue.Queue()
+        for _ in range(readers):
+            reader = sqlite3.connect(path, check_same_thread=False)
+            reader.execute("PRAGMA query_only = ON")
+            self.readers.put(reader)
+        self.writer = threading.Thread(target=self.run_writer, name="writer", daemon=True)
+        self.writer.start()
+
+    def write(self, operation, args):
+        """
+        Queues a write for the writer thread and waits for its outcome.
+
+        :param operation: A name from :data:`OPERATIONS`.
+        :param args: The keyword arguments of the operation.
+        :returns: The change set of the write.
+        :rtype: ChangeSet
+        :raises ValidationError: If a record or an edit fails validation.
+        :raises ValueError: If the operation is unknown or rejects the request.
+        :raises sqlite3.Error: If the write or its commit fails.
+        """
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {operation}")
+        job = WriteJob(operation, validate_args(operation, args))
+        self.jobs.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def run_writer(self):
+        """
+        Writer thread body: commits the queued writes in batches until stopped.
+
+        :returns: None
+        """
+        conn = connect(self.path)
+        running = True
+        while running:
+            batch = [self.jobs.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.jobs.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [job for job in batch if job is not None]
+            if batch:
+                self.run_batch(conn, batch)
+        conn.close()
+
+    def run_batch(self, conn, batch):
+        """
+        Runs a batch of writes in one transaction.
+
+        Each write runs in its own savepoint (see
+        :func:`lab3_common.store.transaction`), so a rejected write is
+        rolled back alone. If the commit fails, every write of the batch
+        reports that error.
+
+        :param conn: The writer's connection.
+        :param batch: The :class:`WriteJob` objects.
+        :returns: None
+        """
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for job in batch:
+                try:
+                    job.result = OPERATIONS[job.operation](conn, **job.args)
+                except (TypeError, ValueError, ConflictError, sqlite3.Error) as e:
+                    job.error = ValueError(f"Invalid arguments: {e}") if isinstance(e, TypeError) else e
+            conn.commit()
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.rollback()
+            for job in batch:
+                job.result = None
+                job.error = job.error or e
+        self.batches += 1
+        self.writes += sum(job.error is None for job in batch)
+        self.failed += sum(job.error is not None for job in batch)
+        for job in batch:
+            job.done.set()
+
+    def read(self, func, *args):
+        """
+        Runs a read on a connection borrowed from the pool.
+
+        :param func: Called as ``func(conn, *args)``.
+        :returns: The function's result.
+        """
+        conn = self.readers.get()
+        try:
+            return func(conn, *args)
+        finally:
+            self.readers.put(conn)
+
+    def search(self, conn, record_type, field, term):
+        """
+        Returns the display rows of the records whose column equals a term.
+
+        :param conn: A reader connection.
+        :param record_type: "student", "instructor" or "course".
+        :param field: "id" or "name".
+        :param term: The value searched for.
+        :returns: The display rows.
+        :rtype: list[tuple]
+        :raises ValueError: If the record type or field is unknown.
+        """
+        entity = get_entity(record_type)
+        try:
+            column = SEARCH_COLUMNS[record_type][field]
+        except KeyError:
+            raise ValueError(f"Cannot search {entity['table']} by {field}")
+        keys = [row[0] for row in conn.execute(f"SELECT {entity['key']} FROM {entity['table']} WHERE {column} = ?", (term,))]
+        return fetch_display_rows(conn, record_type, keys)
+
+    def status(self):
+        """
+        Returns the writer's counters.
+
+        :returns: Batches committed, writes committed, writes failed and queued writes.
+        :rtype: dict
+        """
+        return {"batches": self.batches, "writes": self.writes, "failed": self.failed, "queued": self.jobs.qsize()}
+
+    def close(self):
+        """
+        Stops the writer after the queued writes and closes the readers.
+
+        :returns: None
+        """
+        self.jobs.put(None)
+        self.writer.join()
+        while not self.readers.empty():
+            self.readers.get().close()
+
+
+class RequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Maps the HTTP endpoints onto the :class:`SchoolService` of the server.
+    """
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; don't let Nagle delay the body
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        params = parse_qs(url.query)
+        service = self.server.service
+        try:
+            if parts == ["status"]:
+                self.send_json(200, service.status())
+            elif len(parts) == 2 and parts[0] == "records":
+                get_entity(parts[1])
+                keys = params.get("id")
+                self.send_json(200, {"rows": service.read(fetch_display_rows, parts[1], keys)})
+            elif len(parts) == 2 and parts[0] == "search":
+                field = params.get("field", ["id"])[0]
+                term = params.get("term", [""])[0]
+                self.send_json(200, {"rows": service.read(service.search, parts[1], field, term)})
+            else:
+                self.send_error_json(404, "NotFound", f"No such endpoint: {url.path}")
+        except Exception as e:
+            self.send_exception(e)
+
+    def do_POST(self):
+        operation = urlsplit(self.path).path.strip("/")
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            args = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(args, dict):
+                raise ValueError("The request body must be a JSON object")
+            changes = self.server.service.write(operation, args)
+            self.send_json(200, {"changes": changes_to_json(changes)})
+        except json.JSONDecodeError as e:
+            self.send_error_json(400, "ValueError", f"Invalid JSON: {e}")
+        except Exception as e:
+            self.send_exception(e)
+
+    def send_exception(self, error):
+        """
+        Reports an exception to the client.
+
+        :param error: The exception.
+        :returns: None
+        """
+        kind = type(error).__name__ if type(error).__name__ in ERROR_STATUS else "ServiceError"
+        if isinstance(error, ValueError) and not isinstance(error, ValidationError):
+            kind = "ValueError"
+        details = {}
+        if isinstance(error, ConflictError):
+            details = {"record_type": error.record_type, "keys": error.keys}
+        elif isinstance(error, ValidationError):
+            details = {"errors": error.errors}
+        self.send_error_json(ERROR_STATUS.get(kind, 500), kind, str(error), **details)
+
+    def send_error_json(self, status, kind, message, **details):
+        """
+        Sends an error response.
+
+        :param status: The HTTP status.
+        :param kind: The exception type name the client raises.
+        :param message: The error message.
+        :param details: Further fields the client needs to rebuild the exception.
+        :returns: None
+        """
+        self.send_json(status, {"error": dict(details, type=kind, message=message)})
+
+    def send_json(self, status, data):
+        """
+        Sends a JSON response.
+
+        :param status: The HTTP status.
+        :param data: The data to encode.
+        :returns: None
+        """
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class TCPServer(http.server.ThreadingHTTPServer):
+    """
+    Threaded HTTP server on a TCP address.
+    """
+    daemon_threads = True
+
+
+class UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Threaded HTTP server on a Unix socket.
+    """
+    daemon_threads = True
+
+
+def make_server(service, address, verbose=False):
+    """
+    Creates the HTTP server for a service.
+
+    :param service: The :class:`SchoolService`.
+    :param address: ``(host, port)`` or the path of a Unix socket.
+    :param verbose: Log every request to stderr.
+    :returns: The server; call ``serve_forever()`` to run it.
+    """
+    if isinstance(address, str):
+        if os.path.exists(address):
+            os.remove(address)
+        server = UnixServer(address, RequestHandler)
+    else:
+        server = TCPServer(address, RequestHandler)
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    HTTP client connection over a Unix socket.
+
+    :param path: The socket path.
+    :param timeout: The socket timeout in seconds.
+    """
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class RemoteStore:
+    """
+    Sends the GUIs' writes to the school service.
+
+    Offers the same methods as :class:`lab3_common.store.LocalStore`. The
+    change set returned by the service is published to the local change
+    listeners, so the GUI patches its views as after a local write.
+
+    :param url: ``http://host:port`` or ``unix:/path/to/socket``.
+    :param timeout: Seconds to wait for a response.
+    """
+    def __init__(self, url, timeout=30):
+        self.url = url
+        self.timeout = timeout
+        self.connection = None
+
+    def connect(self):
+        """
+        Opens a new connection to the service.
+
+        :returns: The connection.
+        :rtype: http.client.HTTPConnection
+        """
+        if self.url.startswith("unix:"):
+            return UnixHTTPConnection(self.url[len("unix:"):], self.timeout)
+        url = urlsplit(self.url)
+        return http.client.HTTPConnection(url.hostname, url.port, timeout=self.timeout)
+
+    def request(self, method, path, body=None):
+        """
+        Sends one request, reusing the open connection if possible.
+
+        :param method: "GET" or "POST".
+        :param path: The endpoint path with any query string.
+        :param body: JSON data to send.
+        :returns: The decoded response.
+        :rtype: dict
+        :raises ValidationError: If the service rejects a record as invalid.
+        :raises ValueError: If the service rejects the request.
+        :raises sqlite3.IntegrityError: If the write violates a constraint.
+        :raises ConflictError: If an edit was based on an outdated record version.
+        :raises ServiceError: If the service fails or cannot be reached.
+        """
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = self.connect()
+            try:
+                self.connection.request(method, path, payload, headers)
+                response = self.connection.getresponse()
+                data = json.loads(response.read() or b"{}")
+                break
+            except (OSError, http.client.HTTPException) as e:
+                self.connection.close()
+                self.connection = None
+                # A kept-alive connection may have been closed by the server; retry once
+                if attempt or not isinstance(e, (ConnectionResetError, http.client.RemoteDisconnected, BrokenPipeError)):
+                    raise ServiceError(f"School service at {self.url} is not reachable: {e}")
+        if "error" in data:
+            kind, message = data["error"]["type"], data["error"]["message"]
+            if kind == "ValidationError":
+                raise ValidationError([tuple(error) for error in data["error"]["errors"]])
+            if kind == "ValueError":
+                raise ValueError(message)
+            if kind == "IntegrityError":
+                raise sqlite3.IntegrityError(message)
+            if kind == "ConflictError":
+                raise ConflictError(data["error"]["record_type"], data["error"]["keys"])
+            raise ServiceError(message)
+        return data
+
+    def write(self, operation, **args):
+        """
+        Runs a write operation on the service and publishes its change set.
+
+        :param operation: A name from :data:`OPERATIONS`.
+        :param args: The keyword arguments of the operation.
+        :returns: The change set.
+        :rtype: ChangeSet
+        """
+        return publish(changes_from_json(self.request("POST", f"/{operation}", args)["changes"]))
+
+    def insert_record(self, record_type, record):
+        """
+        See :func:`lab3_common.store.insert_record`.
+        """
+        return self.write("insert_record", record_type=record_type, record=record)
+
+    def enroll_student(self, student_id, course_id):
+        """
+        See :func:`lab3_common.store.enroll_student`.
+        """
+        return self.write("enroll_student", student_id=student_id, course_id=course_id)
+
+    def assign_instructor(self, instructor_id, course_id):
+        """
+        See :func:`lab3_common.store.assign_instructor`.
+        """
+        return self.write("assign_instructor", instructor_id=instructor_id, course_id=course_id)
+
+    def update_records(self, record_type, changes_by_id, versions=None):
+        """
+        See :func:`lab3_common.store.update_records`.
+        """
+        return self.write("update_records", record_type=record_type, changes_by_id=changes_by_id, versions=versions)
+
+    def delete_records(self, record_type, record_ids):
+        """
+        See :func:`lab3_common.store.delete_records`.
+        """
+        return self.write("delete_records", record_type=record_type, record_ids=list(record_ids))
+
+    def fetch_display_rows(self, record_type, keys=None):
+        """
+        Fetches display rows from the service's readers.
+
+        :param record_type: "student", "instructor" or "course".
+        :param keys: Only fetch these primary keys; None fetches every record.
+        :returns: The display rows.
+        :rtype: list[tuple]
+        """
+        if keys is None:
+            path = f"/records/{record_type}"
+        else:
+            keys = list(keys)
+            if not keys:
+                return []
+            path = f"/records/{record_type}?{urlencode([('id', key) for key in keys])}"
+        return [tuple(row) for row in self.request("GET", path)["rows"]]
+
+    def search(self, record_type, field, term):
+        """
+        Searches records by ID or name on the service's readers.
+
+        :param record_type: "student", "instructor" or "course".
+        :param field: "id" or "name".
+        :param term: The value searched for.
+        :returns: The display rows.
+        :rtype: list[tuple]
+        """
+        query = urlencode({"field": field, "term": term})
+        return [tuple(row) for row in self.request("GET", f"/search/{record_type}?{query}")["rows"]]
+
+    def close(self):
+        """
+        Closes the connection to the service.
+
+        :returns: None
+        """
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def main(argv=None):
+    """
+    Command-line entry point.
+
+    :param argv: The arguments; defaults to ``sys.argv[1:]``.
+    :returns: None
+    """
+    parser = argparse.ArgumentParser(prog="python -m lab3_common.service", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=config.DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on (default: %(default)s)")
+    parser.add_argument("--socket", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--readers", type=int, default=config.SERVICE_READERS, help="read connections (default: %(default)s)")
+    parser.add_argument("--batch", type=int, default=config.SERVICE_BATCH, help="writes per transaction (default: %(default)s)")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    service = SchoolService(args.db, args.readers, args.batch)
+    server = make_server(service, args.socket or (args.host, args.port), args.verbose)
+    print(f"Serving {args.db} on {'unix:' + args.socket if args.socket else f'http://{args.host}:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
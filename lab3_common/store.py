@@ -0,0 +1,627 @@
+"""
+Shared data-access helpers for the school database.
+
+The GUIs describe *what* to write; the helpers here build the parameterised
+SQL and run each logical change as one transaction. Every write reports the
+primary keys it touched as a :class:`ChangeSet`, which is also published to
+the registered change listeners so that visible tables can patch just the
+affected rows.
+"""
+import functools
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from lab3_common import config
+
+# Table metadata for every editable entity, keyed by the record type the
+# GUIs use ("student", "instructor", "course").
+ENTITIES = {
+    "student": {
+        "table": "students",
+        "key": "student_id",
+        "columns": ("name", "age", "email"),
+    },
+    "instructor": {
+        "table": "instructors",
+        "key": "instructor_id",
+        "columns": ("name", "age", "email"),
+    },
+    "course": {
+        "table": "courses",
+        "key": "course_id",
+        "columns": ("course_name", "instructor_id"),
+    },
+}
+
+
+# Display row of each entity as shown by the listing screens and searches:
+# the entity's columns followed by the related IDs as a comma-separated list.
+# Enrollments are joined by their integer surrogate keys.
+DISPLAY_QUERIES = {
+    "student": """
+        SELECT s.student_id, s.name, s.age, s.email,
+               COALESCE((SELECT GROUP_CONCAT(c.course_id, ', ') FROM enrollments e
+                         JOIN courses c ON c.course_key = e.course_key
+                         WHERE e.student_key = s.student_key), '')
+        FROM students s
+    """,
+    "instructor": """
+        SELECT i.instructor_id, i.name, i.age, i.email,
+               COALESCE((SELECT GROUP_CONCAT(c.course_id, ', ') FROM courses c
+                         WHERE c.instructor_id = i.instructor_id), '')
+        FROM instructors i
+    """,
+    "course": """
+        SELECT c.course_id, c.course_name, c.instructor_id,
+               COALESCE((SELECT GROUP_CONCAT(s.student_id, ', ') FROM enrollments e
+                         JOIN students s ON s.student_key = e.student_key
+                         WHERE e.course_key = c.course_key), '')
+        FROM courses c
+    """,
+}
+
+# Qualified key column of each display query, used to fetch single rows.
+DISPLAY_KEYS = {
+    "student": "s.student_id",
+    "instructor": "i.instructor_id",
+    "course": "c.course_id",
+}
+
+# Optional roster tables holding each entity's display row precomputed
+# (see lab3_common.roster); fetch_display_rows reads them when they exist.
+ROSTER_TABLES = {
+    "student": "student_roster",
+    "instructor": "instructor_roster",
+    "course": "course_roster",
+}
+
+# Maximum number of keys bound into one IN (...) list.
+KEY_CHUNK_SIZE = 500
+
+change_listeners = []
+
+# Writes retried after the database was busy, and writes that still failed.
+retry_counts = {"retries": 0, "exhausted": 0}
+
+
+class ConflictError(Exception):
+    """
+    Raised when an edit was based on a record version that is no longer current.
+
+    :param record_type: "student", "instructor" or "course".
+    :param keys: The records changed or deleted by someone else meanwhile.
+    """
+    def __init__(self, record_type, keys):
+        self.record_type = record_type
+        self.keys = list(keys)
+        super().__init__(f"{record_type.capitalize()} {', '.join(self.keys)} was changed or deleted by someone else "
+                         f"in the meantime; reload and try again")
+
+
+class ChangeSet:
+    """
+    Primary keys touched by a write, grouped by record type.
+
+    ``upserted`` holds records that were inserted or whose display row
+    changed; ``deleted`` holds records that no longer exist.
+    """
+    def __init__(self):
+        self.upserted = {}
+        self.deleted = {}
+
+    def upsert(self, record_type, keys):
+        """
+        Marks records as inserted or changed.
+
+        :param record_type: "student", "instructor" or "course".
+        :param keys: The primary keys.
+        :returns: This change set, for chaining.
+        :rtype: ChangeSet
+        """
+        keys = {str(key) for key in keys if key is not None}
+        self.upserted.setdefault(record_type, set()).update(keys - self.deleted.get(record_type, set()))
+        return self
+
+    def delete(self, record_type, keys):
+        """
+        Marks records as deleted.
+
+        :param record_type: "student", "instructor" or "course".
+        :param keys: The primary keys.
+        :returns: This change set, for chaining.
+        :rtype: ChangeSet
+        """
+        keys = {str(key) for key in keys if key is not None}
+        self.deleted.setdefault(record_type, set()).update(keys)
+        self.upserted.get(record_type, set()).difference_update(keys)
+        return self
+
+    def __bool__(self):
+        return any(self.upserted.values()) or any(self.deleted.values())
+
+    def __repr__(self):
+        return f"ChangeSet(upserted={self.upserted!r}, deleted={self.deleted!r})"
+
+
+def add_change_listener(listener):
+    """
+    Registers a callback invoked as ``listener(changes)`` after every write.
+
+    :param listener: The callable receiving a :class:`ChangeSet`.
+    :returns: None
+    """
+    change_listeners.append(listener)
+
+
+def publish(changes):
+    """
+    Notifies the change listeners about a committed write.
+
+    :param changes: The :class:`ChangeSet` describing the write.
+    :returns: The same change set.
+    :rtype: ChangeSet
+    """
+    if changes:
+        for listener in change_listeners:
+            listener(changes)
+    return changes
+
+
+def chunked(keys, size=KEY_CHUNK_SIZE):
+    """
+    Splits keys into lists small enough to bind into one statement.
+
+    :param keys: The keys to split.
+    :param size: The maximum chunk length.
+    :returns: An iterator of lists.
+    """
+    keys = list(keys)
+    for start in range(0, len(keys), size):
+        yield keys[start:start + size]
+
+
+def fetch_display_rows(conn, record_type, keys=None):
+    """
+    Fetches display rows for all records or only for the given keys.
+
+    One statement loads each chunk of rows together with their related
+    IDs, instead of one extra query per row. If the roster tables are
+    enabled, the rows are read from them without any join.
+
+    :param conn: The database connection.
+    :param record_type: "student", "instructor" or "course".
+    :param keys: Only fetch these primary keys; None fetches every record.
+    :returns: The display rows.
+    :rtype: list[tuple]
+    """
+    roster = ROSTER_TABLES[record_type]
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (roster,)).fetchone():
+        sql = f"SELECT * FROM {roster}"
+        key_column = ENTITIES[record_type]["key"]
+    else:
+        sql = DISPLAY_QUERIES[record_type]
+        key_column = DISPLAY_KEYS[record_type]
+    if keys is None:
+        return conn.execute(sql).fetchall()
+    rows = []
+    for chunk in chunked(keys):
+        placeholders = ", ".join("?" * len(chunk))
+        rows.extend(conn.execute(f"{sql} WHERE {key_column} IN ({placeholders})", chunk).fetchall())
+    return rows
+
+
+def related_changes(conn, record_type, keys, changes):
+    """
+    Adds the records whose display rows show the given records.
+
+    Students and courses list each other's IDs, and instructors and
+    courses list each other's IDs, so touching one side changes the other.
+
+    :param conn: The database connection.
+    :param record_type: "student", "instructor" or "course".
+    :param keys: The primary keys of the touched records.
+    :param changes: The :class:`ChangeSet` to extend.
+    :returns: None
+    """
+    for chunk in chunked(keys):
+        placeholders = ", ".join("?" * len(chunk))
+        if record_type == "student":
+            rows = conn.execute(f"SELECT course_id FROM student_courses WHERE student_id IN ({placeholders})", chunk)
+            changes.upsert("course", [row[0] for row in rows])
+        elif record_type == "instructor":
+            rows = conn.execute(f"SELECT course_id FROM courses WHERE instructor_id IN ({placeholders})", chunk)
+            changes.upsert("course", [row[0] for row in rows])
+        elif record_type == "course":
+            rows = conn.execute(f"SELECT student_id FROM student_courses WHERE course_id IN ({placeholders})", chunk)
+            changes.upsert("student", [row[0] for row in rows])
+            rows = conn.execute(f"SELECT instructor_id FROM courses WHERE course_id IN ({placeholders})", chunk)
+            changes.upsert("instructor", [row[0] for row in rows])
+
+
+@contextmanager
+def transaction(conn):
+    """
+    Runs a block as one transaction, or as a savepoint inside an open one.
+
+    Outside a transaction the block is committed on success and rolled
+    back on error, like ``with conn``. Inside one, e.g. a write-behind
+    group or a batch of the service's writer, the block only rolls back
+    its own statements on error and leaves the commit to the owner of the
+    outer transaction.
+
+    :param conn: The database connection.
+    :returns: A context manager.
+    """
+    if not conn.in_transaction:
+        with conn:
+            yield
+        return
+    conn.execute("SAVEPOINT store_write")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK TO store_write")
+        conn.execute("RELEASE store_write")
+        raise
+    conn.execute("RELEASE store_write")
+
+
+def is_busy(error):
+    """
+    Tells whether an error means another connection holds the database lock.
+
+    :param error: The exception.
+    :returns: True for "database is locked" and "database is busy" errors.
+    :rtype: bool
+    """
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in str(error) or "busy" in str(error))
+
+
+def is_foreign_key_error(error):
+    """
+    Tells whether an error is a foreign key violation.
+
+    :param error: The exception.
+    :returns: True for "FOREIGN KEY constraint failed" errors.
+    :rtype: bool
+    """
+    return isinstance(error, sqlite3.IntegrityError) and "FOREIGN KEY" in str(error)
+
+
+def retry_on_busy(func):
+    """
+    Retries a write that failed because the database was locked.
+
+    The connection's busy timeout already waits for a lock; this covers
+    the cases SQLite reports at once instead, e.g. two transactions that
+    both read before writing. Up to :data:`config.WRITE_RETRIES` retries
+    sleep for a random time of up to :data:`config.RETRY_BASE_MS` doubled
+    per attempt, so competing writers spread out. A write joining an open
+    transaction is not retried, as the transaction's owner has to start
+    over.
+
+    :param func: A write function taking the connection first.
+    :returns: The wrapped function.
+    """
+    @functools.wraps(func)
+    def wrapper(conn, *args, **kwargs):
+        attempt = 0
+        while True:
+            nested = conn.in_transaction
+            try:
+                return func(conn, *args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if nested or not is_busy(e):
+                    raise
+                if attempt >= config.WRITE_RETRIES:
+                    retry_counts["exhausted"] += 1
+                    raise
+            attempt += 1
+            retry_counts["retries"] += 1
+            time.sleep(random.uniform(0, config.RETRY_BASE_MS * 2 ** attempt) / 1000)
+    return wrapper
+
+
+def get_entity(record_type):
+    """
+    Returns the table metadata for a record type.
+
+    :param record_type: "student", "instructor" or "course".
+    :returns: The entity description from :data:`ENTITIES`.
+    :rtype: dict
+    :raises ValueError: If the record type is unknown.
+    """
+    try:
+        return ENTITIES[record_type]
+    except KeyError:
+        raise ValueError(f"Unknown record type: {record_type}")
+
+
+def build_update(record_type, columns, versioned=False):
+    """
+    Builds one parameterised UPDATE statement over the given columns.
+
+    :param record_type: "student", "instructor" or "course".
+    :param columns: The columns to set, in parameter order.
+    :param versioned: Only update the row if its version is the one given
+        as the last parameter.
+    :returns: The SQL text; parameters are the new values followed by the key
+        (and the expected version). The statement also increments the row version.
+    :rtype: str
+    :raises ValueError: If a column is not editable for this record type.
+    """
+    entity = get_entity(record_type)
+    for column in columns:
+        if column not in entity["columns"]:
+            raise ValueError(f"Column '{column}' cannot be edited on {entity['table']}")
+    assignments = ", ".join(f"{column} = ?" for column in columns)
+    sql = f"UPDATE {entity['table']} SET {assignments}, row_version = row_version + 1 WHERE {entity['key']} = ?"
+    return sql + " AND row_version = ?" if versioned else sql
+
+
+def fetch_versions(conn, record_type, keys):
+    """
+    Reads the current row versions of records.
+
+    Read the versions before the values an edit is based on: a write landing
+    in between then shows up as a conflict rather than being overwritten.
+
+    :param conn: The database connection.
+    :param record_type: "student", "instructor" or "course".
+    :param keys: The primary keys.
+    :returns: Mapping of record ID to row version; deleted records are missing.
+    :rtype: dict
+    """
+    entity = get_entity(record_type)
+    versions = {}
+    for chunk in chunked(keys):
+        placeholders = ", ".join("?" * len(chunk))
+        rows = conn.execute(f"SELECT {entity['key']}, row_version FROM {entity['table']} "
+                            f"WHERE {entity['key']} IN ({placeholders})", chunk)
+        versions.update((str(key), version) for key, version in rows)
+    return versions
+
+
+def build_insert(record_type, columns):
+    """
+    Builds one parameterised INSERT statement over the given columns.
+
+    :param record_type: "student", "instructor" or "course".
+    :param columns: The columns to insert, in parameter order, including the key.
+    :returns: The SQL text.
+    :rtype: str
+    :raises ValueError: If a column does not belong to this record type.
+    """
+    entity = get_entity(record_type)
+    for column in columns:
+        if column != entity["key"] and column not in entity["columns"]:
+            raise ValueError(f"Column '{column}' does not exist on {entity['table']}")
+    return f"INSERT INTO {entity['table']} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+
+@retry_on_busy
+def insert_record(conn, record_type, record):
+    """
+    Inserts one validated record.
+
+    :param conn: The database connection.
+    :param record_type: "student", "instructor" or "course".
+    :param record: Mapping of column to value, including the key.
+    :returns: The inserted record, plus the course's instructor if one is
+        given; also published to the listeners.
+    :rtype: ChangeSet
+    :raises sqlite3.IntegrityError: If the key already exists.
+    """
+    columns = tuple(record)
+    with transaction(conn):
+        conn.execute(build_insert(record_type, columns), tuple(record.values()))
+    changes = ChangeSet().upsert(record_type, [record[get_entity(record_type)["key"]]])
+    if record_type == "course":
+        changes.upsert("instructor", [record.get("instructor_id")])
+    return publish(changes)
+
+
+@retry_on_busy
+def enroll_student(conn, student_id, course_id):
+    """
+    Registers a student for a course.
+
+    The INSERT alone checks everything: the foreign keys (enforced by
+    :func:`lab3_common.db.connect`) reject unknown students and courses and
+    the primary key rejects a second registration, so no lookups are needed.
+
+    :param conn: The database connection.
+    :param student_id: The student's ID.
+    :param course_id: The course's ID.
+    :returns: The student and the course; also published to the listeners.
+    :rtype: ChangeSet
+    :raises ValueError: If the student or the course does not exist.
+    :raises sqlite3.IntegrityError: If the student is already registered for the course.
+    """
+    with transaction(conn):
+        try:
+            conn.execute("INSERT INTO student_courses (student_id, course_id) VALUES (?, ?)", (student_id, course_id))
+        except sqlite3.IntegrityError as e:
+            if is_foreign_key_error(e):
+                raise ValueError("Student or course doesn't exist.")
+            if "UNIQUE" in str(e):
+                # Reported on the enrollments key pair, not on the IDs the user entered
+                raise sqlite3.IntegrityError(f"Student {student_id} is already registered for course {course_id}.")
+            raise
+    return publish(ChangeSet().upsert("student", [student_id]).upsert("course", [course_id]))
+
+
+@retry_on_busy
+def assign_instructor(conn, instructor_id, course_id):
+    """
+    Assigns an instructor to a course that has none yet.
+
+    :param conn: The database connection.
+    :param instructor_id: The instructor's ID.
+    :param course_id: The course's ID.
+    :returns: The course and the instructor; also published to the listeners.
+    :rtype: ChangeSet
+    :raises ValueError: If the course or the instructor does not exist, or
+        the course already has an instructor.
+    """
+    with transaction(conn):
+        course = conn.execute("SELECT instructor_id FROM courses WHERE course_id = ?", (course_id,)).fetchone()
+        if course is None:
+            raise ValueError(f"Course with ID '{course_id}' not found.")
+        if conn.execute("SELECT 1 FROM instructors WHERE instructor_id = ?", (instructor_id,)).fetchone() is None:
+            raise ValueError(f"Instructor with ID '{instructor_id}' not found.")
+        if course[0] is not None:
+            raise ValueError("Course already has an instructor.")
+        conn.execute("UPDATE courses SET instructor_id = ?, row_version = row_version + 1 WHERE course_id = ?",
+                     (instructor_id, course_id))
+    return publish(ChangeSet().upsert("course", [course_id]).upsert("instructor", [instructor_id]))
+
+
+@retry_on_busy
+def update_records(conn, record_type, changes_by_id, versions=None):
+    """
+    Applies edits to one or many records in a single transaction.
+
+    Each record gets one UPDATE over only its changed columns. Records that
+    change the same set of columns share one prepared statement through
+    ``executemany``. Either every edit is committed or none is.
+
+    A record listed in ``versions`` is only updated if its row version is
+    still the one the edit started from (see :func:`fetch_versions`); otherwise
+    nothing is committed and :class:`ConflictError` names the records that
+    changed meanwhile.
+
+    :param conn: The database connection.
+    :param record_type: "student", "instructor" or "course".
+    :param changes_by_id: Mapping of record ID to ``{column: new_value}``.
+    :param versions: Optional mapping of record ID to its expected row version.
+    :returns: The updated records, plus courses' old and new instructors
+        when a course changes instructor; also published to the listeners.
+    :rtype: ChangeSet
+    :raises ConflictError: If a record was changed or deleted since its version was read.
+    """
+    batches = {}
+    for record_id, changes in changes_by_id.items():
+        if not changes:
+            continue
+        columns = tuple(column for column in get_entity(record_type)["columns"] if column in changes)
+        if len(columns) != len(changes):
+            build_update(record_type, changes)  # raises for the unknown column
+        batches.setdefault(columns, []).append(
+            tuple(changes[column] for column in columns) + (record_id,)
+        )
+
+    changes = ChangeSet()
+    with transaction(conn):
+        conflicts = []
+        for columns, rows in batches.items():
+            keys = [row[-1] for row in rows]
+            if "instructor_id" in columns:
+                related_changes(conn, record_type, keys, changes)
+            plain, versioned = [], []
+            for row in rows:
+                (versioned if versions and row[-1] in versions else plain).append(row)
+            conn.executemany(build_update(record_type, columns), plain)
+            sql = build_update(record_type, columns, versioned=True)
+            for row in versioned:
+                if not conn.execute(sql, row + (versions[row[-1]],)).rowcount:
+                    conflicts.append(str(row[-1]))
+            if "instructor_id" in columns:
+                changes.upsert("instructor", [row[columns.index("instructor_id")] for row in rows])
+            changes.upsert(record_type, keys)
+        if conflicts:
+            raise ConflictError(record_type, conflicts)
+    return publish(changes)
+
+
+@retry_on_busy
+def delete_records(conn, record_type, record_ids):
+    """
+    Deletes one or many records in a single transaction.
+
+    With ``PRAGMA foreign_keys`` on, the schema's ON DELETE rules remove the
+    records' enrollments and detach courses from deleted instructors in the
+    same transaction.
+
+    :param conn: The database connection (see :func:`lab3_common.db.connect`).
+    :param record_type: "student", "instructor" or "course".
+    :param record_ids: The IDs of the records to delete.
+    :returns: The deleted records and the related records whose display rows
+        changed; also published to the listeners.
+    :rtype: ChangeSet
+    """
+    entity = get_entity(record_type)
+    sql = f"DELETE FROM {entity['table']} WHERE {entity['key']} = ?"
+    changes = ChangeSet()
+    deleted = []
+    with transaction(conn):
+        related_changes(conn, record_type, record_ids, changes)
+        for record_id in record_ids:
+            if conn.execute(sql, (record_id,)).rowcount:
+                deleted.append(record_id)
+    changes.delete(record_type, deleted)
+    return publish(changes)
+
+
+class LocalStore:
+    """
+    Runs the GUIs' writes directly on a database connection.
+
+    :class:`lab3_common.service.RemoteStore` offers the same methods for
+    sending the writes to the school service instead.
+
+    :param conn: The database connection.
+    :param write_queue: The :class:`lab3_common.writequeue.GroupCommitQueue`
+        holding a group open on ``conn`` in write-behind mode. Its group is
+        committed before every write here, so that a failed group cannot
+        roll back an edit or a deletion that was already reported as saved.
+    """
+    def __init__(self, conn, write_queue=None):
+        self.conn = conn
+        self.write_queue = write_queue
+
+    def flush_queue(self):
+        """
+        Commits the open write-behind group, if any.
+
+        :returns: None
+        """
+        if self.write_queue is not None:
+            self.write_queue.flush()
+
+    def insert_record(self, record_type, record):
+        """
+        See :func:`insert_record`.
+        """
+        self.flush_queue()
+        return insert_record(self.conn, record_type, record)
+
+    def enroll_student(self, student_id, course_id):
+        """
+        See :func:`enroll_student`.
+        """
+        self.flush_queue()
+        return enroll_student(self.conn, student_id, course_id)
+
+    def assign_instructor(self, instructor_id, course_id):
+        """
+        See :func:`assign_instructor`.
+        """
+        self.flush_queue()
+        return assign_instructor(self.conn, instructor_id, course_id)
+
+    def update_records(self, record_type, changes_by_id, versions=None):
+        """
+        See :func:`update_records`.
+        """
+        self.flush_queue()
+        return update_records(self.conn, record_type, changes_by_id, versions)
+
+    def delete_records(self, record_type, record_ids):
+        """
+        See :func:`delete_records`.
+        """
+        self.flush_queue()
+        return delete_records(self.conn, record_type, record_ids)
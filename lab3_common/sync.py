@@ -0,0 +1,431 @@
+"""
+Hash-tree comparison and sync of two school databases.
+
+Each database keeps a hash tree per synced table: every row's values are
+hashed to 64 bits, the rows are spread over :data:`LEAVES` buckets by a
+hash of their key, and every node of the tree, from the buckets up to a
+single root, holds the XOR of the row hashes below it. Two copies hold the
+same rows exactly when their roots match (up to hash collisions), and a
+differing root leads down to the buckets that differ.
+
+The tree lives in the ``sync_rows`` and ``sync_tree`` tables and is kept
+current from the change log: :func:`update_tree` rehashes only the rows
+changed since its last run and moves every node along their paths. It
+hashes the whole database only the first time, or when the change log was
+pruned past its last run (see :func:`lab3_common.changelog.compact`).
+
+:func:`diff` compares two databases from the root down, reading children
+only below nodes that differ, then compares the row hashes of the
+differing buckets. :func:`apply` makes the target equal to the source with
+the upserts and deletes found, in one transaction. Both cost time in
+proportion to the rows changed and differing, not to the size of the
+tables.
+
+The sync goes one way. Without a common ancestor, a row present in one
+copy only may have been inserted there or deleted in the other, so one
+copy is chosen as the source of each run.
+
+Run ``python -m lab3_common.sync diff SOURCE TARGET`` to list the
+differences and ``python -m lab3_common.sync apply SOURCE TARGET`` to
+apply them.
+"""
+import argparse
+import hashlib
+import json
+import time
+from collections import namedtuple
+
+from lab3_common.changelog import (KEY_COLUMNS, ChangelogTruncatedError, key_condition, latest_changes,
+                                   latest_sequence)
+from lab3_common.db import connect
+from lab3_common.schema import execute_statements
+from lab3_common.store import chunked, transaction
+
+# Synced tables in the order rows are inserted, with the compared columns;
+# the key columns come first. Surrogate keys and row versions are local to
+# each copy and left out.
+SYNC_COLUMNS = {
+    "instructors": ("instructor_id", "name", "age", "email"),
+    "courses": ("course_id", "course_name", "instructor_id"),
+    "students": ("student_id", "name", "age", "email"),
+    "student_courses": ("student_id", "course_id"),
+}
+
+# Synced columns with a UNIQUE constraint besides the key. Upserted rows
+# take a placeholder first, so values moved between rows never collide.
+UNIQUE_COLUMNS = {
+    "instructors": ("email",),
+    "students": ("email",),
+}
+
+# Children per node and levels below the root; the tree has FANOUT ** DEPTH buckets.
+FANOUT = 16
+DEPTH = 3
+LEAVES = FANOUT ** DEPTH
+
+SYNC_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync_rows (
+    table_name  TEXT NOT NULL,
+    row_key     TEXT NOT NULL,
+    bucket      INTEGER NOT NULL,
+    row_hash    INTEGER NOT NULL,
+    PRIMARY KEY (table_name, row_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_sync_rows_bucket ON sync_rows (table_name, bucket);
+
+CREATE TABLE IF NOT EXISTS sync_tree (
+    table_name  TEXT NOT NULL,
+    level       INTEGER NOT NULL,
+    node        INTEGER NOT NULL,
+    digest      INTEGER NOT NULL,
+    PRIMARY KEY (table_name, level, node)
+) WITHOUT ROWID;
+"""
+
+Difference = namedtuple("Difference", ["upserts", "deletes"])
+
+
+def row_key(table, row):
+    """
+    Returns the change-log key of a synced row.
+
+    :param table: The synced table.
+    :param row: The row's values in :data:`SYNC_COLUMNS` order.
+    :returns: The key, e.g. ``"S1"`` or ``"S1/C1"``.
+    :rtype: str
+    """
+    return "/".join(str(value) for value in row[:len(KEY_COLUMNS[table])])
+
+
+def row_hash(row):
+    """
+    Hashes a row's values to a signed 64-bit integer.
+
+    :param row: The row's values.
+    :returns: The hash.
+    :rtype: int
+    """
+    digest = hashlib.blake2b(json.dumps(list(row)).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def bucket_of(key):
+    """
+    Returns the leaf bucket of a row key.
+
+    :param key: The row key.
+    :returns: A bucket number below :data:`LEAVES`.
+    :rtype: int
+    """
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=4).digest(), "big") % LEAVES
+
+
+def ancestors(bucket):
+    """
+    Returns the nodes on the path from the root down to a bucket.
+
+    :param bucket: The bucket number.
+    :returns: ``(level, node)`` pairs, the root ``(0, 0)`` first and the bucket ``(DEPTH, bucket)`` last.
+    :rtype: list[tuple[int, int]]
+    """
+    return [(level, bucket // FANOUT ** (DEPTH - level)) for level in range(DEPTH + 1)]
+
+
+def create_sync_tables(conn):
+    """
+    Creates the tables holding the hash tree, if missing.
+
+    :param conn: The database connection.
+    :returns: None
+    """
+    with conn:
+        execute_statements(conn, SYNC_SCHEMA)
+
+
+def sync_position(conn):
+    """
+    Returns the change-log sequence number the hash tree reflects.
+
+    :param conn: The database connection.
+    :returns: The sequence number, or None if the tree was never built.
+    :rtype: int
+    """
+    row = conn.execute("SELECT value FROM changelog_state WHERE name = 'sync_seq'").fetchone()
+    return row[0] if row else None
+
+
+def fetch_synced_rows(conn, table, keys):
+    """
+    Fetches the synced columns of rows by their keys.
+
+    :param conn: The database connection.
+    :param table: The synced table.
+    :param keys: The row keys.
+    :returns: Mapping of key to row; keys without a row are left out.
+    :rtype: dict
+    """
+    rows = {}
+    for chunk in chunked(list(keys)):
+        condition, params = key_condition(table, chunk)
+        for row in conn.execute(f"SELECT {', '.join(SYNC_COLUMNS[table])} FROM {table} WHERE {condition}", params):
+            rows[row_key(table, row)] = row
+    return rows
+
+
+def rebuild_tree(conn):
+    """
+    Hashes every synced row and builds the hash trees from scratch.
+
+    :param conn: The database connection.
+    :returns: The number of rows hashed.
+    :rtype: int
+    """
+    create_sync_tables(conn)
+    count = 0
+    with conn:
+        conn.execute("DELETE FROM sync_rows")
+        conn.execute("DELETE FROM sync_tree")
+        seq = latest_sequence(conn)
+        for table, columns in SYNC_COLUMNS.items():
+            hashed, digests = [], {}
+            for row in conn.execute(f"SELECT {', '.join(columns)} FROM {table}"):
+                key = row_key(table, row)
+                value, bucket = row_hash(row), bucket_of(key)
+                hashed.append((table, key, bucket, value))
+                for node in ancestors(bucket):
+                    digests[node] = digests.get(node, 0) ^ value
+            conn.executemany("INSERT INTO sync_rows (table_name, row_key, bucket, row_hash) VALUES (?, ?, ?, ?)", hashed)
+            conn.executemany("INSERT INTO sync_tree (table_name, level, node, digest) VALUES (?, ?, ?, ?)",
+                             ((table, level, node, digest) for (level, node), digest in digests.items()))
+            count += len(hashed)
+        conn.execute("INSERT OR REPLACE INTO changelog_state (name, value) VALUES ('sync_seq', ?)", (seq,))
+    return count
+
+
+def update_tree(conn):
+    """
+    Brings the hash trees up to date with the change log.
+
+    Only the rows changed since the last update are hashed again; each
+    change of a row hash is XORed into the nodes on the row's path. The
+    first update, and one after the change log was pruned past the last
+    one, builds the trees with :func:`rebuild_tree`.
+
+    :param conn: The database connection.
+    :returns: The number of rows hashed.
+    :rtype: int
+    """
+    create_sync_tables(conn)
+    seq = sync_position(conn)
+    if seq is None:
+        return rebuild_tree(conn)
+    try:
+        latest = latest_changes(conn, seq)
+    except ChangelogTruncatedError:
+        return rebuild_tree(conn)
+
+    count = 0
+    with conn:
+        for table in SYNC_COLUMNS:
+            keys = list(latest[table])
+            if not keys:
+                continue
+            rows = fetch_synced_rows(conn, table, keys)
+            stored = {}
+            for chunk in chunked(keys):
+                stored.update(conn.execute(
+                    f"SELECT row_key, row_hash FROM sync_rows WHERE table_name = ? "
+                    f"AND row_key IN ({', '.join('?' * len(chunk))})", [table, *chunk]))
+
+            deltas = {}
+            for key in keys:
+                value = row_hash(rows[key]) if key in rows else None
+                if value == stored.get(key):
+                    continue
+                bucket = bucket_of(key)
+                if value is None:
+                    conn.execute("DELETE FROM sync_rows WHERE table_name = ? AND row_key = ?", (table, key))
+                else:
+                    conn.execute("INSERT OR REPLACE INTO sync_rows (table_name, row_key, bucket, row_hash) "
+                                 "VALUES (?, ?, ?, ?)", (table, key, bucket, value))
+                for node in ancestors(bucket):
+                    deltas[node] = deltas.get(node, 0) ^ (stored.get(key) or 0) ^ (value or 0)
+                count += 1
+
+            # SQLite has no XOR operator; (a | b) - (a & b) is a XOR b, without overflow
+            for (level, node), delta in deltas.items():
+                conn.execute("""
+                    INSERT INTO sync_tree (table_name, level, node, digest) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (table_name, level, node) DO UPDATE SET digest = (digest | excluded.digest) - (digest & excluded.digest)
+                """, (table, level, node, delta))
+        seq = max([seq] + [change.seq for changes in latest.values() for change in changes.values()])
+        conn.execute("UPDATE changelog_state SET value = ? WHERE name = 'sync_seq'", (seq,))
+    return count
+
+
+def node_digests(conn, table, level, nodes):
+    """
+    Reads the digests of tree nodes.
+
+    :param conn: The database connection.
+    :param table: The synced table.
+    :param level: The nodes' level, 0 being the root.
+    :param nodes: The node numbers.
+    :returns: Mapping of node to digest; nodes without rows below them are left out.
+    :rtype: dict
+    """
+    digests = {}
+    for chunk in chunked(nodes):
+        digests.update(conn.execute(
+            f"SELECT node, digest FROM sync_tree WHERE table_name = ? AND level = ? AND node IN ({', '.join('?' * len(chunk))})",
+            [table, level, *chunk]))
+    return digests
+
+
+def bucket_hashes(conn, table, buckets):
+    """
+    Reads the row hashes of leaf buckets.
+
+    :param conn: The database connection.
+    :param table: The synced table.
+    :param buckets: The bucket numbers.
+    :returns: Mapping of row key to row hash.
+    :rtype: dict
+    """
+    hashes = {}
+    for chunk in chunked(buckets):
+        hashes.update(conn.execute(
+            f"SELECT row_key, row_hash FROM sync_rows WHERE table_name = ? AND bucket IN ({', '.join('?' * len(chunk))})",
+            [table, *chunk]))
+    return hashes
+
+
+def diff(source, target):
+    """
+    Finds the rows that differ between two databases.
+
+    Both hash trees are updated first. Each table's trees are then
+    compared level by level, reading only the children of nodes whose
+    digests differ, and the differing buckets are compared row by row.
+
+    :param source: The connection to the database whose rows are wanted.
+    :param target: The connection to the database to be changed.
+    :returns: Mapping of table to a :class:`Difference` of the keys to
+        upsert from the source and the keys to delete from the target.
+    :rtype: dict
+    """
+    update_tree(source)
+    update_tree(target)
+    differences = {}
+    for table in SYNC_COLUMNS:
+        nodes = [0]
+        for level in range(DEPTH + 1):
+            theirs, ours = node_digests(source, table, level, nodes), node_digests(target, table, level, nodes)
+            nodes = [node for node in nodes if theirs.get(node, 0) != ours.get(node, 0)]
+            if level < DEPTH:
+                nodes = [child for node in nodes for child in range(node * FANOUT, (node + 1) * FANOUT)]
+        theirs, ours = bucket_hashes(source, table, nodes), bucket_hashes(target, table, nodes)
+        differences[table] = Difference(sorted(key for key, value in theirs.items() if ours.get(key) != value),
+                                        sorted(key for key in ours if key not in theirs))
+    return differences
+
+
+def upsert_statement(table):
+    """
+    Builds the statement inserting a synced row or updating its columns.
+
+    Rows made of key columns only are inserted unless present.
+
+    :param table: The synced table.
+    :returns: The INSERT statement, with one parameter per synced column.
+    :rtype: str
+    """
+    columns = SYNC_COLUMNS[table]
+    keys = KEY_COLUMNS[table]
+    values = f"({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    updates = [column for column in columns if column not in keys]
+    if not updates:
+        # Enrollments are only keys, and a view, which takes no upsert clause
+        return f"INSERT OR IGNORE INTO {table} {values}"
+    return (f"INSERT INTO {table} {values} ON CONFLICT ({', '.join(keys)}) "
+            f"DO UPDATE SET {', '.join(f'{column} = excluded.{column}' for column in updates)}")
+
+
+def apply(source, target, differences=None):
+    """
+    Makes the target's rows equal to the source's.
+
+    All deletes and upserts run in one transaction on the target: deletes
+    first, enrollments before the records they refer to, then upserts with
+    instructors before the courses and students before their enrollments.
+    Before a table's upserts, the unique columns of its rows being upserted
+    are set to a placeholder made of the row's key, so emails swapped or
+    rotated between records in the source are written without colliding
+    with each other. The target's hash tree is updated afterwards.
+
+    :param source: The connection to the database whose rows are wanted.
+    :param target: The connection to the database to be changed.
+    :param differences: The result of :func:`diff`; computed if None.
+    :returns: ``(upserted, deleted)`` row counts.
+    :rtype: tuple[int, int]
+    :raises sqlite3.Error: If a write fails, e.g. on an email the source gave
+        a record that another target record keeps; the target is left unchanged.
+    """
+    if differences is None:
+        differences = diff(source, target)
+    upserted = deleted = 0
+    with transaction(target):
+        for table in reversed(list(SYNC_COLUMNS)):
+            for chunk in chunked(differences[table].deletes):
+                condition, params = key_condition(table, chunk)
+                target.execute(f"DELETE FROM {table} WHERE {condition}", params)
+                deleted += len(chunk)
+        for table in SYNC_COLUMNS:
+            unique = UNIQUE_COLUMNS.get(table, ())
+            placeholders = ", ".join(f"{column} = '#sync:' || {KEY_COLUMNS[table][0]}" for column in unique)
+            for chunk in chunked(differences[table].upserts if unique else []):
+                condition, params = key_condition(table, chunk)
+                target.execute(f"UPDATE {table} SET {placeholders} WHERE {condition}", params)
+            rows = fetch_synced_rows(source, table, differences[table].upserts)
+            target.executemany(upsert_statement(table), rows.values())
+            upserted += len(rows)
+    update_tree(target)
+    return upserted, deleted
+
+
+def main(argv=None):
+    """
+    Command-line entry point.
+
+    :param argv: The arguments; defaults to ``sys.argv[1:]``.
+    :returns: None
+    """
+    parser = argparse.ArgumentParser(prog="python -m lab3_common.sync", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("mode", choices=["diff", "apply"], help="list the differences, or apply them to TARGET")
+    parser.add_argument("source", help="database file whose rows are wanted")
+    parser.add_argument("target", help="database file made equal to SOURCE")
+    parser.add_argument("--keys", action="store_true", help="print the keys of the differing rows")
+    args = parser.parse_args(argv)
+
+    source, target = connect(args.source), connect(args.target)
+    try:
+        start = time.perf_counter()
+        differences = diff(source, target)
+        for table, difference in differences.items():
+            print(f"{table}: {len(difference.upserts)} to upsert, {len(difference.deletes)} to delete")
+            if args.keys:
+                for key in difference.upserts:
+                    print(f"  + {key}")
+                for key in difference.deletes:
+                    print(f"  - {key}")
+        if args.mode == "apply":
+            upserted, deleted = apply(source, target, differences)
+            print(f"Upserted {upserted} and deleted {deleted} row(s) in {args.target}")
+        print(f"Done in {(time.perf_counter() - start) * 1000:.0f} ms")
+    finally:
+        source.close()
+        target.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Declarative validation rules shared by every form and by bulk imports.
+
+Patterns are compiled once at import time. :func:`validate` checks a single
+record and raises :class:`ValidationError` with every problem found, while
+:func:`validate_batch` checks a column-oriented batch in one pass and returns
+the errors per row instead of stopping at the first one.
+"""
+import re
+
+ID_PATTERN = re.compile(r"^[a-zA-Z0-9]+$")
+NAME_PATTERN = re.compile(r"^[a-zA-Z\s]+$")
+EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$")
+
+
+class ValidationError(ValueError):
+    """
+    Raised when a record fails validation.
+
+    :param errors: List of ``(field, message)`` pairs, one per problem.
+    """
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__("\n".join(message for _, message in self.errors))
+
+
+class Field:
+    """
+    Validation rule for one column.
+
+    :param name: The column name.
+    :param label: The name shown to the user in error messages.
+    :param required: Whether an empty value is an error.
+    :param pattern: A precompiled regular expression the value must match.
+    :param pattern_message: The error message when the pattern does not match.
+    :param integer: Whether the value must be an integer.
+    :param min_value: The smallest accepted integer.
+    """
+    def __init__(self, name, label, required=True, pattern=None, pattern_message=None, integer=False, min_value=None):
+        self.name = name
+        self.label = label
+        self.required = required
+        self.pattern = pattern
+        self.pattern_message = pattern_message or f"{label} has an invalid format"
+        self.integer = integer
+        self.min_value = min_value
+
+    def clean(self, raw):
+        """
+        Normalises and checks one value.
+
+        :param raw: The value as entered (string, int or None).
+        :returns: ``(value, error)`` where ``error`` is None when the value is valid.
+        :rtype: tuple
+        """
+        value = raw.strip() if isinstance(raw, str) else raw
+        if value is None or value == "":
+            if self.required:
+                return None, f"{self.label} cannot be empty"
+            return None, None
+
+        if self.integer:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                return None, f"{self.label} must be a valid integer"
+            if self.min_value is not None and value < self.min_value:
+                return None, f"{self.label} cannot be less than {self.min_value}"
+            return value, None
+
+        value = str(value)
+        if self.pattern is not None and self.pattern.match(value) is None:
+            return None, self.pattern_message
+        return value, None
+
+
+def person_rules(id_field, id_label):
+    """
+    Builds the rules shared by students and instructors.
+
+    :param id_field: The primary key column.
+    :param id_label: The label of the primary key.
+    :returns: The field rules.
+    :rtype: tuple[Field]
+    """
+    return (
+        Field(id_field, id_label, pattern=ID_PATTERN,
+              pattern_message=f"{id_label} must contain only alphanumeric characters"),
+        Field("name", "Name", pattern=NAME_PATTERN,
+              pattern_message="Name must contain only alphabetic characters and spaces"),
+        Field("age", "Age", integer=True, min_value=0),
+        Field("email", "Email", pattern=EMAIL_PATTERN, pattern_message="Wrong email format"),
+    )
+
+
+RULES = {
+    "student": person_rules("student_id", "Student ID"),
+    "instructor": person_rules("instructor_id", "Instructor ID"),
+    "course": (
+        Field("course_id", "Course ID", pattern=ID_PATTERN,
+              pattern_message="Course ID must contain only alphanumeric characters"),
+        Field("course_name", "Course Name", pattern=NAME_PATTERN,
+              pattern_message="Course Name must contain only alphabetic characters and spaces"),
+        Field("instructor_id", "Instructor ID", required=False, pattern=ID_PATTERN,
+              pattern_message="Instructor ID must contain only alphanumeric characters"),
+    ),
+}
+
+
+def get_rules(record_type, fields=None):
+    """
+    Returns the rules for a record type, optionally limited to some fields.
+
+    :param record_type: "student", "instructor" or "course".
+    :param fields: Only return rules for these column names.
+    :returns: The matching field rules.
+    :rtype: list[Field]
+    :raises ValueError: If the record type is unknown.
+    """
+    try:
+        rules = RULES[record_type]
+    except KeyError:
+        raise ValueError(f"Unknown record type: {record_type}")
+    if fields is None:
+        return list(rules)
+    return [rule for rule in rules if rule.name in fields]
+
+
+def validate(record_type, record, fields=None):
+    """
+    Validates a single record and returns its cleaned values.
+
+    Fields not present in ``record`` are treated as empty unless ``fields``
+    restricts validation to a subset, as partial edits do.
+
+    :param record_type: "student", "instructor" or "course".
+    :param record: Mapping of column name to the raw value.
+    :param fields: Only validate these columns.
+    :returns: Mapping of column name to the cleaned value.
+    :rtype: dict
+    :raises ValidationError: Listing every invalid field.
+    """
+    cleaned = {}
+    errors = []
+    for rule in get_rules(record_type, fields):
+        value, error = rule.clean(record.get(rule.name))
+        if error is None:
+            cleaned[rule.name] = value
+        else:
+            errors.append((rule.name, error))
+    if errors:
+        raise ValidationError(errors)
+    return cleaned
+
+
+def validate_batch(record_type, columns):
+    """
+    Validates a column-oriented batch of records in one pass.
+
+    Each rule runs over its whole column at once, so every row is checked
+    and all of its problems are reported.
+
+    :param record_type: "student", "instructor" or "course".
+    :param columns: Mapping of column name to the list of raw values; all
+        lists must have the same length. Missing columns are treated as empty.
+    :returns: ``(cleaned_columns, errors_by_row)``, where ``errors_by_row``
+        maps a row index to its list of ``(field, message)`` pairs.
+    :rtype: tuple[dict, dict]
+    """
+    row_count = max((len(values) for values in columns.values()), default=0)
+    cleaned_columns = {}
+    errors_by_row = {}
+    for rule in get_rules(record_type):
+        values = columns.get(rule.name) or [None] * row_count
+        clean = rule.clean
+        cleaned = cleaned_columns[rule.name] = [None] * row_count
+        for row, raw in enumerate(values):
+            value, error = clean(raw)
+            if error is None:
+                cleaned[row] = value
+            else:
+                errors_by_row.setdefault(row, []).append((rule.name, error))
+    return cleaned_columns, errors_by_row
@@ -0,0 +1,159 @@
+"""
+Group-commit (write-behind) queue for rapid data entry.
+
+Writes are executed immediately, so constraint errors still reach the form
+that issued them and later reads on the same connection see the new rows,
+but the COMMIT (and its fsync) is deferred. A group is committed when it
+reaches ``max_batch`` writes or ``max_delay_ms`` after its first write,
+whichever comes first, and on exit. Change listeners only hear about the
+writes of a group once it has committed.
+"""
+import atexit
+import sqlite3
+
+from lab3_common.store import ChangeSet, publish
+
+# Accepted values for PRAGMA synchronous, from safest to fastest.
+DURABILITY_LEVELS = {
+    "full": "FULL",
+    "normal": "NORMAL",
+    "off": "OFF",
+}
+
+
+def set_durability(conn, level):
+    """
+    Sets the fsync policy of a connection.
+
+    :param conn: The database connection.
+    :param level: "full", "normal" or "off".
+    :returns: None
+    :raises ValueError: If the level is unknown.
+    """
+    try:
+        pragma = DURABILITY_LEVELS[level.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown durability level '{level}', expected one of {', '.join(DURABILITY_LEVELS)}")
+    conn.execute(f"PRAGMA synchronous = {pragma}")
+
+
+class GroupCommitQueue:
+    """
+    Defers commits so that back-to-back writes share one fsync.
+
+    :param conn: The database connection the writes run on.
+    :param max_batch: Commit as soon as this many writes are pending.
+    :param max_delay_ms: Commit at most this long after the first pending write.
+    :param schedule: ``schedule(delay_ms, callback)`` used to arm the flush
+        timer on the GUI thread, e.g. ``root.after`` or ``QTimer.singleShot``.
+        Without it, groups only flush on size, on :meth:`flush` and on exit.
+    :param on_error: Called as ``on_error(origin, error, count)`` when a
+        group fails to commit, once per originating form.
+    """
+    def __init__(self, conn, max_batch=50, max_delay_ms=250, schedule=None, on_error=None):
+        self.conn = conn
+        self.max_batch = max_batch
+        self.max_delay_ms = max_delay_ms
+        self.schedule = schedule
+        self.on_error = on_error
+        self.pending = []
+        self.timer_armed = False
+        self.groups_committed = 0
+        self.writes_committed = 0
+        atexit.register(self.flush)
+
+    def submit(self, sql, params=(), origin=None, changes=None):
+        """
+        Executes one write inside the open group.
+
+        :param sql: The INSERT, UPDATE or DELETE statement.
+        :param params: The statement parameters.
+        :param origin: A label for the form that issued the write, used when
+            reporting a failed commit.
+        :param changes: The :class:`ChangeSet` to publish once the group commits.
+        :returns: The number of rows the statement changed.
+        :rtype: int
+        :raises sqlite3.Error: If the statement itself fails; the rest of the
+            group is unaffected.
+        """
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN")
+        changed = self.conn.execute(sql, params).rowcount
+        self.pending.append((origin, changes))
+
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif not self.timer_armed and self.schedule is not None:
+            self.timer_armed = True
+            self.schedule(self.max_delay_ms, self.on_timer)
+        return changed
+
+    def on_timer(self):
+        """
+        Flushes the group when the delay timer fires.
+
+        :returns: None
+        """
+        self.timer_armed = False
+        self.flush()
+
+    def flush(self):
+        """
+        Commits every pending write as one group.
+
+        On success the change sets of the group are published together. If
+        the commit fails, the group is rolled back and ``on_error`` is called
+        for each form that contributed to it.
+
+        :returns: The number of writes committed.
+        :rtype: int
+        """
+        pending, self.pending = self.pending, []
+        if not pending:
+            return 0
+        try:
+            self.conn.commit()
+        except sqlite3.Error as e:
+            try:
+                self.conn.rollback()
+            except sqlite3.Error:
+                pass
+            self.report_failure([origin for origin, _ in pending], e)
+            return 0
+        self.groups_committed += 1
+        self.writes_committed += len(pending)
+        committed = ChangeSet()
+        for _, changes in pending:
+            if changes is not None:
+                for record_type, keys in changes.upserted.items():
+                    committed.upsert(record_type, keys)
+                for record_type, keys in changes.deleted.items():
+                    committed.delete(record_type, keys)
+        publish(committed)
+        return len(pending)
+
+    def report_failure(self, pending, error):
+        """
+        Reports a failed group to each originating form.
+
+        :param pending: The origins of the writes in the failed group.
+        :param error: The exception raised by the commit.
+        :returns: None
+        """
+        counts = {}
+        for origin in pending:
+            counts[origin] = counts.get(origin, 0) + 1
+        for origin, count in counts.items():
+            if self.on_error is not None:
+                self.on_error(origin, error, count)
+            else:
+                print(f"{count} queued write(s) from {origin} were lost: {error}")
+
+    def close(self):
+        """
+        Flushes the pending group; call before the application exits.
+
+        :returns: None
+        """
+        self.flush()
+        atexit.unregister(self.flush)
@@ -0,0 +1,44 @@
+"""
+Tests for archiving closed terms into per-term files.
+"""
+import os
+import sqlite3
+
+import pytest
+
+from lab3_common.archive import archived_terms, close_term, restore_term
+from lab3_common.bench import populate
+from lab3_common.db import connect
+
+COURSES = [f"C{i}" for i in range(5)]
+
+
+@pytest.fixture
+def live(tmp_path):
+    conn = connect(str(tmp_path / "school.sqlite"))
+    populate(conn, 50, courses=5, per_student=2)
+    yield conn, str(tmp_path / "Archive")
+    conn.close()
+
+
+def test_close_and_restore_students_without_age(live):
+    conn, directory = live
+    with conn:
+        conn.execute("UPDATE students SET age = NULL WHERE student_id = 'S1'")
+    before = set(conn.execute("SELECT student_id, name, age, email FROM students"))
+    result = close_term(conn, "2024-fall", COURSES, students=True, directory=directory)
+    assert (result.enrollments, result.students) == (100, 50)
+    assert conn.execute("SELECT COUNT(*) FROM students").fetchone()[0] == 0
+    restore_term(conn, "2024-fall", directory)
+    assert set(conn.execute("SELECT student_id, name, age, email FROM students")) == before
+    assert archived_terms(conn.execute("PRAGMA database_list").fetchone()[2], directory) == {}
+
+
+def test_failed_close_leaves_no_term_file(live):
+    conn, directory = live
+    with conn:
+        conn.execute("CREATE TRIGGER refuse BEFORE DELETE ON students BEGIN SELECT RAISE(ABORT, 'refused'); END")
+    with pytest.raises(sqlite3.IntegrityError):
+        close_term(conn, "2024-fall", COURSES, students=True, directory=directory)
+    assert conn.execute("SELECT COUNT(*) FROM enrollments").fetchone()[0] == 100
+    assert not os.listdir(directory)
@@ -0,0 +1,32 @@
+"""
+Tests for registering students for courses.
+"""
+import sqlite3
+
+import pytest
+
+from lab3_common import store
+from lab3_common.bench import populate
+from lab3_common.db import connect
+from lab3_common.store import enroll_student
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, "change_listeners", [])
+    conn = connect(str(tmp_path / "school.sqlite"))
+    populate(conn, 10, courses=3, per_student=0)
+    yield conn
+    conn.close()
+
+
+def test_duplicate_registration_is_reported_by_id(conn):
+    enroll_student(conn, "S1", "C1")
+    with pytest.raises(sqlite3.IntegrityError, match="^Student S1 is already registered for course C1.$"):
+        enroll_student(conn, "S1", "C1")
+    assert conn.execute("SELECT COUNT(*) FROM student_courses WHERE student_id = 'S1'").fetchone() == (1,)
+
+
+def test_unknown_student_or_course(conn):
+    with pytest.raises(ValueError, match="doesn't exist"):
+        enroll_student(conn, "S1", "missing")
@@ -0,0 +1,45 @@
+"""
+Query-plan regression tests: every statement the applications issue must use an index.
+
+See :mod:`lab3_common.queryplan`; run ``python -m lab3_common.queryplan --verbose``
+to inspect the plans of a failing run.
+"""
+import os
+
+import pytest
+
+from lab3_common.bench import populate
+from lab3_common.db import connect
+from lab3_common.queryplan import GUI_SOURCES, check, gui_statements, run_workload
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def database(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("queryplan") / "queryplan.sqlite")
+    conn = connect(path)
+    populate(conn, 1000)
+    yield conn, path
+    conn.close()
+
+
+def assert_indexed(conn, statements):
+    failures = [f"{statement.source}: {problem}\n    {' '.join(statement.sql.split())}"
+                for statement, _, problems in check(conn, statements) for problem in problems]
+    assert not failures, "\n".join(failures)
+
+
+def test_shared_statements_use_indexes(database):
+    conn, path = database
+    statements = run_workload(conn, path)
+    assert statements
+    assert_indexed(conn, statements)
+
+
+@pytest.mark.parametrize("source", GUI_SOURCES)
+def test_gui_statements_use_indexes(database, source):
+    conn, _ = database
+    statements = gui_statements(os.path.join(ROOT, source))
+    assert statements
+    assert_indexed(conn, statements)
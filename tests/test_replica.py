@@ -0,0 +1,54 @@
+"""
+Tests for the in-memory read replica.
+"""
+import pytest
+
+from lab3_common import store
+from lab3_common.bench import populate
+from lab3_common.db import connect
+from lab3_common.replica import ReadReplica
+from lab3_common.store import ChangeSet, build_insert
+from lab3_common.writequeue import GroupCommitQueue
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, "change_listeners", [])
+    conn = connect(str(tmp_path / "school.sqlite"))
+    populate(conn, 50, courses=5, per_student=2)
+    yield conn
+    conn.close()
+
+
+def submit_student(queue, student_id):
+    record = {"student_id": student_id, "name": "New", "age": 20, "email": f"{student_id.lower()}@school.edu"}
+    queue.submit(build_insert("student", tuple(record)), tuple(record.values()), "Student",
+                 ChangeSet().upsert("student", [student_id]))
+
+
+def replica_has(replica, student_id):
+    return replica.conn.execute("SELECT 1 FROM students WHERE student_id = ?", (student_id,)).fetchone() is not None
+
+
+def test_replica_skips_rolled_back_group(conn):
+    replica = ReadReplica(conn)
+    errors = []
+    queue = GroupCommitQueue(conn, max_batch=100, on_error=lambda origin, error, count: errors.append(origin))
+
+    submit_student(queue, "SX")
+    # Checked at commit, so the whole group fails to commit and is rolled back
+    conn.execute("PRAGMA defer_foreign_keys = ON")
+    conn.execute("INSERT INTO courses (course_id, course_name, instructor_id) VALUES ('CX', 'New', 'missing')")
+    assert replica.sync() == 0
+    assert not replica_has(replica, "SX")
+    assert queue.flush() == 0
+    assert errors == ["Student"]
+    replica.sync()
+    assert not replica_has(replica, "SX")
+
+    # The next group reuses the rolled-back change-log sequence numbers
+    submit_student(queue, "SY")
+    assert queue.flush() == 1
+    queue.close()
+    assert replica_has(replica, "SY")
+    assert not replica_has(replica, "SX")
@@ -0,0 +1,57 @@
+"""
+Tests for the hash-tree sync between two school databases.
+"""
+import pytest
+
+from lab3_common.bench import populate
+from lab3_common.db import connect
+from lab3_common.sync import SYNC_COLUMNS, apply, diff
+
+
+@pytest.fixture
+def copies(tmp_path):
+    source = connect(str(tmp_path / "source.sqlite"))
+    target = connect(str(tmp_path / "target.sqlite"))
+    populate(source, 200, courses=20, per_student=3)
+    source.backup(target)
+    yield source, target
+    source.close()
+    target.close()
+
+
+def assert_synced(source, target):
+    for table, columns in SYNC_COLUMNS.items():
+        sql = f"SELECT {', '.join(columns)} FROM {table}"
+        assert set(source.execute(sql)) == set(target.execute(sql)), table
+    assert not any(difference.upserts or difference.deletes for difference in diff(source, target).values())
+
+
+def test_apply_copies_inserts_updates_and_deletes(copies):
+    source, target = copies
+    with source:
+        source.execute("INSERT INTO students (student_id, name, age, email) VALUES ('SX', 'New', 20, 'sx@school.edu')")
+        source.execute("INSERT INTO student_courses (student_id, course_id) VALUES ('SX', 'C1')")
+        source.execute("UPDATE courses SET course_name = 'Renamed' WHERE course_id = 'C2'")
+        source.execute("DELETE FROM students WHERE student_id = 'S3'")
+    differences = diff(source, target)
+    assert differences["students"].upserts == ["SX"]
+    assert differences["students"].deletes == ["S3"]
+    assert differences["courses"].upserts == ["C2"]
+    apply(source, target, differences)
+    assert_synced(source, target)
+
+
+def test_apply_swapped_and_rotated_emails(copies):
+    source, target = copies
+    with source:
+        source.execute("UPDATE students SET email = 'swap' WHERE student_id = 'S1'")
+        source.execute("UPDATE students SET email = 's1@school.edu' WHERE student_id = 'S2'")
+        source.execute("UPDATE students SET email = 's2@school.edu' WHERE student_id = 'S1'")
+        source.execute("UPDATE instructors SET email = email || '.old' WHERE instructor_id IN ('I1', 'I2', 'I3')")
+        source.execute("""
+            UPDATE instructors SET email = CASE instructor_id
+                WHEN 'I1' THEN 'i2@school.edu' WHEN 'I2' THEN 'i3@school.edu' ELSE 'i1@school.edu' END
+            WHERE instructor_id IN ('I1', 'I2', 'I3')
+        """)
+    apply(source, target)
+    assert_synced(source, target)